@@ -0,0 +1,222 @@
+"""
+Admission control for the Flask service: per-client rate limits and
+in-flight caps, so a burst of traffic gets fast refusals instead of a
+queue that grows until every request is slow.
+
+Every request is classified (see Admission.route_classes):
+* static: the page, its scripts and styles, sound files. Cheap and the
+  same for everyone, and a team behind one NAT loads them all at once
+  from one address, so they are only counted against the global
+  in-flight cap.
+* default: room state and room creation. Counted against the global
+  in-flight cap.
+* export: history exports, which read and compress the database.
+  Counted against the global cap and their own small pool, so a few
+  exports can never take every slot. Their rows are produced on a
+  separate pool of OS threads (WorkerPool): in a gevent worker, CPU
+  work on the event loop would stop it from accepting connections, and
+  the overload would queue in the kernel, where nothing can refuse it.
+* stream: SSE connections. They are long-lived but idle, so they have
+  their own large pool and don't count against the global cap. A whole
+  team behind one NAT follows a room from one address, so streams are
+  not limited per client but per room (KEYED_POOLS), so no single room
+  can take the whole pool.
+
+The default and export classes also have a token bucket per client
+address (rate tokens per second, up to burst). A request without a
+token gets 429, one that finds its pool full gets 503; both carry
+Retry-After and cost next to nothing to produce. Behind a proxy the
+client address must come from its forwarded header (app.py applies
+ProxyFix when FOCUS_ALARM_TRUSTED_PROXIES is set), or every client
+shares the proxy's bucket.
+
+Bucket state is one (tokens, last refill) tuple per client in an
+OrderedDict kept in last-use order. A bucket idle for longer than it
+takes to refill completely is the same as a new one, so such entries
+are dropped from the old end as new requests arrive, and the table
+never holds more than max_clients entries.
+"""
+
+import collections
+import math
+import threading
+import time
+
+try:
+    from gevent import monkey, threadpool
+except ImportError:
+    monkey = None
+
+# class: (tokens per second, burst) per client
+RATES = {
+    'default': (20.0, 40),
+    'export': (0.5, 3),
+}
+# pool: requests in flight at once
+POOLS = {
+    'global': 64,
+    'export': 2,
+    'stream': 5000,
+}
+# class: requests in flight at once per key (for streams, per room)
+KEYED_POOLS = {
+    'stream': 1000,
+}
+MAX_CLIENTS = 100000
+
+
+class TokenBuckets:
+    """Token bucket per client, in a compact table of recently seen clients"""
+
+    def __init__(self, rate, burst, max_clients=MAX_CLIENTS):
+        self.rate = rate
+        self.burst = burst
+        self.max_clients = max_clients
+        self.idle_seconds = burst / rate  # an idle bucket is full again after this
+        self.buckets = collections.OrderedDict()  # client -> (tokens, last refill)
+        self._lock = threading.Lock()
+
+    def take(self, client, now=None):
+        """Spend one token; returns 0 if allowed, else seconds until one is available"""
+        now = time.monotonic() if now is None else now
+        with self._lock:
+            tokens, last = self.buckets.pop(client, (self.burst, now))
+            tokens = min(self.burst, tokens + (now - last) * self.rate)
+            if tokens >= 1:
+                tokens -= 1
+                wait = 0.0
+            else:
+                wait = (1 - tokens) / self.rate
+            self.buckets[client] = (tokens, now)
+            self._expire(now)
+        return wait
+
+    def _expire(self, now):
+        # Caller holds self._lock; the oldest entries are first
+        buckets = self.buckets
+        while buckets:
+            client, (tokens, last) = next(iter(buckets.items()))
+            if now - last < self.idle_seconds and len(buckets) <= self.max_clients:
+                return
+            buckets.popitem(last=False)
+
+    def __len__(self):
+        return len(self.buckets)
+
+
+class Pool:
+    """Cap on requests in flight; never waits for a slot"""
+
+    def __init__(self, name, limit):
+        self.name = name
+        self.limit = limit
+        self.in_flight = 0
+        self._lock = threading.Lock()
+
+    def try_acquire(self):
+        with self._lock:
+            if self.in_flight >= self.limit:
+                return False
+            self.in_flight += 1
+            return True
+
+    def release(self):
+        with self._lock:
+            self.in_flight -= 1
+
+
+class WorkerPool:
+    """OS threads that produce a response body, off a gevent worker's event loop"""
+
+    def __init__(self, name, threads):
+        self.name = name
+        self.threads = threads
+        self._pool = None  # created in the worker process, after the fork
+
+    def iterate(self, chunks):
+        """Yield a generator's chunks, each one computed on a pool thread"""
+        if monkey is None or not monkey.is_module_patched('threading'):
+            # A threaded server already gives each request its own thread
+            yield from chunks
+            return
+        if self._pool is None:
+            self._pool = threadpool.ThreadPool(self.threads)
+        done = object()
+        try:
+            while True:
+                # Only this greenlet waits; the event loop keeps serving others
+                chunk = self._pool.apply(next, (chunks, done))
+                if chunk is done:
+                    return
+                yield chunk
+        finally:
+            self._pool.apply(chunks.close)
+
+
+class Admission:
+    """Decides, per request, between running it, 429 and 503"""
+
+    route_classes = {
+        'export': ('global', 'export'),
+        'stream': ('stream',),
+        'static': ('global',),
+        'default': ('global',),
+    }
+
+    def __init__(self, rates=RATES, pools=POOLS, keyed_pools=KEYED_POOLS, max_clients=MAX_CLIENTS):
+        self.buckets = {name: TokenBuckets(rate, burst, max_clients) for name, (rate, burst) in rates.items()}
+        self.pools = {name: Pool(name, limit) for name, limit in pools.items()}
+        self.keyed_limits = dict(keyed_pools)
+        self.keyed = {}  # (class, key) -> Pool, only while something holds it
+        self._keyed_lock = threading.Lock()
+        self.stats = collections.Counter()
+
+    def admit(self, route_class, client, key=None):
+        """Returns (pools held, None) if admitted, else (None, (status, retry_after))"""
+        buckets = self.buckets.get(route_class)
+        wait = buckets.take(client) if buckets is not None else 0
+        if wait:
+            self.stats['limited'] += 1
+            return None, (429, math.ceil(wait))
+        held = []
+        for name in self.route_classes[route_class]:
+            pool = self.pools[name]
+            if not pool.try_acquire():
+                return self._shed(held)
+            held.append(pool)
+        if route_class in self.keyed_limits and key is not None:
+            pool = self._acquire_keyed((route_class, key), self.keyed_limits[route_class])
+            if pool is None:
+                return self._shed(held)
+            held.append(pool)
+        self.stats['admitted'] += 1
+        return held, None
+
+    def _shed(self, held):
+        self.release(held)
+        self.stats['shed'] += 1
+        return None, (503, 1)
+
+    def _acquire_keyed(self, name, limit):
+        # Keyed pools only exist while in use, so the table stays as small as the traffic
+        with self._keyed_lock:
+            pool = self.keyed.get(name)
+            if pool is None:
+                pool = self.keyed[name] = Pool(name, limit)
+            return pool if pool.try_acquire() else None
+
+    def release(self, held):
+        for pool in held:
+            if pool.name in self.keyed:
+                with self._keyed_lock:
+                    pool.release()
+                    if pool.in_flight == 0:
+                        del self.keyed[pool.name]
+            else:
+                pool.release()
+
+    def state(self):
+        return dict(self.stats,
+                    in_flight={name: pool.in_flight for name, pool in self.pools.items()},
+                    keyed=len(self.keyed),
+                    clients={name: len(buckets) for name, buckets in self.buckets.items()})
@@ -1,15 +1,226 @@
-from flask import Flask, render_template
+from flask import Flask, render_template, send_file, send_from_directory, abort, jsonify, url_for, request, Response, g
+import atexit
+import hashlib
+import hmac
+import io
 import os
+import threading
+import time
+
+from werkzeug.middleware.proxy_fix import ProxyFix
+
+import history
+import room_store
+from admission import Admission, WorkerPool, POOLS
+import session_state
+import sounds
+from rooms import Rooms, RoomsFull, MAX_SECONDS, MIN_INTERVAL
+from sound_bank import SoundBank
+
+# The page's scripts and styles live in js/ and css/ at the repo root, where
+# static hosting serves them too; only those folders are served as static
+app = Flask(__name__, static_folder=None)
+STATIC_DIRS = ('js', 'css')
+
+# Behind N trusted proxies (e.g. 1 for the Render/Heroku router),
+# request.remote_addr is taken from X-Forwarded-For, so rate limits apply
+# per client instead of to the router's address
+TRUSTED_PROXIES = int(os.environ.get('FOCUS_ALARM_TRUSTED_PROXIES', 0))
+if TRUSTED_PROXIES:
+    app.wsgi_app = ProxyFix(app.wsgi_app, x_for=TRUSTED_PROXIES, x_proto=TRUSTED_PROXIES)
+
+# Pre-rendered WAV files, built once per worker from the shared sound bank.
+# Versioned URLs (?v=<hash>, from sounds.json) are cached for good; other
+# requests revalidate against the ETag
+SOUND_CACHE_SECONDS = 365 * 24 * 3600
+SOUND_REVALIDATE_SECONDS = 60
+_sound_bank = None
+_wav_cache = {}
+_wav_lock = threading.Lock()
+
+def record_room(room):
+    connection = history.connect()
+    try:
+        history.record(connection, f'room:{room.id}', room.start, time.time(), room.total_time,
+                       room.next_alarm, room.sound, room.finished)
+    finally:
+        connection.close()
+
+
+# Shared focus sessions (see rooms.py), held in this process unless
+# FOCUS_ALARM_ROOM_STORE names a database shared by several workers
+rooms = Rooms(on_finish=record_room, store=room_store.from_env())
+
+# Per-client rate limits and in-flight caps (see admission.py);
+# FOCUS_ALARM_ADMISSION=off turns them off, e.g. behind a proxy that
+# already does this
+admission = Admission() if os.environ.get('FOCUS_ALARM_ADMISSION', 'on') != 'off' else None
+ROUTE_CLASSES = {'export_history': 'export', 'room_events': 'stream', 'index': 'static',
+                 'static': 'static', 'sound_manifest': 'static', 'sound_file': 'static'}
+export_pool = WorkerPool('export', POOLS['export'])
+
+
+@app.before_request
+def admit():
+    if admission is None or request.endpoint is None:
+        return None
+    route_class = ROUTE_CLASSES.get(request.endpoint, 'default')
+    if route_class == 'export' and not export_allowed():
+        # Refused with 403 by the view; costs what any cheap request does,
+        # never an export token or slot
+        route_class = 'default'
+    # Streams are limited per room, not per client address
+    key = (request.view_args or {}).get('room_id') if route_class == 'stream' else None
+    held, refusal = admission.admit(route_class, request.remote_addr, key)
+    if refusal:
+        status, retry_after = refusal
+        response = jsonify({'error': 'rate limited' if status == 429 else 'busy'})
+        response.status_code = status
+        response.headers['Retry-After'] = str(retry_after)
+        return response
+    g.admission_held = held
+    return None
+
+
+@app.after_request
+def hold_until_sent(response):
+    # Generator bodies run after the view returns; keep the slot until the
+    # server closes the response. File responses (direct_passthrough) never
+    # call their close callbacks, so teardown releases those
+    if response.is_streamed and not response.direct_passthrough:
+        held = g.pop('admission_held', None)
+        if held:
+            response.call_on_close(lambda: admission.release(held))
+    return response
+
+
+@app.teardown_request
+def release_unsent(exc):
+    held = g.pop('admission_held', None)
+    if held:
+        admission.release(held)
+
+
+def get_wav(name):
+    """Return (wav_bytes, etag) for a preset, rendering it on first use"""
+    global _sound_bank
+    with _wav_lock:
+        if name not in _wav_cache:
+            if _sound_bank is None:
+                _sound_bank = SoundBank.open()
+                atexit.register(_sound_bank.close)
+            buf = io.BytesIO()
+            sounds.write_wav(buf, _sound_bank.get(name), _sound_bank.sample_rate(name))
+            data = buf.getvalue()
+            _wav_cache[name] = (data, hashlib.sha1(data).hexdigest())
+        return _wav_cache[name]
+
+
+@app.route('/static/<path:filename>')
+def static(filename):
+    folder, _, rest = filename.partition('/')
+    if folder not in STATIC_DIRS:
+        abort(404)
+    # send_from_directory refuses paths that climb out of the folder
+    return send_from_directory(os.path.join(app.root_path, folder), rest)
 
-app = Flask(__name__)
 
 @app.route('/')
 def index():
     return render_template('index.html')
 
-if __name__ == '__main__':
-    port = int(os.environ.get('PORT', 5000))
-    app.run(debug=False, host='0.0.0.0', port=port)
 
+@app.route('/sounds.json')
+def sound_manifest():
+    # Versioned URLs so the WAVs themselves can be cached as immutable
+    return jsonify({
+        name: url_for('sound_file', name=name, v=get_wav(name)[1][:12])
+        for name in sounds.PRESETS
+    })
+
+
+@app.route('/sounds/<name>.wav')
+def sound_file(name):
+    if name not in sounds.PRESETS:
+        abort(404)
+    data, etag = get_wav(name)
+    versioned = request.args.get('v') == etag[:12]
+    # conditional=True handles If-None-Match and Range requests
+    response = send_file(io.BytesIO(data), mimetype='audio/wav', etag=etag, conditional=True,
+                         max_age=SOUND_CACHE_SECONDS if versioned else SOUND_REVALIDATE_SECONDS)
+    response.cache_control.public = True
+    response.cache_control.immutable = versioned
+    return response
+
+
+@app.route('/rooms', methods=['POST'])
+def create_room():
+    data = request.get_json(silent=True) or {}
+    try:
+        total_time = int(float(data.get('minutes', 25)) * 60)
+        min_interval = float(data.get('min_interval', session_state.MIN_INTERVAL))
+        max_interval = float(data.get('max_interval', session_state.MAX_INTERVAL))
+    except (TypeError, ValueError):
+        abort(400)
+    sound = data.get('sound', 'Default Beep')
+    if not 0 < total_time <= MAX_SECONDS or sound not in sounds.PRESETS \
+            or not MIN_INTERVAL <= min_interval <= max_interval:
+        abort(400)
+    try:
+        room = rooms.create(total_time, sound, min_interval=min_interval, max_interval=max_interval)
+    except RoomsFull:
+        abort(503)
+    return jsonify(room.state()), 201
+
+
+@app.route('/rooms/<room_id>', methods=['GET', 'DELETE'])
+def room_state(room_id):
+    room = rooms.stop(room_id) if request.method == 'DELETE' else rooms.get(room_id)
+    if room is None:
+        abort(404)
+    return jsonify(room.state())
 
 
+@app.route('/rooms/<room_id>/events')
+def room_events(room_id):
+    room = rooms.get(room_id)
+    if room is None:
+        abort(404)
+    return Response(room.listen(), mimetype='text/event-stream', headers={
+        'Cache-Control': 'no-cache',
+        'X-Accel-Buffering': 'no',  # don't let proxies buffer the stream
+    })
+
+
+def export_allowed():
+    # History is private: exports need FOCUS_ALARM_EXPORT_TOKEN as a bearer token
+    token = os.environ.get('FOCUS_ALARM_EXPORT_TOKEN')
+    given = request.headers.get('Authorization', '').removeprefix('Bearer ')
+    return bool(token) and hmac.compare_digest(given.encode(), token.encode())
+
+
+@app.route('/history/export.<fmt>')
+def export_history(fmt):
+    if fmt not in history.FORMATS:
+        abort(404)
+    if not export_allowed():
+        abort(403)
+    try:
+        start = history.parse_time(request.args.get('from'))
+        end = history.parse_time(request.args.get('to'))
+    except ValueError:
+        abort(400)
+    compress = 'gzip' in request.headers.get('Accept-Encoding', '')
+    # A generator body is sent chunked, one batch of rows at a time
+    chunks = history.export(fmt, start, end, request.args.get('user'), compress)
+    response = Response(export_pool.iterate(chunks), mimetype=history.FORMATS[fmt])
+    response.headers['Content-Disposition'] = f'attachment; filename=focus-history.{fmt}'
+    response.headers['Vary'] = 'Accept-Encoding'
+    if compress:
+        response.headers['Content-Encoding'] = 'gzip'
+    return response
+
+
+if __name__ == '__main__':
+    port = int(os.environ.get('PORT', 5000))
+    app.run(debug=False, host='0.0.0.0', port=port)
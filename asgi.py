@@ -0,0 +1,178 @@
+"""
+ASGI front end for the session runtime.
+
+A minimal ASGI app (no framework) that runs runtime.SessionRuntime on the
+server's own event loop, so every session is a pair of timer handles on
+that loop rather than threads. Any ASGI server will do; uvicorn is not
+in requirements.txt (the Flask deployment doesn't need it):
+
+    pip install uvicorn
+    uvicorn asgi:app
+
+Routes:
+    POST   /sessions              {"minutes": 25, "sound": "..."} -> session state
+    GET    /sessions/<id>         session state
+    DELETE /sessions/<id>         stop the session
+    GET    /sessions/<id>/events  Server-Sent Events: state, alarm, complete
+
+The server plays no sound; clients react to the alarm events. Each event
+is encoded once and handed to every listener's bounded queue; a listener
+whose queue is full is too slow and gets disconnected instead of holding
+up the others. A listener whose client goes away (http.disconnect) is
+unsubscribed right away.
+"""
+
+import asyncio
+import json
+
+import rooms
+import sounds
+from runtime import SessionRuntime
+
+MAX_SESSIONS = 1000
+MAX_SECONDS = 12 * 3600
+LISTENER_QUEUE = 64
+
+listeners = {}  # session id -> set of asyncio.Queue
+
+
+def on_event(session, event, data):
+    queues = listeners.get(session.id)
+    if not queues:
+        return
+    message = rooms.encode(event, dict(data, remaining=session.remaining()))
+    final = event in ('complete', 'stopped')
+    for queue in list(queues):
+        try:
+            queue.put_nowait(message)
+            if final:
+                queue.put_nowait(None)
+        except asyncio.QueueFull:
+            # Too slow to keep up: disconnect it rather than buffer without bound
+            queues.discard(queue)
+            end_stream(queue)
+
+
+def end_stream(queue):
+    """Make a listener's stream end next, dropping whatever it hasn't sent"""
+    while not queue.empty():
+        queue.get_nowait()
+    queue.put_nowait(None)
+
+
+runtime = SessionRuntime(on_event=on_event)
+sessions = {}  # id -> Session; finished ones are kept until the next session is created
+
+
+async def read_body(receive):
+    body = b''
+    while True:
+        message = await receive()
+        body += message.get('body', b'')
+        if not message.get('more_body'):
+            return body
+
+
+async def send_json(send, status, data):
+    body = json.dumps(data).encode('utf-8')
+    await send({'type': 'http.response.start', 'status': status,
+                'headers': [(b'content-type', b'application/json'),
+                            (b'content-length', str(len(body)).encode())]})
+    await send({'type': 'http.response.body', 'body': body})
+
+
+async def create_session(receive, send):
+    try:
+        data = json.loads(await read_body(receive) or b'{}')
+        total_time = int(float(data.get('minutes', 25)) * 60)
+        sound = str(data.get('sound', 'Default Beep'))
+    except (ValueError, TypeError, AttributeError):
+        return await send_json(send, 400, {'error': 'invalid request'})
+    if not 0 < total_time <= MAX_SECONDS:
+        return await send_json(send, 400, {'error': 'minutes out of range'})
+    if sound not in sounds.PRESETS:
+        return await send_json(send, 400, {'error': 'unknown sound'})
+    if len(runtime.sessions) >= MAX_SESSIONS:
+        return await send_json(send, 503, {'error': 'too many sessions'})
+    # Finished sessions are only kept for their final state
+    for session_id in [s for s, session in sessions.items() if session.status != 'running']:
+        del sessions[session_id]
+    session = runtime.start_session(total_time, sound)
+    sessions[session.id] = session
+    await send_json(send, 201, session.state())
+
+
+async def wait_disconnect(receive):
+    while (await receive())['type'] != 'http.disconnect':
+        pass
+
+
+async def session_events(session, receive, send):
+    queue = asyncio.Queue(LISTENER_QUEUE)
+    await send({'type': 'http.response.start', 'status': 200,
+                'headers': [(b'content-type', b'text/event-stream'),
+                            (b'cache-control', b'no-cache')]})
+    await send({'type': 'http.response.body', 'body': rooms.encode('state', session.state()),
+                'more_body': True})
+    if session.status != 'running':
+        return await send({'type': 'http.response.body', 'body': b''})
+    listeners.setdefault(session.id, set()).add(queue)
+    # A closed tab is noticed when it happens, not at the next event or heartbeat
+    disconnected = asyncio.ensure_future(wait_disconnect(receive))
+    disconnected.add_done_callback(lambda task: task.cancelled() or end_stream(queue))
+    try:
+        while True:
+            try:
+                message = await asyncio.wait_for(queue.get(), rooms.HEARTBEAT_SECONDS)
+            except asyncio.TimeoutError:
+                message = b': keepalive\n\n'
+            if message is None:
+                break
+            await send({'type': 'http.response.body', 'body': message, 'more_body': True})
+        if not disconnected.done():
+            await send({'type': 'http.response.body', 'body': b''})
+    finally:
+        disconnected.cancel()
+        queues = listeners.get(session.id)
+        if queues is not None:
+            queues.discard(queue)
+            if not queues:
+                del listeners[session.id]
+
+
+async def lifespan(receive, send):
+    while True:
+        message = await receive()
+        if message['type'] == 'lifespan.startup':
+            runtime.attach()
+            await send({'type': 'lifespan.startup.complete'})
+        elif message['type'] == 'lifespan.shutdown':
+            runtime.close()
+            await send({'type': 'lifespan.shutdown.complete'})
+            return
+
+
+async def app(scope, receive, send):
+    if scope['type'] == 'lifespan':
+        return await lifespan(receive, send)
+    if scope['type'] != 'http':
+        return
+    if runtime.loop is None:  # servers without lifespan support
+        runtime.attach()
+
+    method = scope['method']
+    parts = scope['path'].strip('/').split('/')
+    if parts == ['sessions'] and method == 'POST':
+        return await create_session(receive, send)
+    if len(parts) in (2, 3) and parts[0] == 'sessions' and parts[1].isdigit():
+        session = sessions.get(int(parts[1]))
+        if session is None:
+            return await send_json(send, 404, {'error': 'no such session'})
+        if len(parts) == 3 and parts[2] == 'events' and method == 'GET':
+            return await session_events(session, receive, send)
+        if len(parts) == 2 and method == 'GET':
+            return await send_json(send, 200, session.state())
+        if len(parts) == 2 and method == 'DELETE':
+            runtime.stop_session(session.id)
+            return await send_json(send, 200, session.state())
+    await send_json(send, 404, {'error': 'not found'})
@@ -0,0 +1,180 @@
+"""
+Audio capability probing with a persistent cache.
+
+Finding a working audio setup is slow: up to four pygame.mixer.init
+attempts and, for the frozen app, several timed afplay runs. The result
+rarely changes between launches, so the working configuration (mixer
+frequency, size, channels, buffer and backend) is saved to
+~/.focus_alarm/audio.json together with a fingerprint of the
+environment: platform, Python, pygame and SDL versions, the SDL audio
+driver and the list of output devices.
+
+On the next launch the cached configuration is tried first. Only if the
+fingerprint changed, or the cached configuration no longer initializes,
+is the full probe run again (and the cache rewritten).
+"""
+
+import json
+import os
+import platform
+import subprocess
+import sys
+
+import pygame
+
+import session_state
+import tracing
+
+CACHE_VERSION = 1
+SYSTEM_SOUND = '/System/Library/Sounds/Glass.aiff'
+
+# Tried in order by the full probe; None means pygame's defaults
+MIXER_CONFIGS = [
+    {'frequency': 44100, 'size': -16, 'channels': 2, 'buffer': 512},
+    None,
+    {'frequency': 22050, 'size': -16, 'channels': 1, 'buffer': 256},
+    {'frequency': 11025, 'size': -16, 'channels': 1, 'buffer': 128},
+]
+
+
+def default_path():
+    return os.path.join(os.path.dirname(session_state.default_path()), 'audio.json')
+
+
+def fingerprint():
+    """Cheap description of the environment the cached config was found in"""
+    return {
+        'platform': platform.platform(),
+        'python': platform.python_version(),
+        'pygame': pygame.version.ver,
+        'sdl': list(pygame.get_sdl_version()),
+        'driver': os.environ.get('SDL_AUDIODRIVER', ''),
+        'frozen': bool(getattr(sys, 'frozen', False)),
+    }
+
+
+def output_devices():
+    """Output device names (only available once the mixer is initialized)"""
+    try:
+        from pygame._sdl2 import audio
+        return list(audio.get_audio_device_names(False))
+    except Exception:
+        return []
+
+
+def load_cache(path=None):
+    try:
+        with open(path or default_path()) as f:
+            cache = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if not isinstance(cache, dict) or cache.get('version') != CACHE_VERSION:
+        return None
+    return cache
+
+
+def remember(backend, config, path=None):
+    """Cache a working setup for the current environment"""
+    result = {
+        'backend': backend,
+        'mixer': config,
+        'fingerprint': fingerprint(),
+        'devices': output_devices() if backend == 'pygame' else [],
+        'version': CACHE_VERSION,
+    }
+    try:
+        session_state.save_atomic(path or default_path(), result)
+    except OSError as e:
+        print(f"Could not save audio cache: {e}")
+
+
+def system_audio_works(timeout=1):
+    try:
+        subprocess.run(['afplay', SYSTEM_SOUND], capture_output=True, timeout=timeout)
+        return True
+    except Exception:
+        return False
+
+
+def request_permissions():
+    """Frozen app: play a sound so macOS asks for audio access"""
+    print("Running as frozen app - may need audio permissions")
+    if system_audio_works(timeout=2):
+        print("System audio access confirmed")
+    else:
+        print("System audio access failed - will use fallbacks")
+
+    try:
+        # Force audio initialization by playing a silent sound
+        subprocess.run(['afplay', SYSTEM_SOUND], capture_output=True, timeout=3)
+        print("Audio permission test successful")
+    except Exception as e:
+        print(f"Audio permission test failed: {e}")
+        # Try alternative approach
+        try:
+            os.system(f'afplay {SYSTEM_SOUND} &')
+            print("Audio permission test via os.system successful")
+        except:
+            print("All audio permission tests failed")
+
+
+def init_mixer(config):
+    """Initialize pygame's mixer with one config; raises pygame.error on failure"""
+    with tracing.span('mixer init', 'audio', config=config):
+        if config is None:
+            pygame.mixer.init()
+        else:
+            pygame.mixer.init(**config)
+
+
+def probe():
+    """Full probe: try every mixer config, then the system player"""
+    if getattr(sys, 'frozen', False):
+        request_permissions()
+
+    labels = ["successfully", "with defaults", "with minimal settings", "with ultra-minimal settings"]
+    for index, (config, label) in enumerate(zip(MIXER_CONFIGS, labels)):
+        try:
+            if index == len(MIXER_CONFIGS) - 1:
+                pygame.mixer.quit()  # Ensure clean state
+            init_mixer(config)
+            print(f"Pygame mixer initialized {label}")
+            return {'backend': 'pygame', 'mixer': config}
+        except Exception as e:
+            print(f"Error initializing pygame mixer: {e}")
+
+    # If pygame failed, try to initialize system audio
+    print("Pygame failed - will use system audio fallbacks")
+    if system_audio_works():
+        print("System audio working as fallback")
+        return {'backend': 'system', 'mixer': None}
+    print("System audio also failed")
+    return {'backend': 'none', 'mixer': None}
+
+
+def init_audio(path=None):
+    """Set up audio, trying the cached config first
+
+    Returns (audio_working, source) where source is 'cache' or 'probe'.
+    """
+    cache = load_cache(path)
+    if cache and cache.get('fingerprint') == fingerprint():
+        if cache.get('backend') == 'pygame':
+            try:
+                init_mixer(cache.get('mixer'))
+                if output_devices() == cache.get('devices'):
+                    print("Pygame mixer initialized from cached audio config")
+                    return True, 'cache'
+                print("Audio devices changed - probing again")
+                pygame.mixer.quit()
+            except Exception as e:
+                print(f"Cached audio config failed ({e}) - probing again")
+        elif cache.get('backend') == 'system':
+            # pygame never worked here; don't retry its four configs every launch
+            print("Using cached system audio fallback")
+            return False, 'cache'
+
+    result = probe()
+    if result['backend'] != 'none':
+        remember(result['backend'], result['mixer'], path)
+    return result['backend'] == 'pygame', 'probe'
@@ -0,0 +1,353 @@
+#!/usr/bin/env python3
+"""
+Latency under overload, with and without admission control.
+
+Starts gunicorn (one gevent worker, as in the Procfile) on a history
+database big enough that an export is real work, measures how many
+exports per second it can serve, then offers open-loop load at
+multiples of that capacity. Every request comes from its own loopback
+address (127.0.x.y), so the per-client rate limits stay out of the way
+and only the in-flight caps decide. Alongside the exports, a probe reads
+a room's state 20 times a second, which shows whether cheap routes are
+kept clear of the expensive ones.
+
+Reports, per offered load, exports served and refused, p50/p99 latency
+of served exports, p99 of the refusals, and p99 of the probe. With
+admission control the p99 must stay bounded as load goes past capacity;
+without it, requests queue and latency grows with the overload.
+
+Before that, one address bursts room reads to check the per-client
+limit: about a burst's worth succeed, the rest get 429 with
+Retry-After, and another address is unaffected. The same is checked
+for two clients behind one proxy (the server trusts one hop of
+X-Forwarded-For, as the Procfile sets up). Exports without a valid
+token must get 403, never the export pool: after a burst of them from
+one address, an authorized export from that address is still served.
+
+Then legitimate traffic must get through untouched: a team of browsers
+behind one NAT address loading the page and following a room, 200 more
+listeners on that room from the same address, and clients behind the
+proxy each loading the page and reading the room. None of these may
+get a 429 or 503.
+
+Usage: python benchmarks/bench_admission.py [seconds per load] [rows]
+"""
+
+import asyncio
+import os
+import random
+import shutil
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.parse
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+sys.path.insert(0, ROOT)
+
+import admission
+import history
+import sounds
+
+TOKEN = 'bench-token'
+LOADS = (0.5, 1, 2, 4)
+PROBE_RATE = 20
+TEAM = 30            # browsers behind one NAT address
+TEAM_ARRIVAL = 3     # seconds over which they open the page
+LISTENERS = 200      # extra listeners on the team's room from that address
+PROXIED = 100        # clients behind the proxy
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+def build(path, rows):
+    connection = history.connect(path)
+    rng = random.Random(1)
+    first = time.time() - 365 * 86400
+    with connection:
+        connection.executemany(
+            'INSERT INTO sessions (user, start, finish, planned, alarms, sound, outcome) '
+            'VALUES (?, ?, ?, ?, ?, ?, ?)',
+            ((f'user{rng.randrange(100)}', first + i * 60, first + i * 60 + 1500, 1500, 6,
+              'Default Beep', 'complete') for i in range(rows)))
+    connection.close()
+
+
+def start_server(port, directory, enabled):
+    command = [sys.executable, '-m', 'gunicorn', '--worker-class', 'gevent', '--workers', '1',
+               '--worker-connections', '10000', '--bind', f'127.0.0.1:{port}',
+               '--log-level', 'warning', 'app:app']
+    env = dict(os.environ, FOCUS_ALARM_HISTORY=os.path.join(directory, 'history.db'),
+               FOCUS_ALARM_EXPORT_TOKEN=TOKEN, FOCUS_ALARM_ADMISSION='on' if enabled else 'off',
+               FOCUS_ALARM_TRUSTED_PROXIES='1')
+    server = subprocess.Popen(command, cwd=ROOT, env=env, stdout=subprocess.DEVNULL)
+    for _ in range(100):
+        try:
+            with socket.create_connection(('127.0.0.1', port), timeout=0.1):
+                time.sleep(0.5)
+                return server
+        except OSError:
+            time.sleep(0.1)
+    server.kill()
+    raise RuntimeError("server did not start")
+
+
+class Addresses:
+    """A fresh loopback source address per request"""
+
+    def __init__(self):
+        self.n = 0
+
+    def next(self):
+        self.n += 1
+        return f'127.0.{self.n // 250 % 250}.{self.n % 250 + 2}'
+
+
+async def fetch(port, path, source, headers=''):
+    """(status, seconds, Retry-After) for one request on its own connection"""
+    start = time.perf_counter()
+    try:
+        reader, writer = await asyncio.wait_for(
+            asyncio.open_connection('127.0.0.1', port, local_addr=(source, 0)), 30)
+        writer.write(f'GET {path} HTTP/1.1\r\nHost: localhost\r\nConnection: close\r\n{headers}\r\n'.encode())
+        await writer.drain()
+        response = await asyncio.wait_for(reader.read(), 60)
+        writer.close()
+    except (OSError, asyncio.TimeoutError):
+        return None, time.perf_counter() - start, None
+    head = response.split(b'\r\n\r\n', 1)[0].decode('latin-1').split('\r\n')
+    retry_after = next((line.split(':', 1)[1].strip() for line in head
+                        if line.lower().startswith('retry-after:')), None)
+    return int(head[0].split()[1]), time.perf_counter() - start, retry_after
+
+
+async def create_room(port):
+    reader, writer = await asyncio.open_connection('127.0.0.1', port)
+    body = b'{"minutes": 60}'
+    writer.write(b'POST /rooms HTTP/1.1\r\nHost: localhost\r\nConnection: close\r\n'
+                 b'Content-Type: application/json\r\nContent-Length: %d\r\n\r\n%s' % (len(body), body))
+    response = await reader.read()
+    writer.close()
+    return response.split(b'"room":"', 1)[1].split(b'"', 1)[0].decode()
+
+
+EXPORT = '/history/export.csv'
+EXPORT_HEADERS = f'Authorization: Bearer {TOKEN}\r\nAccept-Encoding: gzip\r\n'
+
+
+async def capacity(port, addresses, samples=10):
+    """Exports per second when they run one at a time"""
+    start = time.perf_counter()
+    for _ in range(samples):
+        status, _, _ = await fetch(port, EXPORT, addresses.next(), EXPORT_HEADERS)
+        assert status == 200, status
+    return samples / (time.perf_counter() - start)
+
+
+async def open_loop(port, addresses, path, rate, seconds, headers=''):
+    """Requests started at a fixed rate, whether or not earlier ones finished"""
+    tasks = []
+    start = time.perf_counter()
+    for i in range(int(rate * seconds)):
+        delay = start + i / rate - time.perf_counter()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        tasks.append(asyncio.ensure_future(fetch(port, path, addresses.next(), headers)))
+    return await asyncio.gather(*tasks)
+
+
+def percentile(values, fraction):
+    if not values:
+        return None
+    values = sorted(values)
+    return values[min(len(values) - 1, int(fraction * len(values)))]
+
+
+async def overload(port, rate, seconds, room_id, addresses):
+    exports, probes = await asyncio.gather(
+        open_loop(port, addresses, EXPORT, rate, seconds, EXPORT_HEADERS),
+        open_loop(port, addresses, f'/rooms/{room_id}', PROBE_RATE, seconds))
+    served = [seconds_ for status, seconds_, _ in exports if status == 200]
+    refused = sum(status in (429, 503) for status, _, _ in exports)
+    refusal_times = [seconds_ for status, seconds_, _ in exports if status in (429, 503)]
+    failed = sum(status not in (200, 429, 503) for status, _, _ in exports)
+    probe_times = [seconds_ for status, seconds_, _ in probes if status == 200]
+    return {
+        'offered': len(exports), 'served': len(served), 'refused': refused, 'failed': failed,
+        'p50': percentile(served, 0.5), 'p99': percentile(served, 0.99),
+        'refusal_p99': percentile(refusal_times, 0.99),
+        'probe_p99': percentile(probe_times, 0.99), 'probe_lost': len(probes) - len(probe_times),
+    }
+
+
+def ms(seconds):
+    return '-' if seconds is None else f'{seconds * 1000:.0f}ms'
+
+
+async def burst(port, room_id, source, other_source, headers='', other_headers=''):
+    """One client reading as fast as it can, then another client"""
+    results = [await fetch(port, f'/rooms/{room_id}', source, headers) for _ in range(100)]
+    other, _, _ = await fetch(port, f'/rooms/{room_id}', other_source, other_headers)
+    ok = sum(status == 200 for status, _, _ in results)
+    limited = [retry for status, _, retry in results if status == 429]
+    return ok, len(limited), all(limited), other
+
+
+async def unauthorized(port):
+    """Statuses of tokenless exports from one address, then of an authorized one"""
+    refused = await asyncio.gather(*(fetch(port, EXPORT, '127.1.0.4') for _ in range(20)))
+    status, _, _ = await fetch(port, EXPORT, '127.1.0.4', EXPORT_HEADERS)
+    return sorted({status for status, _, _ in refused}), status
+
+
+def forwarded(client):
+    return f'X-Forwarded-For: {client}\r\n'
+
+
+PAGE = ['/', '/static/css/style.css', '/static/js/app.js', '/sounds.json',
+        '/sounds/%s.wav' % urllib.parse.quote(next(iter(sounds.PRESETS)))]
+
+
+async def page_load(port, source, headers=''):
+    return [status for status, _, _ in
+            await asyncio.gather(*(fetch(port, path, source, headers) for path in PAGE))]
+
+
+async def listen(port, room_id, source, streams):
+    """Open a room's event stream and leave it open; returns its status"""
+    try:
+        reader, writer = await asyncio.wait_for(
+            asyncio.open_connection('127.0.0.1', port, local_addr=(source, 0)), 30)
+        writer.write(f'GET /rooms/{room_id}/events HTTP/1.1\r\nHost: localhost\r\n\r\n'.encode())
+        await writer.drain()
+        head = await asyncio.wait_for(reader.readuntil(b'\r\n\r\n'), 30)
+    except (OSError, asyncio.TimeoutError, asyncio.IncompleteReadError):
+        return None
+    streams.append(writer)
+    return int(head.split()[1])
+
+
+async def team_member(port, room_id, delay, streams):
+    await asyncio.sleep(delay)
+    statuses = await page_load(port, '127.2.0.1')
+    return statuses + [await listen(port, room_id, '127.2.0.1', streams)]
+
+
+async def proxied_client(port, room_id, n):
+    headers = forwarded(f'10.0.{n // 250}.{n % 250 + 1}')
+    await asyncio.sleep(n * 0.02)
+    statuses = await page_load(port, '127.3.0.1', headers)
+    for _ in range(3):
+        status, _, _ = await fetch(port, f'/rooms/{room_id}', '127.3.0.1', headers)
+        statuses.append(status)
+    return statuses
+
+
+async def legitimate(port):
+    """Statuses other than 200 from traffic the limiter must let through"""
+    room_id = await create_room(port)
+    streams = []
+    try:
+        team = await asyncio.gather(
+            *(team_member(port, room_id, i * TEAM_ARRIVAL / TEAM, streams) for i in range(TEAM)),
+            *(listen(port, room_id, '127.2.0.1', streams) for _ in range(LISTENERS)))
+        proxied = await asyncio.gather(*(proxied_client(port, room_id, n) for n in range(PROXIED)))
+    finally:
+        for writer in streams:
+            writer.close()
+    team = [s for result in team for s in (result if isinstance(result, list) else [result])]
+    proxied = [s for result in proxied for s in result]
+    return ([s for s in team if s != 200], len(team), len(streams),
+            [s for s in proxied if s != 200], len(proxied))
+
+
+async def session(port, seconds, enabled):
+    addresses = Addresses()
+    room_id = await create_room(port)
+    bursts = legit = tokenless = None
+    if enabled:
+        tokenless = await unauthorized(port)
+        bursts = [await burst(port, room_id, '127.1.0.1', '127.1.0.2'),
+                  await burst(port, room_id, '127.1.0.3', '127.1.0.3',
+                              forwarded('10.1.0.1'), forwarded('10.1.0.2'))]
+        legit = await legitimate(port)
+    rate = await capacity(port, addresses)
+    rows = []
+    for load in LOADS:
+        rows.append((load, await overload(port, rate * load, seconds, room_id, addresses)))
+        await asyncio.sleep(1)  # let anything still queued drain
+    return bursts, legit, tokenless, rate, rows
+
+
+def run(directory, seconds, enabled):
+    port = free_port()
+    server = start_server(port, directory, enabled)
+    try:
+        return asyncio.run(session(port, seconds, enabled))
+    finally:
+        server.terminate()
+        server.wait()
+
+
+def main():
+    seconds = float(sys.argv[1]) if len(sys.argv) > 1 else 4
+    rows = int(sys.argv[2]) if len(sys.argv) > 2 else 20000
+    directory = tempfile.mkdtemp(prefix='admission-bench-')
+    ok = True
+    try:
+        build(os.path.join(directory, 'history.db'), rows)
+        p99s = {}
+        for enabled in (False, True):
+            bursts, legit, tokenless, rate, results = run(directory, seconds, enabled)
+            label = 'with admission control' if enabled else 'without admission control'
+            print(f"\n{label}: capacity {rate:.0f} exports/s ({rows:,} rows, csv + gzip), "
+                  f"{os.cpu_count()} CPU core(s)")
+            if bursts:
+                burst_ = admission.RATES['default'][1]
+                for who, (served, limited, retry_after, other) in zip(
+                        ('one address', 'one client behind the proxy'), bursts):
+                    print(f"  burst from {who}: {served} served, {limited} got 429 "
+                          f"(Retry-After on all: {retry_after}); another client got {other}")
+                    ok = ok and abs(served - burst_) <= 5 and retry_after and other == 200
+            if tokenless:
+                refused, authorized = tokenless
+                print(f"  20 exports without a token: {refused}; then with the token: {authorized}")
+                ok = ok and refused == [403] and authorized == 200
+            if legit:
+                team_bad, team_total, streams, proxied_bad, proxied_total = legit
+                print(f"  {TEAM} browsers + {LISTENERS} listeners behind one NAT address: "
+                      f"{team_total - len(team_bad)}/{team_total} requests served, {streams} streams open"
+                      f"{'  (got %s)' % sorted(set(team_bad), key=str) if team_bad else ''}")
+                print(f"  {PROXIED} clients behind the proxy: "
+                      f"{proxied_total - len(proxied_bad)}/{proxied_total} requests served"
+                      f"{'  (got %s)' % sorted(set(proxied_bad), key=str) if proxied_bad else ''}")
+                ok = ok and not team_bad and not proxied_bad
+            print(f"  {'offered':>8} {'requests':>9} {'served':>7} {'refused':>8} {'p50':>8} {'p99':>8} "
+                  f"{'refusal p99':>12} {'probe p99':>10}")
+            for load, r in results:
+                print(f"  {load:7g}x {r['offered']:9} {r['served']:7} {r['refused']:8} {ms(r['p50']):>8} "
+                      f"{ms(r['p99']):>8} {ms(r['refusal_p99']):>12} {ms(r['probe_p99']):>10}"
+                      f"{'  (%d failed)' % r['failed'] if r['failed'] else ''}"
+                      f"{'  (%d probes lost)' % r['probe_lost'] if r['probe_lost'] else ''}")
+            p99s[enabled] = [r['p99'] for _, r in results]
+            if enabled:
+                # Past capacity, served exports wait for at most the other pool slot
+                bound = max(p99s[True][LOADS.index(1)] * 3, 3 * admission.POOLS['export'] / rate)
+                bounded = all(p99 <= bound for p99 in p99s[True][LOADS.index(1):])
+                print(f"  p99 bounded past capacity (<= {bound * 1000:.0f} ms): {bounded}")
+                ok = ok and bounded and all(r['failed'] == 0 for _, r in results)
+        print(f"\np99 at {LOADS[-1]:g}x capacity: {p99s[False][-1] * 1000:.0f} ms without, "
+              f"{p99s[True][-1] * 1000:.0f} ms with admission control")
+    finally:
+        shutil.rmtree(directory)
+    return 0 if ok else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
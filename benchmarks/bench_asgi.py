@@ -0,0 +1,145 @@
+#!/usr/bin/env python3
+"""
+Smoke check for the ASGI front end, driven in process (no server).
+
+Runs asgi.app through its lifespan and the session routes the way an
+ASGI server would: POST /sessions, GET /sessions/<id>/events, then
+DELETE /sessions/<id> while the stream is open. The stream must open
+with the session's state, end with a 'stopped' event, and leave no
+listener behind; a second stream whose client disconnects must be
+unsubscribed too. Bad requests (unknown sound, minutes out of range,
+unknown session) must get 400/404. Reports how long each step took.
+
+Usage: python benchmarks/bench_asgi.py
+"""
+
+import asyncio
+import json
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+import asgi
+
+
+async def request(method, path, body=b''):
+    """(status, body) of a plain request"""
+    messages = [{'type': 'http.request', 'body': body, 'more_body': False}]
+    sent = []
+
+    async def receive():
+        if messages:
+            return messages.pop(0)
+        await asyncio.Event().wait()  # the client stays connected
+
+    async def send(message):
+        sent.append(message)
+
+    await asgi.app({'type': 'http', 'method': method, 'path': path}, receive, send)
+    return sent[0]['status'], b''.join(m.get('body', b'') for m in sent[1:])
+
+
+class Stream:
+    """An open GET of an event stream, read as the app sends it"""
+
+    def __init__(self, path):
+        self.chunks = asyncio.Queue()
+        self.gone = asyncio.Event()
+        self.status = None
+        messages = [{'type': 'http.request', 'body': b'', 'more_body': False}]
+
+        async def receive():
+            if messages:
+                return messages.pop(0)
+            await self.gone.wait()
+            return {'type': 'http.disconnect'}
+
+        async def send(message):
+            if message['type'] == 'http.response.start':
+                self.status = message['status']
+            else:
+                await self.chunks.put(message)
+
+        self.task = asyncio.ensure_future(
+            asgi.app({'type': 'http', 'method': 'GET', 'path': path}, receive, send))
+
+    async def event(self):
+        """Next (event, data) sent, or None once the body ends"""
+        message = await asyncio.wait_for(self.chunks.get(), 5)
+        if not message.get('more_body'):
+            return None
+        lines = message['body'].decode().splitlines()
+        event = next(line[7:] for line in lines if line.startswith('event: '))
+        data = next(line[6:] for line in lines if line.startswith('data: '))
+        return event, json.loads(data)
+
+
+async def lifespan():
+    events = asyncio.Queue()
+    done = asyncio.Queue()
+    task = asyncio.ensure_future(asgi.app({'type': 'lifespan'}, events.get, done.put))
+    await events.put({'type': 'lifespan.startup'})
+    assert (await done.get())['type'] == 'lifespan.startup.complete'
+    return task, events, done
+
+
+def check(ok, label, started):
+    print(f"  {label:<46} {(time.perf_counter() - started) * 1000:7.2f} ms  {'ok' if ok else 'FAIL'}")
+    return ok
+
+
+async def session():
+    task, events, done = await lifespan()
+    ok = True
+
+    started = time.perf_counter()
+    status, body = await request('POST', '/sessions', b'{"minutes": 1, "sound": "iPhone Radar"}')
+    created = json.loads(body)
+    ok &= check(status == 201 and created['sound'] == 'iPhone Radar', 'POST /sessions', started)
+    path = f"/sessions/{created['id']}"
+
+    started = time.perf_counter()
+    stream = Stream(path + '/events')
+    first = await stream.event()
+    ok &= check(stream.status == 200 and first[0] == 'state' and len(asgi.listeners) == 1,
+                'GET events: state first, one listener', started)
+
+    started = time.perf_counter()
+    status, body = await request('DELETE', path)
+    ok &= check(status == 200 and json.loads(body)['status'] == 'stopped', 'DELETE session', started)
+    last = await stream.event()
+    end = await stream.event()
+    await stream.task
+    ok &= check(last[0] == 'stopped' and end is None and not asgi.listeners,
+                'stream ends with stopped, listener removed', started)
+
+    started = time.perf_counter()
+    _, body = await request('POST', '/sessions', b'{"minutes": 1}')
+    stream = Stream(f"/sessions/{json.loads(body)['id']}/events")
+    await stream.event()
+    stream.gone.set()
+    await asyncio.wait_for(stream.task, 5)
+    ok &= check(not asgi.listeners, 'client disconnect unsubscribes', started)
+
+    started = time.perf_counter()
+    statuses = [
+        (await request('POST', '/sessions', b'{"minutes": 1, "sound": "../../etc"}'))[0],
+        (await request('POST', '/sessions', b'{"minutes": 0}'))[0],
+        (await request('GET', '/sessions/999999'))[0],
+    ]
+    ok &= check(statuses == [400, 400, 404], f'bad requests {statuses}', started)
+
+    await events.put({'type': 'lifespan.shutdown'})
+    await task
+    return ok
+
+
+def main():
+    print("asgi.app in process")
+    return 0 if asyncio.run(session()) else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
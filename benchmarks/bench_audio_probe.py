@@ -0,0 +1,101 @@
+#!/usr/bin/env python3
+"""
+Cold vs warm audio startup.
+
+Each run is a fresh interpreter (as on a real launch) that calls
+audio_probe.init_audio() against a private cache file:
+
+* cold: the cache is deleted first, so the full probe runs and saves it
+* warm: the cache from the previous run is used
+* stale: the cached fingerprint no longer matches, which must fall back
+  to the full probe
+
+Reports the median time spent in init_audio() (after pygame is imported)
+and for the whole process. Set SDL_AUDIODRIVER (e.g. to "dummy") to run
+without a sound card; if no audio works at all nothing is cached and
+only the cold run is reported.
+
+Usage: python benchmarks/bench_audio_probe.py [runs]
+"""
+
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+
+CHILD = """
+import os, sys, time
+os.environ['PYGAME_HIDE_SUPPORT_PROMPT'] = '1'
+sys.path.insert(0, {root!r})
+import audio_probe
+start = time.perf_counter()
+working, source = audio_probe.init_audio({path!r})
+print(f"RESULT {{time.perf_counter() - start}} {{source}} {{working}}")
+"""
+
+
+def launch(path):
+    start = time.perf_counter()
+    output = subprocess.run([sys.executable, '-c', CHILD.format(root=ROOT, path=path)],
+                            capture_output=True, text=True).stdout
+    total = time.perf_counter() - start
+    line = [line for line in output.splitlines() if line.startswith('RESULT')][-1]
+    _, probe, source, working = line.split()
+    return float(probe), total, source, working == 'True'
+
+
+def run(path, runs, prepare):
+    probes, totals, sources = [], [], set()
+    for _ in range(runs):
+        prepare()
+        probe, total, source, working = launch(path)
+        probes.append(probe)
+        totals.append(total)
+        sources.add(source)
+    return statistics.median(probes) * 1000, statistics.median(totals) * 1000, sources
+
+
+def print_results(results, runs):
+    print(f"{'':6} {'init_audio':>12} {'process':>10}  source  (median of {runs})")
+    for label, (probe, total, sources) in results:
+        print(f"{label:6} {probe:9.1f} ms {total:7.1f} ms  {','.join(sorted(sources))}")
+
+
+def main():
+    runs = int(sys.argv[1]) if len(sys.argv) > 1 else 10
+    directory = tempfile.mkdtemp(prefix='audio-probe-bench-')
+    path = os.path.join(directory, 'audio.json')
+
+    def cold():
+        if os.path.exists(path):
+            os.remove(path)
+
+    def stale():
+        with open(path) as f:
+            cache = json.load(f)
+        cache['fingerprint']['sdl'] = [0, 0, 0]
+        with open(path, 'w') as f:
+            json.dump(cache, f)
+
+    results = [("cold", run(path, runs, cold))]
+    launch(path)  # make sure a cache exists
+    if os.path.exists(path):
+        results.append(("warm", run(path, runs, lambda: None)))
+        results.append(("stale", run(path, runs, stale)))
+    else:
+        print("No working audio found, so nothing was cached")
+
+    print_results(results, runs)
+    cold()
+    os.rmdir(directory)
+    expected = {"cold": {'probe'}, "warm": {'cache'}, "stale": {'probe'}}
+    return 0 if all(sources == expected[label] for label, (_, _, sources) in results) else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,78 @@
+#!/usr/bin/env python3
+"""
+Benchmark custom sound import time against file size.
+
+Writes stereo 48 kHz WAV files of increasing length, imports each one
+(decode, downmix, resample to 44.1 kHz, normalize) cold and then again
+from the cache, and finally loads a library of a few hundred short files
+to show the cache staying within its byte budget.
+
+Usage: python benchmarks/bench_custom_import.py [library_size]
+"""
+
+import os
+import sys
+import tempfile
+import time
+import wave
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from custom_sounds import SoundImporter, SoundCache
+
+
+def write_test_wav(path, seconds, rate=48000, channels=2):
+    t = np.arange(int(seconds * rate)) / rate
+    tone = (0.5 * np.sin(2 * np.pi * 440 * t) * 32767).astype('<i2')
+    with wave.open(path, 'wb') as wav_file:
+        wav_file.setnchannels(channels)
+        wav_file.setsampwidth(2)
+        wav_file.setframerate(rate)
+        wav_file.writeframes(np.repeat(tone[:, None], channels, axis=1).tobytes())
+
+
+def main():
+    library_size = int(sys.argv[1]) if len(sys.argv) > 1 else 300
+
+    with tempfile.TemporaryDirectory() as tmp:
+        importer = SoundImporter(44100)
+
+        print(f"{'seconds':>8} {'MB':>7} {'cold ms':>9} {'MB/s':>7} {'cached ms':>10}")
+        for seconds in (1, 5, 15, 30, 60, 120):
+            path = os.path.join(tmp, f'tone_{seconds}.wav')
+            write_test_wav(path, seconds)
+            size_mb = os.path.getsize(path) / 1e6
+
+            start = time.perf_counter()
+            importer.load(path)
+            cold = time.perf_counter() - start
+
+            start = time.perf_counter()
+            importer.load(path)
+            cached = time.perf_counter() - start
+
+            print(f"{seconds:8d} {size_mb:7.1f} {cold * 1000:9.1f} {size_mb / cold:7.1f} {cached * 1000:10.2f}")
+
+        # Library load: many short files through a small cache
+        cache = SoundCache(max_bytes=8 * 1024 * 1024)
+        importer = SoundImporter(44100, cache)
+        paths = []
+        for i in range(library_size):
+            path = os.path.join(tmp, f'lib_{i}.wav')
+            write_test_wav(path, 2)
+            paths.append(path)
+
+        start = time.perf_counter()
+        for path in paths:
+            importer.load(path)
+        elapsed = time.perf_counter() - start
+        print(f"\nLibrary of {library_size} x 2 s files: {elapsed:.2f} s "
+              f"({elapsed / library_size * 1000:.1f} ms/file), "
+              f"cache holds {len(cache)} sounds in {cache.total_bytes / 1e6:.1f} MB "
+              f"(limit {cache.max_bytes / 1e6:.1f} MB)")
+
+
+if __name__ == '__main__':
+    main()
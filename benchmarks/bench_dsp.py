@@ -0,0 +1,272 @@
+#!/usr/bin/env python3
+"""
+Benchmark the DSP graph renderer against the hand-written preset builders.
+
+The builders below are the per-preset functions the graph replaced,
+kept here only as a reference. For every preset this prints the render
+time and the peak memory of both versions, relative to the size of the
+float64 output buffer, and checks that the outputs match. The graph
+renderer's peak counts its allocations during the render plus the
+scratch buffers it keeps between renders.
+
+Usage: python benchmarks/bench_dsp.py [sample_rate] [repeats]
+"""
+
+import os
+import sys
+import time
+import tracemalloc
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+import dsp
+import sounds
+
+
+# --- Reference builders (pre-graph implementation) ---
+
+def apply_fade(tone, fade_samples):
+    """Fade in/out to avoid clicks"""
+    fade_in = np.linspace(0, 1, fade_samples)
+    fade_out = np.linspace(1, 0, fade_samples)
+
+    tone[:fade_samples] *= fade_in
+    tone[-fade_samples:] *= fade_out
+    return tone
+
+
+def to_pcm16(tone):
+    """Normalize and convert to 16-bit integer"""
+    tone = tone / np.max(np.abs(tone)) * 16383
+    return tone.astype(np.int16)
+
+
+def create_sound(sample_rate, duration, frequencies, amplitudes):
+    """Create a sound with multiple frequencies"""
+    t = np.linspace(0, duration, int(sample_rate * duration), False)
+
+    # Mix multiple frequencies
+    tone = np.zeros_like(t)
+    for freq, amp in zip(frequencies, amplitudes):
+        tone += amp * np.sin(2 * np.pi * freq * t)
+
+    apply_fade(tone, int(0.1 * sample_rate))
+    return to_pcm16(tone)
+
+
+def create_default_beep(sample_rate):
+    """Create the default beep (simple 800 Hz tone)"""
+    return create_sound(sample_rate, 0.5, [800], [1.0])
+
+
+def create_iphone_radar(sample_rate):
+    """Create iPhone Radar-like sound (classic radar beep)"""
+    duration = 0.8
+    t = np.linspace(0, duration, int(sample_rate * duration), False)
+
+    # Radar: ascending beep with echo
+    base_freq = 800
+    tone = np.sin(2 * np.pi * base_freq * t)
+
+    # Add frequency sweep (ascending)
+    sweep = np.linspace(0.8, 1.2, len(t))
+    tone *= sweep
+
+    # Add echo effect
+    echo_delay = int(0.1 * sample_rate)
+    echo = np.zeros_like(tone)
+    echo[echo_delay:] = tone[:-echo_delay] * 0.3
+
+    tone = tone + echo
+
+    apply_fade(tone, int(0.1 * sample_rate))
+    return to_pcm16(tone)
+
+
+def create_iphone_beacon(sample_rate):
+    """Create iPhone Beacon-like sound (gentle beacon)"""
+    duration = 1.2
+    t = np.linspace(0, duration, int(sample_rate * duration), False)
+
+    # Beacon: gentle pulsing tone
+    base_freq = 600
+    tone = np.sin(2 * np.pi * base_freq * t)
+
+    # Add gentle pulse modulation
+    pulse_freq = 2  # 2 Hz pulse
+    pulse = 0.7 + 0.3 * np.sin(2 * np.pi * pulse_freq * t)
+    tone *= pulse
+
+    # Add harmonics for warmth
+    tone += 0.3 * np.sin(2 * np.pi * base_freq * 1.5 * t)
+    tone += 0.2 * np.sin(2 * np.pi * base_freq * 2 * t)
+
+    apply_fade(tone, int(0.2 * sample_rate))
+    return to_pcm16(tone)
+
+
+def create_iphone_bulletin(sample_rate):
+    """Create iPhone Bulletin-like sound (news bulletin style)"""
+    duration = 1.0
+    t = np.linspace(0, duration, int(sample_rate * duration), False)
+
+    # Bulletin: attention-grabbing tone
+    base_freq = 1000
+    tone = np.sin(2 * np.pi * base_freq * t)
+
+    # Add sharp attack and decay
+    attack_samples = int(0.05 * sample_rate)
+    decay_samples = int(0.1 * sample_rate)
+
+    attack = np.linspace(0, 1, attack_samples)
+    decay = np.linspace(1, 0.3, decay_samples)
+
+    tone[:attack_samples] *= attack
+    tone[-decay_samples:] *= decay
+
+    # Add slight modulation
+    mod_freq = 8  # 8 Hz modulation
+    modulation = 0.9 + 0.1 * np.sin(2 * np.pi * mod_freq * t)
+    tone *= modulation
+
+    return to_pcm16(tone)
+
+
+def create_iphone_signal(sample_rate):
+    """Create iPhone Signal-like sound (signal tone)"""
+    duration = 0.6
+    t = np.linspace(0, duration, int(sample_rate * duration), False)
+
+    # Signal: clean, electronic tone with slight frequency modulation
+    base_freq = 1200
+    fm_freq = 4  # 4 Hz FM
+    fm_depth = 50  # Hz
+    fm = fm_depth * np.sin(2 * np.pi * fm_freq * t)
+    tone = np.sin(2 * np.pi * (base_freq + fm) * t)
+
+    # Add harmonics for clarity
+    tone += 0.2 * np.sin(2 * np.pi * base_freq * 2 * t)
+
+    apply_fade(tone, int(0.1 * sample_rate))
+    return to_pcm16(tone)
+
+
+def create_iphone_hillside(sample_rate):
+    """Create iPhone Hillside-like sound (nature-inspired)"""
+    duration = 1.5
+    t = np.linspace(0, duration, int(sample_rate * duration), False)
+
+    # Hillside: nature-inspired, gentle vibrato
+    base_freq = 400
+    vibrato_freq = 6  # 6 Hz vibrato
+    vibrato_depth = 20  # Hz
+    vibrato = vibrato_depth * np.sin(2 * np.pi * vibrato_freq * t)
+    tone = np.sin(2 * np.pi * (base_freq + vibrato) * t)
+
+    # Apply long fade
+    apply_fade(tone, int(0.3 * sample_rate))
+    return to_pcm16(tone)
+
+
+def create_iphone_playtime(sample_rate):
+    """Create iPhone Playtime-like sound (playful tone)"""
+    duration = 0.8
+    t = np.linspace(0, duration, int(sample_rate * duration), False)
+
+    # Playtime: playful tone with a slight pitch bend
+    base_freq = 800
+    bend = np.linspace(1.0, 1.1, len(t))
+    tone = np.sin(2 * np.pi * base_freq * bend * t)
+
+    apply_fade(tone, int(0.1 * sample_rate))
+    return to_pcm16(tone)
+
+
+def create_iphone_sencha(sample_rate):
+    """Create iPhone Sencha-like sound (calm, zen-like)"""
+    duration = 2.0
+    t = np.linspace(0, duration, int(sample_rate * duration), False)
+
+    # Sencha: calm, zen-like tone with very slow vibrato
+    base_freq = 300
+    vibrato_freq = 2  # 2 Hz vibrato
+    vibrato_depth = 10  # Hz
+    vibrato = vibrato_depth * np.sin(2 * np.pi * vibrato_freq * t)
+    tone = np.sin(2 * np.pi * (base_freq + vibrato) * t)
+
+    # Apply very long fade
+    apply_fade(tone, int(0.4 * sample_rate))
+    return to_pcm16(tone)
+
+
+def create_test_chime(sample_rate):
+    """Create the example chime (four harmonics, fixed level)"""
+    duration = 1.0
+    t = np.linspace(0, duration, int(sample_rate * duration), False)
+
+    # Mix multiple frequencies for a chime-like sound
+    tone = (0.4 * np.sin(2 * np.pi * 800 * t) +  # Base frequency
+            0.3 * np.sin(2 * np.pi * 1200 * t) +  # Higher harmonic
+            0.2 * np.sin(2 * np.pi * 1600 * t) +  # Even higher harmonic
+            0.1 * np.sin(2 * np.pi * 2000 * t))   # Highest harmonic
+
+    apply_fade(tone, int(0.1 * sample_rate))
+    return (tone * 16383).astype(np.int16)  # Reduced volume to avoid clipping
+
+
+REFERENCE = {
+    "Default Beep": create_default_beep,
+    "iPhone Radar": create_iphone_radar,
+    "iPhone Beacon": create_iphone_beacon,
+    "iPhone Bulletin": create_iphone_bulletin,
+    "iPhone Signal": create_iphone_signal,
+    "iPhone Hillside": create_iphone_hillside,
+    "iPhone Playtime": create_iphone_playtime,
+    "iPhone Sencha": create_iphone_sencha,
+    "Test Chime": create_test_chime,
+}
+
+
+def measure(render, repeats):
+    """(best seconds, peak traced bytes) for a render callable"""
+    render()  # warm up (and let the graph renderer size its scratch buffers)
+    tracemalloc.start()
+    render()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    best = float('inf')
+    for _ in range(repeats):
+        start = time.perf_counter()
+        render()
+        best = min(best, time.perf_counter() - start)
+    return best, peak
+
+
+def main():
+    sample_rate = int(sys.argv[1]) if len(sys.argv) > 1 else sounds.SAMPLE_RATE
+    repeats = int(sys.argv[2]) if len(sys.argv) > 2 else 20
+
+    print(f"{'preset':<16} {'old ms':>8} {'new ms':>8} {'old peak':>9} {'new peak':>9} "
+          f"{'(scratch)':>9} {'max diff':>9}")
+    for name, reference in REFERENCE.items():
+        sound = sounds.PRESETS.get(name) or sounds.EXTRAS[name]
+        renderer = dsp.Renderer(sample_rate)
+        buffer_bytes = int(sample_rate * sound['duration']) * 8
+
+        old_time, old_peak = measure(lambda: reference(sample_rate), repeats)
+        new_time, new_peak = measure(lambda: renderer.render(sound), repeats)
+        diff = np.max(np.abs(reference(sample_rate).astype(np.int32) - renderer.render(sound)))
+
+        scratch = renderer.scratch_bytes()
+        print(f"{name:<16} {old_time * 1000:8.2f} {new_time * 1000:8.2f} "
+              f"{old_peak / buffer_bytes:8.1f}x {(new_peak + scratch) / buffer_bytes:8.2f}x "
+              f"{scratch / buffer_bytes:8.2f}x {diff:9d}")
+    print("(peak = largest traced allocation during one warm render, in float64 output buffers;\n"
+          " the graph renderer's also counts the scratch arrays it keeps between renders)")
+
+
+if __name__ == '__main__':
+    main()
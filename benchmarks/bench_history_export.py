@@ -0,0 +1,116 @@
+#!/usr/bin/env python3
+"""
+Throughput and memory of streaming history exports.
+
+Builds (once, and reuses) a history database with many sessions spread
+over ten years for a few hundred users, then exports it in each format,
+with and without gzip, plus one user's last year through the
+(user, start) index. Every export runs in a fresh child process that
+writes to a byte-counting sink; the child's peak RSS is read with
+wait4(), and compared with a child that only opens the database.
+
+Usage: python benchmarks/bench_history_export.py [rows] [database]
+"""
+
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+sys.path.insert(0, ROOT)
+
+import history
+
+YEARS = 10
+USERS = 300
+
+CHILD = """
+import sys, time
+sys.path.insert(0, {root!r})
+import history
+start = time.perf_counter()
+size = 0
+if {fmt!r}:
+    for chunk in history.export({fmt!r}, {start}, {end}, {user!r}, {compress}, {db!r}):
+        size += len(chunk)
+else:
+    history.connect({db!r}).close()
+print(size, time.perf_counter() - start)
+"""
+
+
+def build(path, rows):
+    connection = history.connect(path)
+    existing = connection.execute('SELECT COUNT(*) FROM sessions').fetchone()[0]
+    if existing >= rows:
+        connection.close()
+        return existing, 0.0
+    print(f"Building {rows:,} rows in {path} ...")
+    start = time.perf_counter()
+    connection.execute('DELETE FROM sessions')
+    connection.execute('DROP INDEX IF EXISTS sessions_start')
+    connection.execute('DROP INDEX IF EXISTS sessions_user_start')
+    rng = random.Random(1)
+    first = time.time() - YEARS * 365 * 86400
+    step = YEARS * 365 * 86400 / rows
+    sounds_ = ['Default Beep', 'iPhone Radar', 'iPhone Beacon', 'iPhone Sencha']
+
+    def generate():
+        for i in range(rows):
+            planned = rng.choice((1500, 1800, 3600, 5400))
+            begin = first + i * step
+            yield (f'user{rng.randrange(USERS)}', begin, begin + planned, planned,
+                   planned // 240, sounds_[i % 4], 'complete' if i % 7 else 'stopped')
+
+    with connection:
+        connection.executemany(
+            'INSERT INTO sessions (user, start, finish, planned, alarms, sound, outcome) '
+            'VALUES (?, ?, ?, ?, ?, ?, ?)', generate())
+    connection.executescript(history.SCHEMA)  # recreate the indexes
+    connection.close()
+    return rows, time.perf_counter() - start
+
+
+def run_child(db, fmt='', compress=False, start=None, end=None, user=None):
+    code = CHILD.format(root=ROOT, fmt=fmt, compress=compress, start=start, end=end, user=user, db=db)
+    process = subprocess.Popen([sys.executable, '-c', code], stdout=subprocess.PIPE)
+    output = process.stdout.read()
+    _, _, usage = os.wait4(process.pid, 0)
+    size, seconds = output.split()
+    # ru_maxrss is in KiB on Linux, bytes on macOS
+    rss = usage.ru_maxrss / (1 << 20 if sys.platform == 'darwin' else 1 << 10)
+    return int(size), float(seconds), rss
+
+
+def main():
+    rows = int(sys.argv[1]) if len(sys.argv) > 1 else 10_000_000
+    db = sys.argv[2] if len(sys.argv) > 2 else os.path.join(tempfile.gettempdir(), f'focus-history-{rows}.db')
+    rows, build_seconds = build(db, rows)
+    if build_seconds:
+        print(f"built in {build_seconds:.1f}s ({os.path.getsize(db) / 1e6:.0f} MB)")
+
+    _, _, base_rss = run_child(db)
+    print(f"\n{rows:,} rows; baseline child RSS {base_rss:.1f} MB")
+    print(f"{'export':<22} {'output':>10} {'time':>8} {'MB/s':>8} {'rows/s':>11} {'peak RSS':>10}")
+    year_ago = time.time() - 365 * 86400
+    cases = [
+        ("ndjson", dict(fmt='ndjson')),
+        ("csv", dict(fmt='csv')),
+        ("ndjson + gzip", dict(fmt='ndjson', compress=True)),
+        ("csv + gzip", dict(fmt='csv', compress=True)),
+        ("1 user, last year", dict(fmt='ndjson', user='user7', start=year_ago)),
+    ]
+    for label, options in cases:
+        size, seconds, rss = run_child(db, **options)
+        exported = rows if 'user' not in options else None
+        rate = f"{exported / seconds:11,.0f}" if exported else f"{'':>11}"
+        print(f"{label:<22} {size / 1e6:8.2f}MB {seconds:7.2f}s {size / 1e6 / seconds:8.1f} {rate} "
+              f"{rss:8.1f}MB")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,164 @@
+#!/usr/bin/env python3
+"""
+Config hot reload: what gets re-rendered, and how fast it lands.
+
+Runs a ConfigWatcher over a temporary config file and a real sound bank
+and checks a series of partial edits, each against the number of
+presets it must re-render:
+
+    one preset changed            1
+    two presets and intervals     2
+    file rewritten unchanged      0
+    keys reordered, reformatted   0
+    one preset entry removed      0  (back to the bank's sound)
+    invalid JSON                  0  (ignored, last good config kept)
+
+Presets that did not change must keep the very same PCM object. Then
+the watcher runs on its thread (polling every 50 ms) while a reader
+thread looks sounds up continuously; reports edit-to-swap latency and
+checks the reader only ever saw complete old or new sounds. A full
+re-render of every preset (what a restart costs) is timed for
+comparison.
+
+Usage: python benchmarks/bench_live_config.py [edits]
+"""
+
+import json
+import os
+import shutil
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+import live_config
+import sounds
+from sound_bank import SoundBank
+
+
+def write(path, config, indent=None, sort_keys=False):
+    # Keep the mtime moving even when edits land within the clock's granularity
+    previous = os.stat(path).st_mtime_ns if os.path.exists(path) else 0
+    with open(path + '.tmp', 'w') as f:
+        json.dump(config, f, indent=indent, sort_keys=sort_keys)
+    os.replace(path + '.tmp', path)
+    if os.stat(path).st_mtime_ns <= previous:
+        os.utime(path, ns=(previous + 1000, previous + 1000))
+
+
+def radar(freq):
+    return dict(sounds.IPHONE_RADAR, voices=[{'freq': freq}])
+
+
+def partial_changes(directory, bank):
+    path = os.path.join(directory, 'config.json')
+    table = live_config.SoundTable(bank)
+    watcher = live_config.ConfigWatcher(path, bank.sample_rate('Default Beep'),
+                                        on_reload=lambda overrides, intervals, report: table.swap(overrides))
+    base = {'min_interval': 120, 'max_interval': 240,
+            'presets': {'iPhone Radar': radar(900), 'iPhone Sencha': {'frequencies': [330], 'duration': 1.0}}}
+    write(path, base)
+    watcher.check()
+    results = []
+
+    def step(label, expected, config=None, raw=None, **options):
+        before = dict(table.overrides)
+        if raw is not None:
+            with open(path, 'w') as f:
+                f.write(raw)
+        elif config is not None:
+            write(path, config, **options)
+        report = watcher.check() or {'rendered': [], 'changed': []}
+        kept = all(table.overrides.get(name) is pcm for name, pcm in before.items()
+                   if name not in report['changed'])
+        ok = len(report['rendered']) == expected and kept
+        results.append(ok)
+        print(f"  {label:<32} rendered {len(report['rendered'])} (expected {expected}), "
+              f"others kept: {kept}{'' if ok else '  FAILED'}")
+
+    one = dict(base, presets=dict(base['presets'], **{'iPhone Radar': radar(950)}))
+    step("one preset changed", 1, one)
+    two = dict(one, min_interval=60, presets=dict(one['presets'], **{
+        'iPhone Beacon': {'preset': 'iPhone Signal'},
+        'iPhone Sencha': {'frequencies': [300], 'duration': 1.0}}))
+    step("two presets and intervals", 2, two)
+    interval_ok = watcher.intervals == (60.0, 240.0)
+    step("file rewritten unchanged", 0, two)
+    step("keys reordered, reformatted", 0, two, indent=4, sort_keys=True)
+    removed = dict(two, presets={k: v for k, v in two['presets'].items() if k != 'iPhone Beacon'})
+    step("one preset entry removed", 0, removed)
+    restored = table.get('iPhone Beacon') is not None and 'iPhone Beacon' not in table.overrides
+    step("invalid JSON", 0, raw='{"presets": ')
+    print(f"  intervals applied: {interval_ok}, removed preset back to bank: {restored}, "
+          f"{watcher.reloads} reloads, {watcher.renders} renders")
+    return all(results) and interval_ok and restored
+
+
+def live(directory, bank, edits):
+    path = os.path.join(directory, 'live.json')
+    table = live_config.SoundTable(bank)
+    swapped = threading.Event()
+
+    installed = []  # every rendered sound handed to the table
+    swaps = []
+    seen_bad = []
+    done = threading.Event()
+
+    def on_reload(overrides, intervals, report):
+        installed.append(overrides['iPhone Radar'])
+        table.swap(overrides)
+        swaps.append(time.perf_counter())
+        swapped.set()
+
+    def reader():
+        while not done.is_set():
+            swapped_before = len(swaps)
+            pcm = table.get('iPhone Radar')
+            # One complete render, or the bank's sound while nothing was swapped in yet
+            if swapped_before and not any(pcm is p for p in installed):
+                seen_bad.append(pcm)
+
+    watcher = live_config.ConfigWatcher(path, bank.sample_rate('Default Beep'), on_reload=on_reload,
+                                        poll_seconds=0.05)
+    watcher.start()
+    thread = threading.Thread(target=reader)
+    thread.start()
+    latencies = []
+    for i in range(edits):
+        swapped.clear()
+        start = time.perf_counter()
+        write(path, {'presets': {'iPhone Radar': radar(700 + 10 * i)}})
+        swapped.wait(5)
+        latencies.append(time.perf_counter() - start)
+    done.set()
+    thread.join()
+    watcher.close()
+    latencies.sort()
+    print(f"\nlive edits       {edits} edits, edit-to-swap p50 {latencies[len(latencies) // 2] * 1000:.0f} ms, "
+          f"max {latencies[-1] * 1000:.0f} ms (50 ms polling), 1 render each; "
+          f"reader saw {len(seen_bad)} torn/unknown sounds")
+    return not seen_bad and watcher.renders == edits
+
+
+def main():
+    edits = int(sys.argv[1]) if len(sys.argv) > 1 else 20
+    directory = tempfile.mkdtemp(prefix='live-config-bench-')
+    bank = SoundBank.open(directory=directory)
+    try:
+        print("partial changes")
+        ok = partial_changes(directory, bank)
+        ok = live(directory, bank, edits) and ok
+        start = time.perf_counter()
+        sounds.render_all(bank.sample_rate('Default Beep'))
+        print(f"full re-render   {(time.perf_counter() - start) * 1000:.0f} ms for all "
+              f"{len(sounds.PRESETS)} presets (what a restart re-renders)")
+    finally:
+        bank.close()
+        shutil.rmtree(directory)
+    return 0 if ok else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
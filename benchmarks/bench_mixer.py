@@ -0,0 +1,95 @@
+#!/usr/bin/env python3
+"""
+Headless checks and throughput for the software mixer.
+
+* Start times: schedules short clicks at random frames (across block
+  boundaries, overlapping) and checks each one starts on exactly the
+  scheduled frame in the rendered buffer.
+* Overlap and limiting: many full-scale alarms at once must all be heard,
+  never wrap around int16 and never peak above the limiter ceiling.
+* Throughput: blocks mixed per second with a growing number of voices.
+* Real time: streams for a couple of seconds into a paced sink and
+  reports underruns.
+
+Usage: python benchmarks/bench_mixer.py
+"""
+
+import os
+import random
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+import sounds
+from mixer import LIMIT, Mixer
+
+SAMPLE_RATE = sounds.SAMPLE_RATE
+
+
+def check_start_times(count=200):
+    mixer = Mixer(SAMPLE_RATE, block_size=512)
+    click = np.zeros(64, dtype=np.int16)
+    click[0] = 1000
+    # Distinct frames, at least one click apart so onsets don't merge
+    frames = sorted(random.sample(range(0, SAMPLE_RATE * 10, 64), count))
+    for frame in frames:
+        mixer.play(click, at=frame)
+    out = mixer.render(SAMPLE_RATE * 10 + 1024)
+    onsets = list(np.flatnonzero(out))
+    return onsets == frames, len(onsets), count
+
+
+def check_overlap(count=20):
+    mixer = Mixer(SAMPLE_RATE)
+    radar = sounds.render("iPhone Radar")
+    for i in range(count):
+        mixer.play(radar, gain=2.0, at=i * 50)
+    out = mixer.render(len(radar) + count * 50)
+    wrapped = bool(np.any(np.diff(out.astype(np.int32)) > 60000))
+    return int(np.max(np.abs(out.astype(np.int32)))), mixer.limited_blocks, wrapped
+
+
+def throughput(voices, blocks=2000):
+    mixer = Mixer(SAMPLE_RATE)
+    sencha = sounds.render("iPhone Sencha")
+    for i in range(voices):
+        mixer.play(np.tile(sencha, 20), at=i * 100)
+    start = time.perf_counter()
+    for _ in range(blocks):
+        mixer.render_block()
+    elapsed = time.perf_counter() - start
+    return blocks / elapsed, blocks * mixer.block_size / SAMPLE_RATE / elapsed
+
+
+def realtime(seconds=2.0):
+    mixer = Mixer(SAMPLE_RATE)
+    written = []
+    mixer.start(lambda block: written.append(len(block)), paced=True)
+    beep = sounds.render("Default Beep")
+    for i in range(int(seconds * 4)):
+        mixer.play(beep)
+        time.sleep(0.25)
+    mixer.stop()
+    return mixer.stats(), sum(written) / SAMPLE_RATE
+
+
+def main():
+    ok, found, expected = check_start_times()
+    print(f"start times      {'exact' if ok else 'MISMATCH'} ({found}/{expected} clicks)")
+    peak, limited, wrapped = check_overlap()
+    print(f"20 overlapping   peak {peak} (limit {LIMIT}), limiter engaged on {limited} blocks, "
+          f"{'WRAPPED' if wrapped else 'no wraparound'}")
+    for voices in (1, 8, 32, 128):
+        blocks_per_s, realtime_factor = throughput(voices)
+        print(f"{voices:4d} voices      {blocks_per_s:9.0f} blocks/s  ({realtime_factor:6.0f}x real time)")
+    stats, streamed = realtime()
+    print(f"real time        streamed {streamed:.2f} s, {stats['underruns']} underruns, "
+          f"{stats['blocks']} blocks mixed")
+    return 0 if ok and not wrapped and peak <= LIMIT else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+"""
+Benchmark the persistent player against spawning a player per alarm.
+
+A local stand-in sink (default: cat, which just drains stdin) plays the
+part of aplay/paplay so the numbers measure process and pipe overhead,
+not the audio device. Reports per-alarm latency and the CPU time used by
+this process plus its children for each approach, then kills the
+persistent player mid-run to show supervision restarting it.
+
+Usage: python benchmarks/bench_player.py [alarms] [sink command...]
+"""
+
+import os
+import resource
+import subprocess
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from player import PlayerProcess
+from sound_bank import SoundBank
+
+
+def cpu_seconds():
+    own = resource.getrusage(resource.RUSAGE_SELF)
+    children = resource.getrusage(resource.RUSAGE_CHILDREN)
+    return own.ru_utime + own.ru_stime + children.ru_utime + children.ru_stime
+
+
+def percentile(values, pct):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * pct / 100))]
+
+
+def report(label, latencies, cpu):
+    print(f"{label:<22} p50 {percentile(latencies, 50) * 1000:7.2f} ms   "
+          f"p99 {percentile(latencies, 99) * 1000:7.2f} ms   "
+          f"CPU {cpu / len(latencies) * 1000:6.2f} ms/alarm")
+
+
+def main():
+    alarms = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    sink = sys.argv[2:] or ['cat']
+    bank = SoundBank.open()
+    names = bank.names()
+
+    # One process per alarm, as play_system_sound_bluetooth does today
+    latencies = []
+    cpu_start = cpu_seconds()
+    for i in range(alarms):
+        start = time.perf_counter()
+        subprocess.run(sink, input=bank.get(names[i % len(names)]).tobytes(),
+                       stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        latencies.append(time.perf_counter() - start)
+    report("spawn per alarm", latencies, cpu_seconds() - cpu_start)
+
+    # One warm player fed over a pipe
+    player = PlayerProcess(sink, 'pcm', bank)
+    player.start()
+    latencies = []
+    cpu_start = cpu_seconds()
+    for i in range(alarms):
+        start = time.perf_counter()
+        player.play(names[i % len(names)])
+        player.flush()
+        latencies.append(time.perf_counter() - start)
+    player.close()
+    report("persistent player", latencies, cpu_seconds() - cpu_start)
+
+    # Supervision: kill the player and check the next alarm restarts it
+    player = PlayerProcess(sink, 'pcm', bank)
+    player.start()
+    first_pid = player.process.pid
+    player.process.kill()
+    player.process.wait()
+    player.play(names[0])
+    player.flush()
+    print(f"restart after kill     {'ok' if player.alive() and player.process.pid != first_pid else 'FAILED'}"
+          f" ({len(player.restarts)} restart)")
+    player.close()
+    bank.close()
+
+
+if __name__ == '__main__':
+    main()
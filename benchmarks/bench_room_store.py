@@ -0,0 +1,240 @@
+#!/usr/bin/env python3
+"""
+Focus rooms across several gunicorn workers sharing a SQLite room store.
+
+For each worker count, starts gunicorn (gevent workers) with
+FOCUS_ALARM_ROOM_STORE pointing at a fresh database, then:
+
+* Consistency: creates rooms with a fast schedule (1-1.5 s intervals)
+  and connects several SSE listeners to each, every one on its own
+  connection (so they land on different workers). Every listener of a
+  room must receive the same alarms, in order, and the completion.
+* Stop: stops a room through one connection and polls its state through
+  fresh connections until every one reports it stopped.
+* Reads: client processes with keep-alive connections GET room state as
+  fast as they can; reports reads/s (the read-through cache keeps these
+  off the database).
+* Failover (largest worker count only): kills the worker holding the
+  scheduler lease and measures how long until another worker fires the
+  room's next alarm.
+
+Read throughput can only grow with workers while there are idle cores to
+run them; the report shows the core count next to the scaling.
+
+Usage: python benchmarks/bench_room_store.py [max workers] [read seconds]
+"""
+
+import asyncio
+import http.client
+import json
+import multiprocessing
+import os
+import signal
+import socket
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+ROOMS = 8
+LISTENERS_PER_ROOM = 4
+CLIENTS = 4
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+def start_server(port, workers, database):
+    command = [sys.executable, '-m', 'gunicorn', '--worker-class', 'gevent', '--workers', str(workers),
+               '--worker-connections', '10000', '--bind', f'127.0.0.1:{port}',
+               '--log-level', 'warning', 'app:app']
+    # All clients share one address; admission control is measured by bench_admission.py
+    env = dict(os.environ, FOCUS_ALARM_ROOM_STORE=database, FOCUS_ALARM_ADMISSION='off',
+               FOCUS_ALARM_HISTORY=os.path.join(os.path.dirname(database), 'history.db'))
+    server = subprocess.Popen(command, cwd=ROOT, env=env, stdout=subprocess.DEVNULL)
+    for _ in range(100):
+        try:
+            with socket.create_connection(('127.0.0.1', port), timeout=0.1):
+                time.sleep(0.5 * workers)  # let every worker boot
+                return server
+        except OSError:
+            time.sleep(0.1)
+    server.kill()
+    raise RuntimeError("server did not start")
+
+
+def request(port, method, path, body=None):
+    connection = http.client.HTTPConnection('127.0.0.1', port, timeout=10)
+    try:
+        connection.request(method, path, body=json.dumps(body) if body else None,
+                           headers={'Content-Type': 'application/json'})
+        response = connection.getresponse()
+        return response.status, json.loads(response.read() or b'null')
+    finally:
+        connection.close()
+
+
+def create_room(port, seconds):
+    status, state = request(port, 'POST', '/rooms',
+                            {'minutes': seconds / 60, 'min_interval': 1, 'max_interval': 1.5})
+    assert status == 201, status
+    return state
+
+
+async def listen(port, room_id):
+    """Events (name, alarm index) seen by one SSE listener until the stream ends"""
+    reader, writer = await asyncio.open_connection('127.0.0.1', port)
+    writer.write(f'GET /rooms/{room_id}/events HTTP/1.1\r\nHost: localhost\r\n\r\n'.encode())
+    await writer.drain()
+    events, event = [], None
+    try:
+        while True:
+            line = await asyncio.wait_for(reader.readline(), 30)
+            if not line:
+                break
+            line = line.strip()
+            if line.startswith(b'event: '):
+                event = line[7:].decode()
+            elif line.startswith(b'data: ') and event != 'state':
+                events.append((event, json.loads(line[6:]).get('index')))
+                if event in ('complete', 'stopped'):
+                    break
+    except asyncio.TimeoutError:
+        events.append(('timeout', None))
+    writer.close()
+    return events
+
+
+async def consistency(port):
+    rooms = [create_room(port, 5) for _ in range(ROOMS)]
+    tasks = [[asyncio.ensure_future(listen(port, room['room'])) for _ in range(LISTENERS_PER_ROOM)]
+             for room in rooms]
+    consistent = 0
+    for room, listeners in zip(rooms, tasks):
+        seen = [await task for task in listeners]
+        complete = seen[0] and seen[0][-1][0] == 'complete'
+        if complete and all(events == seen[0] for events in seen):
+            consistent += 1
+        else:
+            print(f"  room {room['room']} diverged: {seen}")
+    return consistent
+
+
+def stop_propagation(port, probes=20):
+    room = create_room(port, 60)
+    start = time.perf_counter()
+    status, state = request(port, 'DELETE', f"/rooms/{room['room']}")
+    assert status == 200 and state['finished'] == 'stopped', state
+    while True:
+        states = [request(port, 'GET', f"/rooms/{room['room']}")[1] for _ in range(probes)]
+        if all(state['finished'] == 'stopped' for state in states):
+            return time.perf_counter() - start
+        if time.perf_counter() - start > 5:
+            return None
+
+
+def reader(port, room_id, seconds, results):
+    connection = http.client.HTTPConnection('127.0.0.1', port)
+    count = 0
+    deadline = time.perf_counter() + seconds
+    while time.perf_counter() < deadline:
+        connection.request('GET', f'/rooms/{room_id}')
+        response = connection.getresponse()
+        response.read()
+        count += response.status == 200
+    results.put(count)
+
+
+def read_throughput(port, seconds):
+    room = create_room(port, 600)
+    results = multiprocessing.Queue()
+    clients = [multiprocessing.Process(target=reader, args=(port, room['room'], seconds, results))
+               for _ in range(CLIENTS)]
+    for client in clients:
+        client.start()
+    total = sum(results.get() for _ in clients)
+    for client in clients:
+        client.join()
+    return total / seconds
+
+
+def leader_pid(database):
+    connection = sqlite3.connect(database)
+    try:
+        owner, = connection.execute("SELECT owner FROM leases WHERE name = 'scheduler'").fetchone()
+    finally:
+        connection.close()
+    return int(owner.split('-')[-2])
+
+
+def alarms_fired(database, room_id):
+    connection = sqlite3.connect(database)
+    try:
+        return connection.execute('SELECT next_alarm FROM rooms WHERE id = ?', (room_id,)).fetchone()[0]
+    finally:
+        connection.close()
+
+
+def failover(port, database):
+    room = create_room(port, 120)
+    time.sleep(2)
+    pid = leader_pid(database)
+    before = alarms_fired(database, room['room'])
+    killed = time.perf_counter()
+    os.kill(pid, signal.SIGKILL)
+    while time.perf_counter() - killed < 20:
+        if alarms_fired(database, room['room']) > before:
+            return pid, leader_pid(database), time.perf_counter() - killed
+        time.sleep(0.05)
+    return pid, None, None
+
+
+def run(workers, seconds, failover_test):
+    directory = tempfile.mkdtemp(prefix='room-store-bench-')
+    database = os.path.join(directory, 'rooms.db')
+    port = free_port()
+    server = start_server(port, workers, database)
+    try:
+        consistent = asyncio.run(consistency(port))
+        stop_seconds = stop_propagation(port)
+        reads = read_throughput(port, seconds)
+        takeover = failover(port, database) if failover_test else None
+    finally:
+        server.terminate()
+        server.wait()
+    return consistent, stop_seconds, reads, takeover
+
+
+def main():
+    max_workers = int(sys.argv[1]) if len(sys.argv) > 1 else 4
+    seconds = float(sys.argv[2]) if len(sys.argv) > 2 else 3
+    counts = [n for n in (1, 2, 4, 8) if n <= max_workers]
+    print(f"{os.cpu_count()} CPU core(s); {ROOMS} rooms x {LISTENERS_PER_ROOM} listeners, "
+          f"{CLIENTS} reader processes\n")
+    print(f"{'workers':>7} {'consistent':>11} {'stop seen':>10} {'reads/s':>9} {'scaling':>8}")
+    ok = True
+    base = None
+    for workers in counts:
+        consistent, stop_seconds, reads, takeover = run(workers, seconds, workers == counts[-1] and workers > 1)
+        base = base or reads
+        stop = f"{stop_seconds * 1000:8.0f}ms" if stop_seconds is not None else f"{'never':>10}"
+        print(f"{workers:7} {consistent:>5}/{ROOMS:<5} {stop} {reads:9,.0f} {reads / base:7.2f}x")
+        ok = ok and consistent == ROOMS and stop_seconds is not None
+        if takeover:
+            old, new, gap = takeover
+            if new is None:
+                print(f"\nfailover: no alarm fired after killing leader {old}")
+                ok = False
+            else:
+                print(f"\nfailover: killed leader {old}; worker {new} fired the next alarm "
+                      f"{gap:.1f} s later")
+    return 0 if ok else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,148 @@
+#!/usr/bin/env python3
+"""
+Load test for focus room fan-out.
+
+Starts the app in a separate process (gunicorn with one gevent worker,
+as in the Procfile, or Flask's threaded server if gunicorn/gevent are not
+installed), creates a room with a fast schedule (1-1.5 s intervals) and
+connects many SSE listeners from one asyncio client. Some listeners are
+deliberately slow readers to exercise backpressure.
+
+For every alarm each listener records the delay between the server
+stamping the event ("sent") and the client reading it. Reports p50/p99
+fan-out latency for normal listeners, events received and dropped
+connections.
+
+Usage: python benchmarks/bench_rooms.py [listeners] [seconds]
+"""
+
+import asyncio
+import json
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import time
+import urllib.request
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+SLOW_FRACTION = 0.02
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+def start_server(port):
+    try:
+        import gevent, gunicorn  # noqa: F401
+        command = [sys.executable, '-m', 'gunicorn', '--worker-class', 'gevent', '--workers', '1',
+                   '--worker-connections', '20000', '--bind', f'127.0.0.1:{port}',
+                   '--log-level', 'warning', 'app:app']
+        kind = 'gunicorn/gevent'
+    except ImportError:
+        command = [sys.executable, '-c',
+                   f"import logging, app; logging.getLogger('werkzeug').setLevel(logging.ERROR); "
+                   f"app.app.run(host='127.0.0.1', port={port}, threaded=True)"]
+        kind = 'flask threaded'
+    # Thousands of listeners from one address: measure fan-out, not admission control
+    env = dict(os.environ, FOCUS_ALARM_ADMISSION='off')
+    server = subprocess.Popen(command, cwd=ROOT, env=env, stdout=subprocess.DEVNULL)
+    for _ in range(100):
+        try:
+            with socket.create_connection(('127.0.0.1', port), timeout=0.1):
+                return server, kind
+        except OSError:
+            time.sleep(0.1)
+    server.kill()
+    raise RuntimeError("server did not start")
+
+
+def create_room(port, seconds):
+    body = json.dumps({'minutes': seconds / 60, 'min_interval': 1, 'max_interval': 1.5}).encode()
+    request = urllib.request.Request(f'http://127.0.0.1:{port}/rooms', data=body, method='POST',
+                                     headers={'Content-Type': 'application/json'})
+    with urllib.request.urlopen(request) as response:
+        return json.load(response)
+
+
+async def listen(port, room_id, latencies, stats, slow):
+    try:
+        reader, writer = await asyncio.open_connection('127.0.0.1', port, limit=1 << 20)
+    except OSError:
+        stats['failed'] += 1
+        return
+    writer.write(f'GET /rooms/{room_id}/events HTTP/1.1\r\nHost: localhost\r\n'
+                 f'Accept: text/event-stream\r\n\r\n'.encode())
+    await writer.drain()
+    stats['connected'] += 1
+    event = None
+    try:
+        while True:
+            if slow:
+                # Read rarely so the server-side socket buffer backs up
+                await asyncio.sleep(0.5)
+            line = await reader.readline()
+            if not line:
+                break
+            line = line.strip()
+            if line.startswith(b'event: '):
+                event = line[7:].decode()
+            elif line.startswith(b'data: ') and event in ('alarm', 'complete', 'stopped'):
+                data = json.loads(line[6:])
+                if event == 'alarm':
+                    stats['alarms'] += 1
+                    if not slow:
+                        latencies.append(time.time() - data['sent'])
+                else:
+                    stats['finished'] += 1
+                    break
+    except (ConnectionError, asyncio.IncompleteReadError):
+        stats['dropped'] += 1
+    finally:
+        writer.close()
+
+
+async def run(port, room_id, listeners):
+    latencies = []
+    stats = dict(connected=0, failed=0, alarms=0, finished=0, dropped=0)
+    tasks = []
+    for i in range(listeners):
+        slow = i < listeners * SLOW_FRACTION
+        tasks.append(asyncio.create_task(listen(port, room_id, latencies, stats, slow)))
+        if i % 200 == 199:
+            await asyncio.sleep(0.05)  # don't overflow the listen backlog
+    await asyncio.gather(*tasks)
+    return latencies, stats
+
+
+def main():
+    listeners = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    seconds = float(sys.argv[2]) if len(sys.argv) > 2 else 20
+    port = free_port()
+    server, kind = start_server(port)
+    try:
+        room = create_room(port, seconds)
+        print(f"{kind} server, room {room['room']}: {listeners} listeners, "
+              f"{seconds:g} s session")
+        latencies, stats = asyncio.run(run(port, room['room'], listeners))
+    finally:
+        server.terminate()
+        server.wait()
+
+    print(f"connected {stats['connected']}, failed {stats['failed']}, dropped {stats['dropped']}, "
+          f"saw completion {stats['finished']}")
+    print(f"alarm deliveries {stats['alarms']}")
+    if latencies:
+        latencies.sort()
+        p99 = latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))]
+        print(f"fan-out latency  p50 {statistics.median(latencies) * 1000:.1f} ms  "
+              f"p99 {p99 * 1000:.1f} ms  max {latencies[-1] * 1000:.1f} ms")
+    return 0 if stats['finished'] == stats['connected'] and not stats['failed'] else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
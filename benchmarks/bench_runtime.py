@@ -0,0 +1,120 @@
+#!/usr/bin/env python3
+"""
+Many concurrent sessions: the asyncio runtime against threads.
+
+Runs the same sessions (same seeds, 1-2 s alarm intervals, a display tick
+every second) in two ways, each in a fresh child process:
+
+* threads: the previous design, a timer thread and a sound thread per
+  session, both polling with one-second sleeps;
+* runtime: runtime.SessionRuntime, every session's alarms and ticks as
+  timers on one event loop.
+
+Reports alarms fired and how late they were, CPU time, voluntary and
+involuntary context switches (getrusage) and peak RSS (wait4).
+
+Usage: python benchmarks/bench_runtime.py [sessions] [seconds]
+"""
+
+import os
+import subprocess
+import sys
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+sys.path.insert(0, ROOT)
+
+CHILD = """
+import sys, threading, time, resource
+sys.path.insert(0, {root!r})
+import session_state
+sessions, seconds, design = {sessions}, {seconds}, {design!r}
+late = []
+
+def on_alarm(due):
+    late.append(time.time() - due)
+
+start = time.time()
+if design == 'threads':
+    def timer_loop(deadline):
+        while time.time() < deadline:
+            remaining = max(0, int(deadline - time.time()))
+            time_str = f"{{remaining // 3600:02d}}:{{remaining % 3600 // 60:02d}}:{{remaining % 60:02d}}"
+            time.sleep(1)
+
+    def sound_loop(seed, deadline):
+        for due in session_state.alarm_times(seed, start, deadline, 1, 2):
+            while time.time() < due:
+                time.sleep(min(1, due - time.time()))
+            on_alarm(due)
+
+    threads = []
+    for seed in range(sessions):
+        deadline = start + seconds
+        threads += [threading.Thread(target=timer_loop, args=(deadline,), daemon=True),
+                    threading.Thread(target=sound_loop, args=(seed, deadline), daemon=True)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+else:
+    import asyncio
+    from runtime import SessionRuntime
+
+    async def run():
+        done = asyncio.Event()
+
+        def on_event(session, event, data):
+            if event == 'alarm':
+                on_alarm(data['due'])
+            elif event == 'tick':
+                remaining = data['remaining']
+                time_str = f"{{remaining // 3600:02d}}:{{remaining % 3600 // 60:02d}}:{{remaining % 60:02d}}"
+            elif event == 'complete' and not runtime.sessions:
+                done.set()
+
+        runtime = SessionRuntime(on_event=on_event).attach()
+        for seed in range(sessions):
+            runtime.start_session(seconds, 'bench', seed=seed, start=start, ticks=True,
+                                  min_interval=1, max_interval=2)
+        await done.wait()
+
+    asyncio.run(run())
+
+usage = resource.getrusage(resource.RUSAGE_SELF)
+late.sort()
+print(len(late), late[len(late) // 2] * 1000, late[-1] * 1000,
+      usage.ru_utime + usage.ru_stime, usage.ru_nvcsw, usage.ru_nivcsw)
+"""
+
+
+def run_child(design, sessions, seconds):
+    code = CHILD.format(root=ROOT, sessions=sessions, seconds=seconds, design=design)
+    process = subprocess.Popen([sys.executable, '-c', code], stdout=subprocess.PIPE)
+    output = process.stdout.read()
+    _, status, usage = os.wait4(process.pid, 0)
+    if status:
+        raise RuntimeError(f"{design} child failed")
+    alarms, p50, worst, cpu, voluntary, involuntary = output.split()
+    # ru_maxrss is in KiB on Linux, bytes on macOS
+    rss = usage.ru_maxrss / (1 << 20 if sys.platform == 'darwin' else 1 << 10)
+    return int(alarms), float(p50), float(worst), float(cpu), int(voluntary), int(involuntary), rss
+
+
+def main():
+    sessions = int(sys.argv[1]) if len(sys.argv) > 1 else 1000
+    seconds = int(sys.argv[2]) if len(sys.argv) > 2 else 10
+    print(f"{sessions} sessions of {seconds} s, alarms every 1-2 s, ticks every 1 s\n")
+    print(f"{'design':<9} {'alarms':>7} {'late p50':>9} {'late max':>9} {'CPU':>7} "
+          f"{'vol. cs':>9} {'invol. cs':>10} {'peak RSS':>9}")
+    results = {}
+    for design in ('threads', 'runtime'):
+        results[design] = result = run_child(design, sessions, seconds)
+        alarms, p50, worst, cpu, voluntary, involuntary, rss = result
+        print(f"{design:<9} {alarms:7} {p50:7.1f}ms {worst:7.1f}ms {cpu:6.2f}s "
+              f"{voluntary:9,} {involuntary:10,} {rss:7.1f}MB")
+    # Both designs walk the same schedules, so they must fire the same alarms
+    return 0 if results['threads'][0] == results['runtime'][0] else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,89 @@
+#!/usr/bin/env python3
+"""
+Speed and agreement check for the schedule simulator.
+
+* Agreement: simulates sessions with schedule_sim.simulate() and with the
+  app's own per-alarm generator (session_state.alarm_times) and checks
+  the mean of every metric agrees within a small tolerance.
+* Throughput: time to simulate and summarize 1M sessions of 25-120 min.
+* Memory: with a 1 s minimum interval (rooms accept intervals that
+  short) each session needs 180 times the columns of the defaults, and
+  the peak traced memory must still stay within the chunk budget.
+
+Usage: python benchmarks/bench_schedule_sim.py [sessions]
+"""
+
+import os
+import sys
+import time
+import tracemalloc
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+import schedule_sim
+import session_state
+
+TOLERANCE = 0.02  # relative difference of means
+
+
+def reference(lengths, seed=0):
+    """The same metrics, one session and one alarm at a time"""
+    results = {metric: [] for metric in schedule_sim.METRICS}
+    for i, length in enumerate(lengths):
+        alarms = list(session_state.alarm_times(seed + i, 0.0, float(length)))
+        sounds = [0.0] + alarms + [float(length)]
+        results['alarms'].append(len(alarms))
+        results['longest_gap'].append(max(np.diff(sounds)))
+        results['tail'].append(length - (alarms[-1] if alarms else 0.0))
+    return {metric: np.array(values) for metric, values in results.items()}
+
+
+def agreement(count=20000):
+    lengths = schedule_sim.random_lengths(count, 25, 120, seed=1)
+    fast = schedule_sim.simulate(lengths, seed=2)
+    slow = reference(lengths)
+    ok = True
+    for metric in schedule_sim.METRICS:
+        a, b = float(fast[metric].mean()), float(slow[metric].mean())
+        close = abs(a - b) <= TOLERANCE * abs(b)
+        ok &= close
+        print(f"  {metric:12} simulator {a:8.2f}  alarm_times {b:8.2f}  {'ok' if close else 'FAIL'}")
+    return ok
+
+
+def memory(count=200000, min_interval=1.0):
+    lengths = schedule_sim.random_lengths(count, 25, 120, seed=5)
+    tracemalloc.start()
+    results = schedule_sim.simulate(lengths, min_interval, seed=6)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    # Besides the chunk: the result arrays and per-row temporaries
+    fixed = sum(values.nbytes for values in results.values()) + 16 * count
+    budget = schedule_sim.CHUNK_BYTES + fixed
+    ok = peak <= budget
+    print(f"\n{count} sessions with --min {min_interval:g}: peak {peak / 2**20:.0f} MB, "
+          f"budget {budget / 2**20:.0f} MB  {'ok' if ok else 'FAIL'}")
+    return ok
+
+
+def main():
+    sessions = int(sys.argv[1]) if len(sys.argv) > 1 else 1000000
+    print("Agreement with session_state.alarm_times (20000 sessions)")
+    ok = agreement()
+
+    lengths = schedule_sim.random_lengths(sessions, 25, 120, seed=3)
+    start = time.perf_counter()
+    results = schedule_sim.simulate(lengths, seed=4)
+    simulated = time.perf_counter() - start
+    schedule_sim.summarize(results)
+    total = time.perf_counter() - start
+    print(f"\n{sessions} sessions: simulated in {simulated:.2f}s, with percentiles {total:.2f}s "
+          f"({sessions / total / 1e6:.2f}M sessions/s, {int(results['alarms'].sum())} alarms)")
+    ok = memory() and ok
+    return 0 if ok else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
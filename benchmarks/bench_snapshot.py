@@ -0,0 +1,129 @@
+#!/usr/bin/env python3
+"""
+Crash test and costs for session snapshots.
+
+* Crash safety: child processes checkpoint a session as fast as they can
+  (updates plus explicit flushes) and are SIGKILLed at random points.
+  After every kill the snapshot must load as a complete, consistent
+  session or as nothing - never a torn or half-written file.
+* Restore time: how long session_state.load() takes on startup.
+* Write count: snapshot writes (each one file fsync plus one directory
+  fsync) for a simulated two-hour session, against one write per tick.
+
+Usage: python benchmarks/bench_snapshot.py [kills]
+"""
+
+import os
+import random
+import signal
+import subprocess
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+import session_state
+
+SESSION_SECONDS = 2 * 3600
+
+
+def child(path):
+    """Checkpoint forever; next_alarm and the sound name always agree"""
+    checkpointer = session_state.Checkpointer(path, debounce=0.001)
+    now = time.time()
+    checkpointer.start(start=now, deadline=now + SESSION_SECONDS, total_time=SESSION_SECONDS,
+                       seed=1234, next_alarm=0, sound='alarm-0')
+    index = 0
+    while True:
+        index += 1
+        checkpointer.update(next_alarm=index, sound=f'alarm-{index}')
+        if index % 3 == 0:
+            checkpointer.flush()
+
+
+def crash_test(kills):
+    directory = tempfile.mkdtemp(prefix='snapshot-bench-')
+    path = os.path.join(directory, 'session.json')
+    restored = empty = corrupt = 0
+    for _ in range(kills):
+        process = subprocess.Popen([sys.executable, os.path.abspath(__file__), '--child', path])
+        time.sleep(random.uniform(0.05, 0.3))
+        process.send_signal(signal.SIGKILL)
+        process.wait()
+
+        raw = os.path.exists(path) and os.path.getsize(path) > 0
+        state = session_state.load(path)
+        if state is None:
+            # Only acceptable if nothing had been written yet
+            if raw:
+                corrupt += 1
+            else:
+                empty += 1
+        elif state['sound'] == f"alarm-{state['next_alarm']}":
+            restored += 1
+        else:
+            corrupt += 1
+    leftovers = [name for name in os.listdir(directory) if name.endswith('.tmp')]
+    for name in os.listdir(directory):
+        os.remove(os.path.join(directory, name))
+    os.rmdir(directory)
+    return restored, empty, corrupt, len(leftovers)
+
+
+def restore_time(repeats=1000):
+    directory = tempfile.mkdtemp(prefix='snapshot-bench-')
+    path = os.path.join(directory, 'session.json')
+    now = time.time()
+    session_state.save_atomic(path, {'start': now, 'deadline': now + SESSION_SECONDS,
+                                     'total_time': SESSION_SECONDS, 'seed': 1, 'next_alarm': 3,
+                                     'sound': 'iPhone Radar',
+                                     'version': session_state.SNAPSHOT_VERSION})
+    best = float('inf')
+    for _ in range(repeats):
+        start = time.perf_counter()
+        session_state.load(path)
+        best = min(best, time.perf_counter() - start)
+    session_state.clear(path)
+    os.rmdir(directory)
+    return best * 1000
+
+
+def session_writes():
+    """Replay a two-hour session: alarms plus a burst of sound changes"""
+    directory = tempfile.mkdtemp(prefix='snapshot-bench-')
+    checkpointer = session_state.Checkpointer(os.path.join(directory, 'session.json'), debounce=0.05)
+    now = time.time()
+    checkpointer.start(start=now, deadline=now + SESSION_SECONDS, total_time=SESSION_SECONDS,
+                       seed=7, next_alarm=0, sound='Default Beep')
+    alarms = list(session_state.alarm_times(7, now, now + SESSION_SECONDS))
+    for name in ('iPhone Radar', 'iPhone Beacon', 'iPhone Signal', 'iPhone Sencha'):
+        checkpointer.update(sound=name)
+    time.sleep(0.1)
+    for index in range(len(alarms)):
+        # Alarms are minutes apart, so each one is its own write
+        checkpointer.update(next_alarm=index + 1)
+        time.sleep(0.06)
+    writes = checkpointer.writes
+    checkpointer.clear()
+    os.rmdir(directory)
+    return len(alarms), writes
+
+
+def main():
+    kills = int(sys.argv[1]) if len(sys.argv) > 1 else 50
+    restored, empty, corrupt, leftovers = crash_test(kills)
+    print(f"crash test       {kills} kills: {restored} restored, {empty} before first write, "
+          f"{corrupt} corrupt, {leftovers} stray temp files")
+    print(f"restore          {restore_time():.3f} ms per load()")
+    alarms, writes = session_writes()
+    print(f"2 h session      {writes} writes ({writes * 2} fsyncs) for {alarms} alarms, "
+          f"vs {SESSION_SECONDS} with one write per tick")
+    return 1 if corrupt else 0
+
+
+if __name__ == '__main__':
+    if len(sys.argv) > 2 and sys.argv[1] == '--child':
+        child(sys.argv[2])
+    else:
+        sys.exit(main())
@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+"""
+Benchmark concurrent fetches of the pre-rendered /sounds/<name>.wav files.
+
+Starts app.py on a local threaded server, then hammers it with full
+downloads, Range requests and conditional (If-None-Match) revalidations
+from a pool of client threads.
+
+Usage: python benchmarks/bench_sound_server.py [clients] [requests_per_client]
+"""
+
+import logging
+import os
+import sys
+import threading
+import time
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+# Raw serving throughput from one address; admission control is measured by bench_admission.py
+os.environ['FOCUS_ALARM_ADMISSION'] = 'off'
+
+from flask import url_for
+from werkzeug.serving import make_server
+
+import sounds
+from app import app, get_wav
+
+
+def fetch(url, headers=None):
+    request = urllib.request.Request(url, headers=headers or {})
+    try:
+        with urllib.request.urlopen(request) as response:
+            return response.status, len(response.read())
+    except urllib.error.HTTPError as e:
+        # 304 Not Modified surfaces as an HTTPError
+        return e.code, 0
+
+
+def run(base, urls, clients, per_client, headers=None):
+    def worker(i):
+        total = 0
+        for n in range(per_client):
+            status, size = fetch(base + urls[(i + n) % len(urls)], headers)
+            assert status in (200, 206, 304), status
+            total += size
+        return total
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(clients) as pool:
+        total_bytes = sum(pool.map(worker, range(clients)))
+    elapsed = time.perf_counter() - start
+    count = clients * per_client
+    return count / elapsed, total_bytes / elapsed / 1e6
+
+
+def main():
+    clients = int(sys.argv[1]) if len(sys.argv) > 1 else 16
+    per_client = int(sys.argv[2]) if len(sys.argv) > 2 else 50
+
+    logging.getLogger('werkzeug').setLevel(logging.ERROR)
+    server = make_server('127.0.0.1', 0, app, threaded=True)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base = f'http://127.0.0.1:{server.server_port}'
+
+    with app.test_request_context():
+        urls = [url_for('sound_file', name=name) for name in sounds.PRESETS]
+        etag = '"%s"' % get_wav('Default Beep')[1]
+
+    # Warm up: render the bank and build every WAV once
+    for url in urls:
+        fetch(base + url)
+
+    print(f"{clients} clients x {per_client} requests")
+    rps, mbps = run(base, urls, clients, per_client)
+    print(f"  full download : {rps:8.0f} req/s  {mbps:7.1f} MB/s")
+    rps, mbps = run(base, urls, clients, per_client, {'Range': 'bytes=0-4095'})
+    print(f"  range 4 KiB   : {rps:8.0f} req/s  {mbps:7.1f} MB/s")
+    rps, _ = run(base, urls[:1], clients, per_client, {'If-None-Match': etag})
+    print(f"  revalidate    : {rps:8.0f} req/s  (304 Not Modified)")
+
+    server.shutdown()
+
+
+if __name__ == '__main__':
+    main()
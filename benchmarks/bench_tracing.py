@@ -0,0 +1,148 @@
+#!/usr/bin/env python3
+"""
+Cost of the timeline tracer, off and on.
+
+* Per call: an empty loop, then the same loop with a tracing.span()
+  block, a tracing.instant() and a tracing.after() (against a stub Tk
+  root), with tracing off and on.
+* Real work: rendering every preset, which is traced per sound, with
+  tracing off and on.
+* Export: fills the ring buffer past its capacity from two threads,
+  writes it and checks the JSON: capacity events, the overwritten ones
+  counted, timestamps in order, thread names present.
+
+Usage: python benchmarks/bench_tracing.py [calls]
+"""
+
+import json
+import os
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+import sounds
+import tracing
+
+
+class StubRoot:
+    def after(self, ms, callback, *args):
+        callback(*args)
+
+
+def per_call(calls):
+    root = StubRoot()
+
+    def nothing():
+        pass
+
+    def empty():
+        for _ in range(calls):
+            pass
+
+    def with_span():
+        for _ in range(calls):
+            with tracing.span('work', 'bench'):
+                pass
+
+    def with_instant():
+        for _ in range(calls):
+            tracing.instant('tick', 'bench')
+
+    def with_after():
+        for _ in range(calls):
+            tracing.after(root, 0, nothing)
+
+    def bare_after():
+        for _ in range(calls):
+            root.after(0, nothing)
+
+    def timed(fn):
+        best = float('inf')
+        for _ in range(3):
+            start = time.perf_counter()
+            fn()
+            best = min(best, time.perf_counter() - start)
+        return best / calls * 1e9
+
+    base = timed(empty)
+    after_base = timed(bare_after)
+    results = {}
+    for state in ('off', 'on'):
+        if state == 'on':
+            tracing.enable()
+        else:
+            tracing.disable()
+        results[state] = (timed(with_span) - base, timed(with_instant) - base,
+                          timed(with_after) - after_base)
+    tracing.disable()
+    print(f"{'per call (ns)':<16} {'span':>8} {'instant':>8} {'after':>8}")
+    for state, (span, instant, after) in results.items():
+        print(f"tracing {state:<8} {span:8.0f} {instant:8.0f} {after:8.0f}")
+    return results['off']
+
+
+def render_cost():
+    times = {}
+    for state in ('off', 'on'):
+        tracing.enable() if state == 'on' else tracing.disable()
+        best = float('inf')
+        for _ in range(3):
+            start = time.perf_counter()
+            sounds.render_all()
+            best = min(best, time.perf_counter() - start)
+        times[state] = best
+    tracing.disable()
+    overhead = (times['on'] - times['off']) / times['off'] * 100
+    print(f"\nrender_all       off {times['off'] * 1000:.1f} ms, on {times['on'] * 1000:.1f} ms "
+          f"({overhead:+.1f}%)")
+
+
+def export(capacity=4096, per_thread=5000):
+    tracing.enable(capacity)
+
+    def record():
+        for i in range(per_thread):
+            with tracing.span('work', 'bench', i=i):
+                pass
+
+    threads = [threading.Thread(target=record, name=f'worker-{n}') for n in range(2)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    path = os.path.join(tempfile.mkdtemp(prefix='trace-bench-'), 'trace.json')
+    start = time.perf_counter()
+    tracing.write(path)
+    seconds = time.perf_counter() - start
+    tracing.disable()
+    with open(path) as f:
+        trace = json.load(f)
+    size = os.path.getsize(path)
+    os.remove(path)
+    os.rmdir(os.path.dirname(path))
+
+    spans = [event for event in trace['traceEvents'] if event['ph'] == 'X']
+    names = {event['args']['name'] for event in trace['traceEvents'] if event['ph'] == 'M'}
+    dropped = trace['otherData']['dropped_events']
+    ordered = all(a['ts'] <= b['ts'] for a, b in zip(spans, spans[1:]))
+    print(f"\nexport           {len(spans)} of {2 * per_thread} events kept ({dropped} overwritten), "
+          f"{size / 1e3:.0f} kB written in {seconds * 1000:.1f} ms, threads {sorted(names)}")
+    return (len(spans) >= capacity - 1 and dropped >= 2 * per_thread - capacity
+            and ordered and {'worker-0', 'worker-1'} <= names)
+
+
+def main():
+    calls = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+    span, instant, after = per_call(calls)
+    render_cost()
+    ok = export()
+    # "Near zero" when off: well under a microsecond per instrumented call
+    return 0 if ok and max(span, instant, after) < 500 else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,111 @@
+#!/usr/bin/env python3
+"""
+Accuracy check and throughput benchmark for the wavetable engine.
+
+Accuracy: compares table lookups with np.sin (single sine and an
+8-partial harmonic timbre) and every preset rendered by both DSP
+engines, and exits non-zero if any error exceeds its bound.
+
+Throughput: samples per second for np.sin against table lookup, for
+one and eight partials, and for block-wise ambient tone generation.
+
+Usage: python benchmarks/bench_wavetable.py [seconds_of_audio]
+"""
+
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+import dsp
+import sounds
+import wavetable
+
+SAMPLE_RATE = sounds.SAMPLE_RATE
+MAX_FLOAT_ERROR = 0.5 / 32768  # half a 16-bit step, relative to full scale
+MAX_PRESET_LSB = 1  # 16-bit steps
+
+
+def best_time(fn, repeats=5):
+    best = float('inf')
+    for _ in range(repeats):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    seconds = float(sys.argv[1]) if len(sys.argv) > 1 else 10.0
+    n = int(seconds * SAMPLE_RATE)
+    t = np.arange(n) / SAMPLE_RATE
+    failed = False
+
+    # --- Accuracy ---
+    freq = 440.0
+    sine_error = np.max(np.abs(wavetable.SINE.lookup(freq * t) - np.sin(2 * np.pi * freq * t)))
+
+    partials = [(k, 1.0 / k) for k in range(1, 9)]
+    table = wavetable.Wavetable(partials)
+    reference = sum(a * np.sin(2 * np.pi * k * 220 * t) for k, a in partials)
+    scale = sum(a for _, a in partials)
+    timbre_error = np.max(np.abs(table.lookup(220 * t, 220, SAMPLE_RATE) - reference)) / scale
+
+    print("Accuracy")
+    for label, error in (("sine table", sine_error), ("8-partial table", timbre_error)):
+        ok = error <= MAX_FLOAT_ERROR
+        failed |= not ok
+        print(f"  {label:<18} max error {error:.2e} of full scale  {'ok' if ok else 'FAIL'}")
+
+    sine_engine = dsp.Renderer(SAMPLE_RATE, 'sine')
+    table_engine = dsp.Renderer(SAMPLE_RATE, 'wavetable')
+    for name, sound in list(sounds.PRESETS.items()) + list(sounds.EXTRAS.items()):
+        diff = int(np.max(np.abs(sine_engine.render(sound).astype(np.int32) - table_engine.render(sound))))
+        ok = diff <= MAX_PRESET_LSB
+        failed |= not ok
+        print(f"  {name:<18} max diff {diff} LSB  {'ok' if ok else 'FAIL'}")
+
+    # --- Throughput ---
+    print(f"\nThroughput ({seconds:g} s of audio, million samples/s)")
+    out = np.empty(n)
+    phase = np.empty(n)
+    index = np.empty(n, dtype=np.intp)
+    scratch = np.empty(n)
+
+    def sine_one():
+        np.multiply(t, 2 * np.pi * freq, out=out)
+        np.sin(out, out=out)
+
+    def table_one():
+        np.multiply(t, freq, out=phase)
+        wavetable.SINE.lookup(phase, out=out, index=index, scratch=scratch)
+
+    def sine_eight():
+        out.fill(0)
+        for k, a in partials:
+            np.multiply(t, 2 * np.pi * k * 220, out=phase)
+            np.sin(phase, out=phase)
+            np.multiply(phase, a, out=phase)
+            np.add(out, phase, out=out)
+
+    def table_eight():
+        np.multiply(t, 220, out=phase)
+        table.lookup(phase, 220, SAMPLE_RATE, out=out, index=index, scratch=scratch)
+
+    def ambient():
+        for _ in wavetable.ambient(110, seconds, SAMPLE_RATE, partials):
+            pass
+
+    for label, fn in (("np.sin, 1 partial", sine_one), ("table, 1 partial", table_one),
+                      ("np.sin, 8 partials", sine_eight), ("table, 8 partials", table_eight),
+                      ("ambient blocks, 8", ambient)):
+        print(f"  {label:<20} {n / best_time(fn) / 1e6:8.1f}")
+
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
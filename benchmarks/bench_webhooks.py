@@ -0,0 +1,152 @@
+#!/usr/bin/env python3
+"""
+Webhook delivery against a local stand-in HTTP server.
+
+* Throughput: emits events as fast as possible to two destinations and
+  reports emit() cost, delivered events/s, batches and connections used
+  (keep-alive means a handful, not one per batch).
+* Outage: the stand-in answers 503 for a while; events must pile up in
+  the bounded queue, be retried with back-off and all arrive once the
+  server recovers.
+* Restart: events queued while the server is down are persisted on
+  close and delivered by a fresh Webhooks instance.
+
+Usage: python benchmarks/bench_webhooks.py [events]
+"""
+
+import json
+import os
+import shutil
+import sys
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+import webhooks
+
+
+class StandIn(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self):
+        super().__init__(('127.0.0.1', 0), Handler)
+        self.received = {}
+        self.failing = False
+        self.requests = 0
+        self.lock = threading.Lock()
+        threading.Thread(target=self.serve_forever, daemon=True).start()
+
+    def url(self, path):
+        return f'http://127.0.0.1:{self.server_address[1]}{path}'
+
+    def count(self, path):
+        with self.lock:
+            return self.received.get(path, 0)
+
+
+class Handler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'  # keep-alive
+
+    def do_POST(self):
+        body = self.rfile.read(int(self.headers['Content-Length']))
+        server = self.server
+        with server.lock:
+            server.requests += 1
+            if not server.failing:
+                events = json.loads(body)['events']
+                server.received[self.path] = server.received.get(self.path, 0) + len(events)
+        status = 503 if server.failing else 204
+        self.send_response(status)
+        self.send_header('Content-Length', '0')
+        self.end_headers()
+
+    def log_message(self, *args):
+        pass
+
+
+def wait_for(condition, timeout):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if condition():
+            return True
+        time.sleep(0.01)
+    return condition()
+
+
+def throughput(server, directory, events):
+    urls = [server.url('/a'), server.url('/b')]
+    hooks = webhooks.Webhooks(urls, directory, batch_seconds=0.05, max_queued=events)
+    start = time.perf_counter()
+    for i in range(events):
+        hooks.emit('alarm', index=i)
+    emit_seconds = time.perf_counter() - start
+    ok = wait_for(lambda: all(server.count(p) >= events for p in ('/a', '/b')), 60)
+    elapsed = time.perf_counter() - start
+    stats = hooks.stats()
+    hooks.close()
+    print(f"throughput       emit {emit_seconds / events * 1e6:.2f} us/event, "
+          f"delivered {2 * events / elapsed:,.0f} events/s to 2 destinations")
+    for url, s in stats.items():
+        print(f"  {url[-2:]}            {s['batches']} batches, {s['connections']} connection(s), "
+              f"max queue depth {s['max_depth']}, dropped {s['dropped']}")
+    return ok
+
+
+def outage(server, directory, events=500):
+    hooks = webhooks.Webhooks([server.url('/outage')], directory, batch_seconds=0.05,
+                              backoff_base=0.05, backoff_max=0.5, max_queued=events)
+    server.failing = True
+    for i in range(events + 100):  # 100 more than fit: the oldest are dropped
+        hooks.emit('alarm', index=i)
+        time.sleep(0.001)
+    time.sleep(0.5)
+    failing_stats = hooks.stats()[server.url('/outage')]
+    server.failing = False
+    ok = wait_for(lambda: server.count('/outage') >= events, 10)
+    stats = hooks.stats()[server.url('/outage')]
+    hooks.close()
+    print(f"outage           {failing_stats['failures']} failed attempts, queue held "
+          f"{failing_stats['queued']} (dropped {failing_stats['dropped']}); after recovery "
+          f"{server.count('/outage')} delivered, {stats['queued']} left")
+    return ok and server.count('/outage') == events
+
+
+def restart(server, directory, events=200):
+    url = server.url('/restart')
+    server.failing = True
+    hooks = webhooks.Webhooks([url], directory, batch_seconds=0.01, backoff_base=10)
+    for i in range(events):
+        hooks.emit('session_complete', index=i)
+    time.sleep(0.3)
+    hooks.close(timeout=0.5)
+    saved = [name for name in os.listdir(directory) if name.endswith('.json')]
+    server.failing = False
+
+    hooks = webhooks.Webhooks([url], directory, batch_seconds=0.01)
+    ok = wait_for(lambda: server.count('/restart') >= events, 10)
+    hooks.close()
+    left = [name for name in os.listdir(directory) if name.endswith('.json')]
+    print(f"restart          {len(saved)} queue file(s) saved while down, "
+          f"{server.count('/restart')}/{events} delivered by the next instance, "
+          f"{len(left)} queue file(s) left")
+    return ok and not left
+
+
+def main():
+    events = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    server = StandIn()
+    directory = tempfile.mkdtemp(prefix='webhook-bench-')
+    try:
+        results = [throughput(server, directory, events), outage(server, directory),
+                   restart(server, directory)]
+    finally:
+        server.shutdown()
+        shutil.rmtree(directory)
+    return 0 if all(results) else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,223 @@
+"""
+Import of user-supplied alarm sounds.
+
+Files are decoded, downmixed to mono, resampled to the mixer rate and
+loudness-normalized once, on a background thread so Tk stays responsive.
+The resulting 16-bit PCM is kept in a size-bounded LRU cache keyed by the
+file's content hash and modification time, so re-selecting a sound (or
+loading a large library) never decodes the same file twice or holds more
+than a fixed amount of audio in memory.
+"""
+
+import hashlib
+import os
+import threading
+import wave
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+MAX_FILE_BYTES = 50 * 1024 * 1024
+MAX_SECONDS = 120
+CACHE_BYTES = 64 * 1024 * 1024
+TARGET_RMS = 0.1  # about -20 dBFS
+PEAK_LEVEL = 16383  # same headroom as the built-in presets
+BLOCK_FRAMES = 65536
+# Highest bitrate we expect from lossy files (bytes per second, 640 kbit/s);
+# a larger file can't be under MAX_SECONDS, so it is refused before decoding
+MAX_LOSSY_BYTE_RATE = 80000
+LOSSY_EXTENSIONS = ('.ogg', '.mp3')
+
+SUPPORTED_EXTENSIONS = ('.wav', '.ogg', '.mp3', '.flac')
+
+
+def file_hash(path):
+    digest = hashlib.sha1()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1024 * 1024), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def validate(path):
+    """Reject files we can't or shouldn't import"""
+    ext = os.path.splitext(path)[1].lower()
+    if ext not in SUPPORTED_EXTENSIONS:
+        raise ValueError(f"Unsupported file type: {ext or 'none'}")
+    size = os.path.getsize(path)
+    if size == 0:
+        raise ValueError("File is empty")
+    if size > MAX_FILE_BYTES:
+        raise ValueError(f"File is too large ({size / 1e6:.0f} MB, max {MAX_FILE_BYTES / 1e6:.0f} MB)")
+
+
+def decode_wav(path):
+    """Decode a PCM WAV file to mono float32, block by block"""
+    with wave.open(path, 'rb') as wav_file:
+        channels = wav_file.getnchannels()
+        width = wav_file.getsampwidth()
+        rate = wav_file.getframerate()
+        frames = wav_file.getnframes()
+        if frames > MAX_SECONDS * rate:
+            raise ValueError(f"Sound is too long (max {MAX_SECONDS} seconds)")
+
+        mono = np.empty(frames, dtype=np.float32)
+        pos = 0
+        while pos < frames:
+            raw = wav_file.readframes(BLOCK_FRAMES)
+            if not raw:
+                break
+            block = _pcm_to_float(raw, width).reshape(-1, channels)
+            n = len(block)
+            mono[pos:pos + n] = block.mean(axis=1)
+            pos += n
+    return mono[:pos], rate
+
+
+def _pcm_to_float(raw, width):
+    if width == 1:
+        return (np.frombuffer(raw, dtype=np.uint8).astype(np.float32) - 128) / 128
+    if width == 2:
+        return np.frombuffer(raw, dtype='<i2').astype(np.float32) / 32768
+    if width == 3:
+        b = np.frombuffer(raw, dtype=np.uint8).reshape(-1, 3).astype(np.int32)
+        samples = b[:, 0] | (b[:, 1] << 8) | (b[:, 2] << 16)
+        samples[samples >= 1 << 23] -= 1 << 24
+        return samples.astype(np.float32) / (1 << 23)
+    if width == 4:
+        return np.frombuffer(raw, dtype='<i4').astype(np.float32) / (1 << 31)
+    raise ValueError(f"Unsupported sample width: {width * 8} bits")
+
+
+def decode_with_pygame(path):
+    """Decode compressed formats through the pygame mixer"""
+    import pygame
+
+    settings = pygame.mixer.get_init()
+    if not settings:
+        raise ValueError("Audio is not available to decode this file type")
+    rate, size, channels = settings
+    # Sound() decodes the whole file; don't let a long one get that far
+    if path.lower().endswith(LOSSY_EXTENSIONS) and os.path.getsize(path) > MAX_SECONDS * MAX_LOSSY_BYTE_RATE:
+        raise ValueError(f"Sound is too long (max {MAX_SECONDS} seconds)")
+    sound = pygame.mixer.Sound(path)
+    # Checked before the samples are copied out and converted to float
+    if sound.get_length() > MAX_SECONDS:
+        raise ValueError(f"Sound is too long (max {MAX_SECONDS} seconds)")
+    samples = pygame.sndarray.array(sound)
+    del sound
+    scale = float(1 << (abs(size) - 1))
+    if samples.ndim > 1:
+        samples = samples.mean(axis=1, dtype=np.float32)
+    return (samples / scale).astype(np.float32), rate
+
+
+def resample(samples, src_rate, dst_rate):
+    """Linear-interpolation resampling (plenty for short alert sounds)"""
+    if src_rate == dst_rate or len(samples) == 0:
+        return samples
+    n_out = int(round(len(samples) * dst_rate / src_rate))
+    positions = np.arange(n_out, dtype=np.float64) * (src_rate / dst_rate)
+    return np.interp(positions, np.arange(len(samples)), samples).astype(np.float32)
+
+
+def normalize(samples):
+    """Normalize loudness to TARGET_RMS, limited so peaks fit the preset level"""
+    rms = float(np.sqrt(np.mean(np.square(samples, dtype=np.float64))))
+    peak = float(np.max(np.abs(samples)))
+    if peak == 0 or rms < 1e-5:
+        raise ValueError("Sound is silent")
+    gain = min(TARGET_RMS / rms, 1.0 / peak)
+    samples *= gain * PEAK_LEVEL
+    return samples.astype(np.int16)
+
+
+def decode_file(path, sample_rate):
+    """Validate, decode, resample and normalize one file to int16 mono PCM"""
+    validate(path)
+    if path.lower().endswith('.wav'):
+        try:
+            samples, rate = decode_wav(path)
+        except wave.Error:
+            # Compressed or float WAVs that the wave module can't read
+            samples, rate = decode_with_pygame(path)
+    else:
+        samples, rate = decode_with_pygame(path)
+    if len(samples) == 0:
+        raise ValueError("Sound has no audio data")
+    return normalize(resample(samples, rate, sample_rate))
+
+
+class SoundCache:
+    """LRU cache of decoded PCM, bounded by total bytes"""
+
+    def __init__(self, max_bytes=CACHE_BYTES):
+        self.max_bytes = max_bytes
+        self.total_bytes = 0
+        self._items = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            pcm = self._items.get(key)
+            if pcm is not None:
+                self._items.move_to_end(key)
+            return pcm
+
+    def put(self, key, pcm):
+        with self._lock:
+            old = self._items.pop(key, None)
+            if old is not None:
+                self.total_bytes -= old.nbytes
+            if pcm.nbytes > self.max_bytes:
+                return
+            self._items[key] = pcm
+            self.total_bytes += pcm.nbytes
+            while self.total_bytes > self.max_bytes:
+                _, evicted = self._items.popitem(last=False)
+                self.total_bytes -= evicted.nbytes
+
+    def __len__(self):
+        return len(self._items)
+
+
+class SoundImporter:
+    """Decodes user sounds on a single worker thread"""
+
+    def __init__(self, sample_rate, cache=None):
+        self.sample_rate = sample_rate
+        self.cache = cache if cache is not None else SoundCache()
+        self._hashes = {}  # (path, size, mtime) -> content hash
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='sound-import')
+
+    def file_key(self, path):
+        """Cache key for a file: (content hash, mtime), hashing each version once"""
+        st = os.stat(path)
+        stat_key = (os.path.abspath(path), st.st_size, st.st_mtime_ns)
+        if stat_key not in self._hashes:
+            self._hashes[stat_key] = file_hash(path)
+        return self._hashes[stat_key], st.st_mtime_ns
+
+    def load(self, path):
+        """Blocking import; returns int16 PCM at the importer's sample rate"""
+        key = self.file_key(path) + (self.sample_rate,)
+        pcm = self.cache.get(key)
+        if pcm is None:
+            pcm = decode_file(path, self.sample_rate)
+            self.cache.put(key, pcm)
+        return pcm
+
+    def submit(self, path, callback):
+        """Import in the background; callback(path, pcm, error) runs on the worker thread"""
+        def work():
+            try:
+                pcm = self.load(path)
+            except Exception as e:
+                callback(path, None, e)
+            else:
+                callback(path, pcm, None)
+        return self._executor.submit(work)
+
+    def shutdown(self):
+        self._executor.shutdown(wait=False, cancel_futures=True)
@@ -1,15 +1,33 @@
 import tkinter as tk
 from tkinter import ttk, messagebox, filedialog
-import threading
 import time
 import random
-import pygame
 import os
+# Keep stdout clean (e.g. for `focus_alarm.py export`)
+os.environ.setdefault('PYGAME_HIDE_SUPPORT_PROMPT', '1')
+import pygame
 import numpy as np
-import wave
 from datetime import datetime, timedelta
 import sys
 import subprocess
+import math
+import argparse
+import getpass
+import itertools
+import queue
+import sqlite3
+
+import audio_probe
+import history
+import live_config
+import session_state
+from runtime import SessionRuntime
+import tracing
+import webhooks
+from sound_bank import SoundBank
+from custom_sounds import SoundImporter
+from player import PlayerProcess, default_command
+from mixer import Mixer
 
 # Better error handling for standalone executable
 if getattr(sys, 'frozen', False):
@@ -17,6 +35,8 @@ if getattr(sys, 'frozen', False):
     import os
     os.environ['SDL_VIDEODRIVER'] = 'dummy'
 
+RUNTIME_POLL_MS = 50  # how often Tk picks up session events from the runtime
+
 class FocusAlarm:
     def __init__(self, root):
         self.root = root
@@ -24,84 +44,40 @@ class FocusAlarm:
         self.root.geometry("400x500")
         self.root.configure(bg='#2c3e50')
         
-        # Initialize pygame mixer for sounds
-        self.audio_working = False
-        
-        # Check if we're running as a frozen app (double-clicked)
-        if getattr(sys, 'frozen', False):
-            print("Running as frozen app - may need audio permissions")
-            # Try to request audio permissions first
-            try:
-                # Test system audio access
-                subprocess.run(['afplay', '/System/Library/Sounds/Glass.aiff'], 
-                             capture_output=True, timeout=2)
-                print("System audio access confirmed")
-            except:
-                print("System audio access failed - will use fallbacks")
-                
-            # Try to request audio permissions more directly
-            try:
-                # Force audio initialization by playing a silent sound
-                subprocess.run(['afplay', '/System/Library/Sounds/Glass.aiff'], 
-                             capture_output=True, timeout=3)
-                print("Audio permission test successful")
-            except Exception as e:
-                print(f"Audio permission test failed: {e}")
-                # Try alternative approach
-                try:
-                    os.system('afplay /System/Library/Sounds/Glass.aiff &')
-                    print("Audio permission test via os.system successful")
-                except:
-                    print("All audio permission tests failed")
-        
-        try:
-            # Try multiple audio initialization methods
-            pygame.mixer.init(frequency=44100, size=-16, channels=2, buffer=512)
-            print("Pygame mixer initialized successfully")
-            self.audio_working = True
-        except Exception as e:
-            print(f"Error initializing pygame mixer: {e}")
-            # Try alternative initialization
-            try:
-                pygame.mixer.init()
-                print("Pygame mixer initialized with defaults")
-                self.audio_working = True
-            except Exception as e2:
-                print(f"Failed to initialize pygame mixer: {e2}")
-                # Try with minimal settings
-                try:
-                    pygame.mixer.init(frequency=22050, size=-16, channels=1, buffer=256)
-                    print("Pygame mixer initialized with minimal settings")
-                    self.audio_working = True
-                except Exception as e3:
-                    print(f"Failed to initialize pygame mixer: {e3}")
-                    # Try with even more minimal settings for frozen apps
-                    try:
-                        pygame.mixer.quit()  # Ensure clean state
-                        pygame.mixer.init(frequency=11025, size=-16, channels=1, buffer=128)
-                        print("Pygame mixer initialized with ultra-minimal settings")
-                        self.audio_working = True
-                    except Exception as e4:
-                        print(f"All pygame mixer initialization failed: {e4}")
-                        self.audio_working = False
-                    
-        # If pygame failed, try to initialize system audio
-        if not self.audio_working:
-            print("Pygame failed - will use system audio fallbacks")
-            # Test system audio
-            try:
-                subprocess.run(['afplay', '/System/Library/Sounds/Glass.aiff'], 
-                             capture_output=True, timeout=1)
-                print("System audio working as fallback")
-            except Exception as e:
-                print(f"System audio also failed: {e}")
+        # Restore an interrupted session first; it is only a small JSON file,
+        # so this is done before the (slow) audio initialization below
+        restore_start = time.perf_counter()
+        self.checkpointer = session_state.Checkpointer()
+        self.restored_session = session_state.load(self.checkpointer.path)
+        if self.restored_session:
+            print(f"Found interrupted session in {(time.perf_counter() - restore_start) * 1000:.1f} ms")
+        
+        # Initialize pygame mixer for sounds, trying last launch's working
+        # config before the full (slow) probe
+        probe_start = time.perf_counter()
+        with tracing.span('init_audio', 'audio') as span:
+            self.audio_working, probe_source = audio_probe.init_audio()
+            span.set(source=probe_source, working=self.audio_working)
+        print(f"Audio ready in {(time.perf_counter() - probe_start) * 1000:.0f} ms ({probe_source})")
         
         # Timer variables
         self.is_running = False
         self.remaining_time = 0
         self.total_time = 0
-        self.sound_thread = None
-        self.timer_thread = None
+        self.session_start = 0
+        self.session_deadline = 0
+        self.session_seed = 0
+        self.next_alarm = 0
+        self.intervals = (session_state.MIN_INTERVAL, session_state.MAX_INTERVAL)  # from the config
+        self.min_interval, self.max_interval = self.intervals  # of the current session
+        
+        # Ticks and alarms run as timers on one asyncio loop (see runtime.py).
+        # Work goes to the loop with submit() and events come back through a
+        # queue Tk drains itself: neither thread ever waits for the other
+        self.runtime = SessionRuntime(play=self.play_alarm, on_event=self.on_runtime_event).start_in_thread()
+        self.runtime_events = queue.Queue()
+        self.session_ids = itertools.count(1)
+        self.session_id = None
         
         # Sound options
         self.sound_options = {
@@ -117,21 +93,67 @@ class FocusAlarm:
         self.current_sound = "Default Beep"
         self.custom_sound = None
         self.custom_sound_name = None
+        self.sound_bank = None
         
         # Create all sound options
-        self.create_all_sounds()
+        with tracing.span('create_all_sounds', 'sounds'):
+            self.create_all_sounds()
+        # Presets edited in the config file are rendered into an overlay on the bank
+        self.sound_table = live_config.SoundTable(self.sound_bank) if self.sound_bank else None
+        
+        # Custom sounds are decoded on a worker thread at the mixer rate
+        mixer_settings = pygame.mixer.get_init()
+        self.sound_importer = SoundImporter(mixer_settings[0] if mixer_settings else 44100)
+        
+        # Persistent player process, started once and reused for every alarm
+        self.player = None
+        player_rate = self.sound_bank.sample_rate("Default Beep") if self.sound_bank else 44100
+        player_command, player_feed = default_command(player_rate)
+        if player_command:
+            self.player = PlayerProcess(player_command, player_feed, self.sound_table)
+            self.player.start()
+        
+        # Software mixer so overlapping alarms are summed into one stream
+        self.mixer = None
+        if self.player and player_feed == 'pcm' and self.sound_bank:
+            self.mixer = Mixer(player_rate)
+            self.player.attach_mixer(self.mixer)
         
         self.setup_ui()
+        self.poll_runtime_events()
         
         # Update audio status display
         self.update_audio_status()
         
+        # Presets and intervals from ~/.focus_alarm/config.json, reloaded on change
+        self.config_watcher = live_config.ConfigWatcher(
+            sample_rate=player_rate, on_reload=self.on_config_reload
+        ).start()
+        
+        # Session events for internal tools (None unless webhooks are configured)
+        self.webhooks = webhooks.from_config()
+        
+        # Finished sessions are kept for `focus_alarm.py export`
+        try:
+            self.history = history.connect()
+        except sqlite3.Error as e:
+            print(f"Session history unavailable: {e}")
+            self.history = None
+        
+        # Ctrl+Shift+T saves the timeline when tracing is on (FOCUS_ALARM_TRACE=1)
+        self.root.bind('<Control-T>', self.write_trace)
+        
+        if self.restored_session:
+            self.resume_session(self.restored_session)
+        
     def reinitialize_audio(self):
         """Try to reinitialize audio system"""
         try:
             pygame.mixer.quit()
-            pygame.mixer.init(frequency=44100, size=-16, channels=2, buffer=512)
+            config = audio_probe.MIXER_CONFIGS[0]
+            audio_probe.init_mixer(config)
             self.audio_working = True
+            audio_probe.remember('pygame', config)
             print("Audio reinitialized successfully")
             
             # Update UI
@@ -141,8 +163,10 @@ class FocusAlarm:
             print(f"Failed to reinitialize audio: {e}")
             # Try alternative settings
             try:
-                pygame.mixer.init(frequency=22050, size=-16, channels=1, buffer=256)
+                config = audio_probe.MIXER_CONFIGS[2]
+                audio_probe.init_mixer(config)
                 self.audio_working = True
+                audio_probe.remember('pygame', config)
                 print("Audio reinitialized with alternative settings")
                 self.audio_status_label.config(text="Audio: Working (Pygame)", fg='#27ae60')
             except Exception as e2:
@@ -154,6 +178,8 @@ class FocusAlarm:
         """Update the audio status display"""
         if self.audio_working:
             self.audio_status_label.config(text="Audio: Working (Pygame)", fg='#27ae60')
+        elif self.player and self.player.alive():
+            self.audio_status_label.config(text="Audio: Working (Player)", fg='#f39c12')
         else:
             # Check if system audio works as fallback
             try:
@@ -165,6 +191,9 @@ class FocusAlarm:
     
     def test_system_sound(self):
         """Test macOS system sound directly"""
+        if self.player and self.player.play("Default Beep", '/System/Library/Sounds/Glass.aiff'):
+            print("System sound sent to player")
+            return
         try:
             subprocess.run(['afplay', '/System/Library/Sounds/Glass.aiff'], 
                          capture_output=True, timeout=1)
@@ -193,91 +222,75 @@ class FocusAlarm:
     
     def play_system_sound_bluetooth(self):
         """Play system sound with better Bluetooth compatibility"""
+        with tracing.span('play_system_sound', 'audio', sound=self.current_sound) as span:
+            method = self.try_system_sound_methods()
+            span.set(method=method)
+        return method != 'beep'
+    
+    def try_system_sound_methods(self):
+        """Try each way of playing the system sound; returns the one that worked"""
         try:
             # Try multiple approaches for Bluetooth compatibility
             sound_path = self.get_system_sound_path()
             
+            # Method 0: the persistent player process (no fork/exec per alarm)
+            if self.player:
+                with tracing.span('player', 'audio'):
+                    sent = self.player.play(self.current_sound, sound_path)
+                if sent:
+                    print(f"Sent sound to player: {self.current_sound}")
+                    return 'player'
+            
             # Method 1: afplay with longer timeout
             try:
-                subprocess.run(['afplay', sound_path], 
-                             capture_output=True, timeout=3)
+                with tracing.span('afplay', 'audio'):
+                    subprocess.run(['afplay', sound_path], 
+                                 capture_output=True, timeout=3)
                 print(f"Played system sound via afplay: {os.path.basename(sound_path)}")
-                return True
+                return 'afplay'
             except subprocess.TimeoutExpired:
                 print("afplay timed out, trying alternative method")
             
             # Method 2: os.system (more reliable with Bluetooth)
             try:
-                os.system(f'afplay "{sound_path}" &')
+                with tracing.span('os.system', 'audio'):
+                    os.system(f'afplay "{sound_path}" &')
                 print(f"Played system sound via os.system: {os.path.basename(sound_path)}")
-                return True
+                return 'os.system'
             except:
                 print("os.system failed")
             
             # Method 3: Use pygame if available
             if self.audio_working:
                 try:
-                    # Create a simple beep sound
-                    sample_rate = 44100
-                    duration = 0.5
-                    t = np.linspace(0, duration, int(sample_rate * duration), False)
-                    tone = np.sin(2 * np.pi * 800 * t)
-                    tone = tone / np.max(np.abs(tone)) * 16383
-                    tone = tone.astype(np.int16)
-                    
-                    temp_filename = 'temp_bluetooth_beep.wav'
-                    with wave.open(temp_filename, 'w') as wav_file:
-                        wav_file.setnchannels(1)
-                        wav_file.setsampwidth(2)
-                        wav_file.setframerate(sample_rate)
-                        wav_file.writeframes(tone.tobytes())
-                    
-                    sound = pygame.mixer.Sound(temp_filename)
-                    sound.play()
+                    # Play the simple beep from the sound bank
+                    with tracing.span('pygame beep', 'audio'):
+                        sound = self.sound_options["Default Beep"]
+                        sound.play()
                     print("Played pygame beep for Bluetooth")
-                    return True
+                    return 'pygame'
                 except:
                     print("pygame beep failed")
             
             # Final fallback
             print('\a')  # Terminal beep
-            return False
+            return 'beep'
             
         except Exception as e:
             print(f"All Bluetooth audio methods failed: {e}")
             print('\a')  # Terminal beep
-            return False
+            return 'beep'
         
     def create_all_sounds(self):
-        """Create all 8 sound options"""
+        """Load all 8 sound options from the shared sound bank"""
         try:
-            sample_rate = 44100
-            
-            # 1. Default Beep (simple beep)
-            self.sound_options["Default Beep"] = self.create_sound(
-                sample_rate, 0.5, [800], [1.0]
-            )
-            
-            # 2. iPhone Radar (classic radar beep)
-            self.sound_options["iPhone Radar"] = self.create_iphone_radar(sample_rate)
-            
-            # 3. iPhone Beacon (gentle beacon sound)
-            self.sound_options["iPhone Beacon"] = self.create_iphone_beacon(sample_rate)
-            
-            # 4. iPhone Bulletin (news bulletin style)
-            self.sound_options["iPhone Bulletin"] = self.create_iphone_bulletin(sample_rate)
-            
-            # 5. iPhone Signal (signal tone)
-            self.sound_options["iPhone Signal"] = self.create_iphone_signal(sample_rate)
+            mixer_settings = pygame.mixer.get_init()
+            sample_rate = mixer_settings[0] if mixer_settings else 44100
+            self.sound_bank = SoundBank.open(sample_rate)
             
-            # 6. iPhone Hillside (nature-inspired)
-            self.sound_options["iPhone Hillside"] = self.create_iphone_hillside(sample_rate)
-            
-            # 7. iPhone Playtime (playful tone)
-            self.sound_options["iPhone Playtime"] = self.create_iphone_playtime(sample_rate)
-            
-            # 8. iPhone Sencha (calm, zen-like)
-            self.sound_options["iPhone Sencha"] = self.create_iphone_sencha(sample_rate)
+            for name in self.sound_options:
+                with tracing.span('make_mixer_sound', 'sounds', name=name):
+                    self.sound_options[name] = self.make_mixer_sound(self.sound_bank.get(name))
             
         except Exception as e:
             print(f"Error creating sounds: {e}")
@@ -285,349 +298,15 @@ class FocusAlarm:
             for key in self.sound_options:
                 self.sound_options[key] = None
     
-    def create_sound(self, sample_rate, duration, frequencies, amplitudes):
-        """Create a sound with multiple frequencies"""
-        try:
-            t = np.linspace(0, duration, int(sample_rate * duration), False)
-            
-            # Mix multiple frequencies
-            tone = np.zeros_like(t)
-            for freq, amp in zip(frequencies, amplitudes):
-                tone += amp * np.sin(2 * np.pi * freq * t)
-            
-            # Apply fade in/out to avoid clicks
-            fade_samples = int(0.1 * sample_rate)
-            fade_in = np.linspace(0, 1, fade_samples)
-            fade_out = np.linspace(1, 0, fade_samples)
-            
-            tone[:fade_samples] *= fade_in
-            tone[-fade_samples:] *= fade_out
-            
-            # Normalize and convert to 16-bit integer
-            tone = tone / np.max(np.abs(tone)) * 16383
-            tone = tone.astype(np.int16)
-            
-            # Save as temporary WAV file
-            temp_filename = f'temp_{frequencies[0]}.wav'
-            with wave.open(temp_filename, 'w') as wav_file:
-                wav_file.setnchannels(1)
-                wav_file.setsampwidth(2)
-                wav_file.setframerate(sample_rate)
-                wav_file.writeframes(tone.tobytes())
-            
-            return pygame.mixer.Sound(temp_filename)
-            
-        except Exception as e:
-            print(f"Error creating sound: {e}")
-            return None
-    
-    def create_iphone_radar(self, sample_rate):
-        """Create iPhone Radar-like sound (classic radar beep)"""
-        try:
-            duration = 0.8
-            t = np.linspace(0, duration, int(sample_rate * duration), False)
-            
-            # Radar: ascending beep with echo
-            base_freq = 800
-            tone = np.sin(2 * np.pi * base_freq * t)
-            
-            # Add frequency sweep (ascending)
-            sweep = np.linspace(0.8, 1.2, len(t))
-            tone *= sweep
-            
-            # Add echo effect
-            echo_delay = int(0.1 * sample_rate)
-            echo = np.zeros_like(tone)
-            echo[echo_delay:] = tone[:-echo_delay] * 0.3
-            
-            tone = tone + echo
-            
-            # Apply fade
-            fade_samples = int(0.1 * sample_rate)
-            fade_in = np.linspace(0, 1, fade_samples)
-            fade_out = np.linspace(1, 0, fade_samples)
-            
-            tone[:fade_samples] *= fade_in
-            tone[-fade_samples:] *= fade_out
-            
-            # Normalize and convert
-            tone = tone / np.max(np.abs(tone)) * 16383
-            tone = tone.astype(np.int16)
-            
-            temp_filename = 'temp_radar.wav'
-            with wave.open(temp_filename, 'w') as wav_file:
-                wav_file.setnchannels(1)
-                wav_file.setsampwidth(2)
-                wav_file.setframerate(sample_rate)
-                wav_file.writeframes(tone.tobytes())
-            
-            return pygame.mixer.Sound(temp_filename)
-        except Exception as e:
-            print(f"Error creating iPhone Radar: {e}")
-            return None
-    
-    def create_iphone_beacon(self, sample_rate):
-        """Create iPhone Beacon-like sound (gentle beacon)"""
-        try:
-            duration = 1.2
-            t = np.linspace(0, duration, int(sample_rate * duration), False)
-            
-            # Beacon: gentle pulsing tone
-            base_freq = 600
-            tone = np.sin(2 * np.pi * base_freq * t)
-            
-            # Add gentle pulse modulation
-            pulse_freq = 2  # 2 Hz pulse
-            pulse = 0.7 + 0.3 * np.sin(2 * np.pi * pulse_freq * t)
-            tone *= pulse
-            
-            # Add harmonics for warmth
-            tone += 0.3 * np.sin(2 * np.pi * base_freq * 1.5 * t)
-            tone += 0.2 * np.sin(2 * np.pi * base_freq * 2 * t)
-            
-            # Apply fade
-            fade_samples = int(0.2 * sample_rate)
-            fade_in = np.linspace(0, 1, fade_samples)
-            fade_out = np.linspace(1, 0, fade_samples)
-            
-            tone[:fade_samples] *= fade_in
-            tone[-fade_samples:] *= fade_out
-            
-            # Normalize and convert
-            tone = tone / np.max(np.abs(tone)) * 16383
-            tone = tone.astype(np.int16)
-            
-            temp_filename = 'temp_beacon.wav'
-            with wave.open(temp_filename, 'w') as wav_file:
-                wav_file.setnchannels(1)
-                wav_file.setsampwidth(2)
-                wav_file.setframerate(sample_rate)
-                wav_file.writeframes(tone.tobytes())
-            
-            return pygame.mixer.Sound(temp_filename)
-        except Exception as e:
-            print(f"Error creating iPhone Beacon: {e}")
-            return None
-    
-    def create_iphone_bulletin(self, sample_rate):
-        """Create iPhone Bulletin-like sound (news bulletin style)"""
-        try:
-            duration = 1.0
-            t = np.linspace(0, duration, int(sample_rate * duration), False)
-            
-            # Bulletin: attention-grabbing tone
-            base_freq = 1000
-            tone = np.sin(2 * np.pi * base_freq * t)
-            
-            # Add sharp attack and decay
-            attack_samples = int(0.05 * sample_rate)
-            decay_samples = int(0.1 * sample_rate)
-            
-            attack = np.linspace(0, 1, attack_samples)
-            decay = np.linspace(1, 0.3, decay_samples)
-            
-            tone[:attack_samples] *= attack
-            tone[-decay_samples:] *= decay
-            
-            # Add slight modulation
-            mod_freq = 8  # 8 Hz modulation
-            modulation = 0.9 + 0.1 * np.sin(2 * np.pi * mod_freq * t)
-            tone *= modulation
-            
-            # Normalize and convert
-            tone = tone / np.max(np.abs(tone)) * 16383
-            tone = tone.astype(np.int16)
-            
-            temp_filename = 'temp_bulletin.wav'
-            with wave.open(temp_filename, 'w') as wav_file:
-                wav_file.setnchannels(1)
-                wav_file.setsampwidth(2)
-                wav_file.setframerate(sample_rate)
-                wav_file.writeframes(tone.tobytes())
-            
-            return pygame.mixer.Sound(temp_filename)
-        except Exception as e:
-            print(f"Error creating iPhone Bulletin: {e}")
-            return None
-    
-    def create_iphone_signal(self, sample_rate):
-        """Create iPhone Signal-like sound (signal tone)"""
-        try:
-            duration = 0.6
-            t = np.linspace(0, duration, int(sample_rate * duration), False)
-            
-            # Signal: clean, electronic tone
-            base_freq = 1200
-            tone = np.sin(2 * np.pi * base_freq * t)
-            
-            # Add slight frequency modulation
-            fm_freq = 4  # 4 Hz FM
-            fm_depth = 50  # Hz
-            fm = fm_depth * np.sin(2 * np.pi * fm_freq * t)
-            tone = np.sin(2 * np.pi * (base_freq + fm) * t)
-            
-            # Add harmonics for clarity
-            tone += 0.2 * np.sin(2 * np.pi * base_freq * 2 * t)
-            
-            # Apply fade
-            fade_samples = int(0.1 * sample_rate)
-            fade_in = np.linspace(0, 1, fade_samples)
-            fade_out = np.linspace(1, 0, fade_samples)
-            
-            tone[:fade_samples] *= fade_in
-            tone[-fade_samples:] *= fade_out
-            
-            # Normalize and convert
-            tone = tone / np.max(np.abs(tone)) * 16383
-            tone = tone.astype(np.int16)
-            
-            temp_filename = 'temp_signal.wav'
-            with wave.open(temp_filename, 'w') as wav_file:
-                wav_file.setnchannels(1)
-                wav_file.setsampwidth(2)
-                wav_file.setframerate(sample_rate)
-                wav_file.writeframes(tone.tobytes())
-            
-            return pygame.mixer.Sound(temp_filename)
-        except Exception as e:
-            print(f"Error creating iPhone Signal: {e}")
-            return None
-    
-    def create_iphone_hillside(self, sample_rate):
-        """Create iPhone Hillside-like sound (nature-inspired)"""
-        try:
-            duration = 1.5
-            t = np.linspace(0, duration, int(sample_rate * duration), False)
-            
-            # Hillside: nature-inspired, gentle
-            base_freq = 400
-            tone = np.sin(2 * np.pi * base_freq * t)
-            
-            # Add natural harmonics
-            tone += 0.4 * np.sin(2 * np.pi * base_freq * 1.5 * t)
-            tone += 0.3 * np.sin(2 * np.pi * base_freq * 2.5 * t)
-            tone += 0.2 * np.sin(2 * np.pi * base_freq * 3.5 * t)
-            
-            # Add gentle vibrato
-            vibrato_freq = 6  # 6 Hz vibrato
-            vibrato_depth = 20  # Hz
-            vibrato = vibrato_depth * np.sin(2 * np.pi * vibrato_freq * t)
-            tone = np.sin(2 * np.pi * (base_freq + vibrato) * t)
-            
-            # Apply long fade
-            fade_samples = int(0.3 * sample_rate)
-            fade_in = np.linspace(0, 1, fade_samples)
-            fade_out = np.linspace(1, 0, fade_samples)
-            
-            tone[:fade_samples] *= fade_in
-            tone[-fade_samples:] *= fade_out
-            
-            # Normalize and convert
-            tone = tone / np.max(np.abs(tone)) * 16383
-            tone = tone.astype(np.int16)
-            
-            temp_filename = 'temp_hillside.wav'
-            with wave.open(temp_filename, 'w') as wav_file:
-                wav_file.setnchannels(1)
-                wav_file.setsampwidth(2)
-                wav_file.setframerate(sample_rate)
-                wav_file.writeframes(tone.tobytes())
-            
-            return pygame.mixer.Sound(temp_filename)
-        except Exception as e:
-            print(f"Error creating iPhone Hillside: {e}")
-            return None
-    
-    def create_iphone_playtime(self, sample_rate):
-        """Create iPhone Playtime-like sound (playful tone)"""
-        try:
-            duration = 0.8
-            t = np.linspace(0, duration, int(sample_rate * duration), False)
-            
-            # Playtime: playful, bouncy tone
-            base_freq = 800
-            tone = np.sin(2 * np.pi * base_freq * t)
-            
-            # Add playful modulation
-            mod_freq = 12  # 12 Hz modulation
-            modulation = 0.8 + 0.2 * np.sin(2 * np.pi * mod_freq * t)
-            tone *= modulation
-            
-            # Add harmonics for brightness
-            tone += 0.3 * np.sin(2 * np.pi * base_freq * 1.25 * t)
-            tone += 0.2 * np.sin(2 * np.pi * base_freq * 1.75 * t)
-            
-            # Add slight pitch bend
-            bend = np.linspace(1.0, 1.1, len(t))
-            tone = np.sin(2 * np.pi * base_freq * bend * t)
-            
-            # Apply fade
-            fade_samples = int(0.1 * sample_rate)
-            fade_in = np.linspace(0, 1, fade_samples)
-            fade_out = np.linspace(1, 0, fade_samples)
-            
-            tone[:fade_samples] *= fade_in
-            tone[-fade_samples:] *= fade_out
-            
-            # Normalize and convert
-            tone = tone / np.max(np.abs(tone)) * 16383
-            tone = tone.astype(np.int16)
-            
-            temp_filename = 'temp_playtime.wav'
-            with wave.open(temp_filename, 'w') as wav_file:
-                wav_file.setnchannels(1)
-                wav_file.setsampwidth(2)
-                wav_file.setframerate(sample_rate)
-                wav_file.writeframes(tone.tobytes())
-            
-            return pygame.mixer.Sound(temp_filename)
-        except Exception as e:
-            print(f"Error creating iPhone Playtime: {e}")
-            return None
-    
-    def create_iphone_sencha(self, sample_rate):
-        """Create iPhone Sencha-like sound (calm, zen-like)"""
-        try:
-            duration = 2.0
-            t = np.linspace(0, duration, int(sample_rate * duration), False)
-            
-            # Sencha: calm, zen-like tone
-            base_freq = 300
-            tone = np.sin(2 * np.pi * base_freq * t)
-            
-            # Add very gentle harmonics
-            tone += 0.2 * np.sin(2 * np.pi * base_freq * 2 * t)
-            tone += 0.1 * np.sin(2 * np.pi * base_freq * 3 * t)
-            
-            # Add very slow vibrato
-            vibrato_freq = 2  # 2 Hz vibrato
-            vibrato_depth = 10  # Hz
-            vibrato = vibrato_depth * np.sin(2 * np.pi * vibrato_freq * t)
-            tone = np.sin(2 * np.pi * (base_freq + vibrato) * t)
-            
-            # Apply very long fade
-            fade_samples = int(0.4 * sample_rate)
-            fade_in = np.linspace(0, 1, fade_samples)
-            fade_out = np.linspace(1, 0, fade_samples)
-            
-            tone[:fade_samples] *= fade_in
-            tone[-fade_samples:] *= fade_out
-            
-            # Normalize and convert
-            tone = tone / np.max(np.abs(tone)) * 16383
-            tone = tone.astype(np.int16)
-            
-            temp_filename = 'temp_sencha.wav'
-            with wave.open(temp_filename, 'w') as wav_file:
-                wav_file.setnchannels(1)
-                wav_file.setsampwidth(2)
-                wav_file.setframerate(sample_rate)
-                wav_file.writeframes(tone.tobytes())
-            
-            return pygame.mixer.Sound(temp_filename)
-        except Exception as e:
-            print(f"Error creating iPhone Sencha: {e}")
+    def make_mixer_sound(self, pcm):
+        """Wrap mono PCM from the sound bank in a pygame Sound"""
+        mixer_settings = pygame.mixer.get_init()
+        if not mixer_settings:
             return None
+        channels = mixer_settings[2]
+        if channels > 1:
+            pcm = np.repeat(pcm[:, np.newaxis], channels, axis=1)
+        return pygame.mixer.Sound(buffer=pcm)
     
     def setup_ui(self):
         """Setup the user interface"""
@@ -761,6 +440,22 @@ class FocusAlarm:
         )
         sound_dropdown.pack(pady=5, fill=tk.X)
         sound_dropdown.bind('<<ComboboxSelected>>', self.on_sound_change)
+        self.sound_dropdown = sound_dropdown
+        
+        # Load custom sound button
+        self.load_sound_button = tk.Button(
+            sound_frame,
+            text="Load Custom Sound...",
+            command=self.load_custom_sound,
+            font=('Arial', 10),
+            bg='#16a085',
+            fg='white',
+            relief=tk.FLAT,
+            padx=15,
+            pady=5,
+            cursor='hand2'
+        )
+        self.load_sound_button.pack(pady=5)
         
         # Test sound button
         self.test_sound_button = tk.Button(
@@ -891,21 +586,25 @@ Focus Alarm Features:
                 messagebox.showerror("Error", "Please set a valid time duration")
                 return
                 
-            self.remaining_time = self.total_time
-            self.is_running = True
-            
-            # Update UI
-            self.start_button.config(state=tk.DISABLED)
-            self.stop_button.config(state=tk.NORMAL)
-            self.status_label.config(text="Focus session in progress...")
-            
-            # Start timer thread
-            self.timer_thread = threading.Thread(target=self.timer_loop, daemon=True)
-            self.timer_thread.start()
+            self.session_start = time.time()
+            self.session_deadline = self.session_start + self.total_time
+            self.session_seed = random.randrange(2 ** 32)
+            self.next_alarm = 0
+            # Interval settings are fixed for the session; config edits apply to the next one
+            self.min_interval, self.max_interval = self.intervals
+            self.checkpointer.start(
+                start=self.session_start,
+                deadline=self.session_deadline,
+                total_time=self.total_time,
+                seed=self.session_seed,
+                next_alarm=self.next_alarm,
+                sound=self.current_sound,
+                min_interval=self.min_interval,
+                max_interval=self.max_interval
+            )
             
-            # Start sound thread
-            self.sound_thread = threading.Thread(target=self.sound_loop, daemon=True)
-            self.sound_thread.start()
+            self.begin_session("Focus session in progress...")
+            self.emit('session_start', total_time=self.total_time, sound=self.current_sound)
             
             # Play start sound immediately
             print("Timer started - playing start sound")
@@ -914,10 +613,150 @@ Focus Alarm Features:
         except ValueError:
             messagebox.showerror("Error", "Please enter valid numbers for time")
     
+    def resume_session(self, state):
+        """Continue a session restored from its snapshot"""
+        self.session_start = state['start']
+        self.session_deadline = state['deadline']
+        self.total_time = state['total_time']
+        self.session_seed = state['seed']
+        # Alarms that fell due while the app was closed are skipped, not replayed
+        # Snapshots from before interval settings existed used the defaults
+        self.min_interval = state.get('min_interval', session_state.MIN_INTERVAL)
+        self.max_interval = state.get('max_interval', session_state.MAX_INTERVAL)
+        missed = sum(1 for t in session_state.alarm_times(self.session_seed, self.session_start,
+                                                          self.session_deadline, self.min_interval,
+                                                          self.max_interval) if t <= time.time())
+        self.next_alarm = max(state['next_alarm'], missed)
+        
+        if state['sound'] in self.sound_options:
+            self.sound_var.set(state['sound'])
+            self.current_sound = state['sound']
+        self.checkpointer.start(**dict(state, next_alarm=self.next_alarm, sound=self.current_sound))
+        
+        print(f"Resuming session with {self.session_deadline - time.time():.0f} s left")
+        self.begin_session("Resumed focus session")
+        self.emit('session_resume', remaining=self.remaining_time, sound=self.current_sound)
+    
+    def begin_session(self, status):
+        """Update the UI and hand the session's ticks and alarms to the runtime"""
+        self.remaining_time = max(0, math.ceil(self.session_deadline - time.time()))
+        self.is_running = True
+        
+        # Update UI
+        self.start_button.config(state=tk.DISABLED)
+        self.stop_button.config(state=tk.NORMAL)
+        self.status_label.config(text=status)
+        self.show_remaining(self.remaining_time)
+        
+        # The schedule is derived from the session seed, so a restored session
+        # continues with the same alarm times
+        self.end_runtime_session()
+        self.session_id = next(self.session_ids)
+        self.runtime.submit(
+            self.runtime.start_session, self.total_time, self.current_sound,
+            seed=self.session_seed, start=self.session_start, next_alarm=self.next_alarm, ticks=True,
+            session_id=self.session_id, min_interval=self.min_interval, max_interval=self.max_interval
+        )
+        print(f"Sound loop started - will play sounds every "
+              f"{self.min_interval / 60:g}-{self.max_interval / 60:g} minutes")
+    
+    def end_runtime_session(self):
+        if self.session_id is not None:
+            self.runtime.submit(self.runtime.stop_session, self.session_id)
+            self.session_id = None
+    
+    def on_runtime_event(self, session, event, data):
+        """Session events, called on the runtime's loop thread; only queued here"""
+        if event == 'alarm':
+            tracing.instant('alarm', 'session', index=data['index'],
+                            late_ms=round((time.time() - data['due']) * 1000, 1))
+        self.runtime_events.put((session.id, event, data, session.next_alarm, session.next_time))
+    
+    def poll_runtime_events(self):
+        """Handle queued session events on the Tk thread"""
+        # Not traced: it runs many times a second. Rescheduled first so the
+        # completion dialog's nested event loop keeps polling too
+        self.root.after(RUNTIME_POLL_MS, self.poll_runtime_events)
+        while True:
+            try:
+                session_id, event, data, next_alarm, next_time = self.runtime_events.get_nowait()
+            except queue.Empty:
+                break
+            if session_id != self.session_id:
+                continue  # from a session that was stopped meanwhile
+            if event == 'tick':
+                self.remaining_time = data['remaining']
+                self.show_remaining(self.remaining_time)
+            elif event == 'alarm':
+                self.next_alarm = next_alarm
+                self.checkpointer.update(next_alarm=self.next_alarm)
+                self.emit('alarm', index=data['index'], sound=self.current_sound)
+                if next_time is not None:
+                    print(f"Next sound in {max(0, next_time - time.time())/60:.1f} minutes")
+            elif event == 'complete':
+                self.remaining_time = 0
+                tracing.after(self.root, 0, self.session_complete)
+    
+    def play_alarm(self, session):
+        """Play an interval alarm (runs on the runtime's executor)"""
+        print("Playing interval sound...")
+        self.play_sound()
+    
+    def show_remaining(self, remaining):
+        hours = remaining // 3600
+        minutes = (remaining % 3600) // 60
+        seconds = remaining % 60
+        
+        time_str = f"{hours:02d}:{minutes:02d}:{seconds:02d}"
+        
+        # Update progress
+        progress = ((self.total_time - remaining) / self.total_time) * 100
+        
+        self.update_display(time_str, progress)
+    
+    def on_config_reload(self, overrides, intervals, report):
+        """Install re-rendered presets (runs on the config watcher thread)"""
+        if self.sound_table:
+            self.sound_table.swap(overrides)
+        if report['changed']:
+            # pygame Sounds for the changed presets only, swapped in as a whole table
+            options = dict(self.sound_options)
+            for name in report['changed']:
+                try:
+                    options[name] = self.make_mixer_sound(self.sound_table.get(name)) if self.sound_table else None
+                except Exception as e:
+                    print(f"Error creating sound {name}: {e}")
+            self.sound_options = options
+            if not (self.player and self.player.alive()):
+                # afplay and the terminal bell play fixed system sounds
+                print("Edited presets take effect through the player process, which isn't "
+                      "running; alarms keep using the system sounds")
+        self.intervals = intervals
+    
+    def emit(self, event, **data):
+        """Queue a webhook event; delivery happens on background threads"""
+        if self.webhooks:
+            self.webhooks.emit(event, session=self.session_start, **data)
+    
+    def record_session(self, outcome):
+        """Add the session that just ended to the history"""
+        if not self.history:
+            return
+        try:
+            history.record(self.history, getpass.getuser(), self.session_start, time.time(),
+                           self.total_time, self.next_alarm, self.current_sound, outcome)
+        except sqlite3.Error as e:
+            print(f"Could not record session: {e}")
+    
     def stop_timer(self):
         """Stop the focus timer"""
+        if self.is_running:
+            self.record_session('stopped')
         self.is_running = False
         self.remaining_time = 0
+        self.end_runtime_session()
+        self.checkpointer.clear()
+        self.emit('session_stop')
         
         # Update UI
         self.start_button.config(state=tk.NORMAL)
@@ -926,55 +765,52 @@ Focus Alarm Features:
         self.time_display.config(text="00:00:00")
         self.progress_var.set(0)
     
-    def timer_loop(self):
-        """Main timer loop"""
-        while self.is_running and self.remaining_time > 0:
-            # Update display
-            hours = self.remaining_time // 3600
-            minutes = (self.remaining_time % 3600) // 60
-            seconds = self.remaining_time % 60
-            
-            time_str = f"{hours:02d}:{minutes:02d}:{seconds:02d}"
-            
-            # Update progress
-            progress = ((self.total_time - self.remaining_time) / self.total_time) * 100
-            
-            # Update UI in main thread
-            self.root.after(0, self.update_display, time_str, progress)
-            
-            time.sleep(1)
-            self.remaining_time -= 1
-        
-        if self.remaining_time <= 0:
-            self.root.after(0, self.session_complete)
-    
-    def sound_loop(self):
-        """Sound loop with random intervals"""
-        print("Sound loop started - will play sounds every 3-5 minutes")
-        
-        while self.is_running and self.remaining_time > 0:
-            # Random interval between 3-5 minutes (180-300 seconds)
-            interval = random.uniform(180, 300)
-            print(f"Next sound in {interval/60:.1f} minutes")
-            
-            # Wait for the interval or until timer stops
-            start_time = time.time()
-            while self.is_running and self.remaining_time > 0 and (time.time() - start_time) < interval:
-                time.sleep(1)
-            
-            # Play sound if timer is still running
-            if self.is_running and self.remaining_time > 0:
-                print("Playing interval sound...")
-                self.play_sound()
-    
     def on_sound_change(self, event=None):
         """Handle sound selection change"""
         self.current_sound = self.sound_var.get()
         print(f"Sound changed to: {self.current_sound}")
+        self.checkpointer.update(sound=self.current_sound)
+    
+    def load_custom_sound(self):
+        """Pick an audio file and import it in the background"""
+        path = filedialog.askopenfilename(
+            title="Choose an alarm sound",
+            filetypes=[("Audio files", "*.wav *.ogg *.mp3 *.flac"), ("All files", "*.*")]
+        )
+        if not path:
+            return
+        
+        self.load_sound_button.config(state=tk.DISABLED, text="Loading...")
+        self.sound_importer.submit(path, self.on_custom_sound_decoded)
+    
+    def on_custom_sound_decoded(self, path, pcm, error):
+        """Called on the import thread; hand the result to the main thread"""
+        tracing.after(self.root, 0, self.finish_custom_sound, path, pcm, error)
+    
+    def finish_custom_sound(self, path, pcm, error):
+        """Install an imported sound as the selected custom sound"""
+        self.load_sound_button.config(state=tk.NORMAL, text="Load Custom Sound...")
+        if error:
+            print(f"Error importing {path}: {error}")
+            messagebox.showerror("Error", f"Could not load sound:\n{error}")
+            return
+        
+        try:
+            self.custom_sound = self.make_mixer_sound(pcm)
+        except Exception as e:
+            print(f"Error creating custom sound: {e}")
+            self.custom_sound = None
+        self.custom_sound_name = f"Custom: {os.path.basename(path)}"
+        
+        self.sound_dropdown.config(values=list(self.sound_options.keys()) + [self.custom_sound_name])
+        self.sound_var.set(self.custom_sound_name)
+        self.on_sound_change()
     
     def test_current_sound(self):
         """Test the currently selected sound"""
         try:
+            if self.play_custom_sound():
+                return
             # Always use system sounds since pygame isn't working reliably
             self.play_system_sound_bluetooth()
             print(f"Playing system sound for: {self.current_sound}")
@@ -982,9 +818,19 @@ Focus Alarm Features:
             print(f"Error testing sound: {e}")
             print('\a')
     
+    def play_custom_sound(self):
+        """Play the imported sound if it is selected; returns True if it played"""
+        if self.current_sound != self.custom_sound_name or self.custom_sound is None:
+            return False
+        self.custom_sound.play()
+        print(f"Played custom sound: {self.custom_sound_name}")
+        return True
+    
     def play_sound(self):
         """Play the selected sound"""
         try:
+            if self.play_custom_sound():
+                return
             # Always use system sounds since pygame isn't working reliably
             self.play_system_sound_bluetooth()
         except Exception as e:
@@ -999,40 +845,101 @@ Focus Alarm Features:
     
     def session_complete(self):
         """Handle session completion"""
-        self.is_running = False
-        
-        # Play final sound
-        for _ in range(3):
-            self.play_sound()
-            time.sleep(0.5)
-        
-        # Update UI
-        self.start_button.config(state=tk.NORMAL)
-        self.stop_button.config(state=tk.DISABLED)
-        self.status_label.config(text="Focus session completed!")
+        # Traced up to the (modal) completion message
+        with tracing.span('session_complete', 'session', sound=self.current_sound):
+            self.is_running = False
+            self.session_id = None
+            self.checkpointer.clear()
+            self.emit('session_complete', total_time=self.total_time)
+            self.record_session('complete')
+            
+            # Play final sound three times, 0.5 s apart
+            if self.mixer and self.current_sound in self.sound_table.index:
+                # Scheduled sample-accurately on the mixer, without blocking the UI
+                pcm = self.sound_table.get(self.current_sound)
+                for i in range(3):
+                    self.mixer.play(pcm, at=self.mixer.frames_from_now(0.5 * i))
+            else:
+                for _ in range(3):
+                    self.play_sound()
+                    time.sleep(0.5)
+            
+            # Update UI
+            self.start_button.config(state=tk.NORMAL)
+            self.stop_button.config(state=tk.DISABLED)
+            self.status_label.config(text="Focus session completed!")
         
         # Show completion message
         messagebox.showinfo("Session Complete", "Great job! Your focus session is complete.")
     
+    def write_trace(self, event=None):
+        """Save the recorded timeline as Chrome trace JSON"""
+        if not tracing.enabled:
+            print("Tracing is off; start with FOCUS_ALARM_TRACE=1 to record a timeline")
+            return
+        try:
+            print(f"Trace written to {tracing.write()}")
+        except OSError as e:
+            print(f"Could not write trace: {e}")
+    
     def on_closing(self):
         """Handle window closing"""
         self.is_running = False
-        
-        # Clean up temporary sound files
-        temp_files = [
-            'temp_800.wav', 'temp_radar.wav', 'temp_beacon.wav', 'temp_bulletin.wav',
-            'temp_signal.wav', 'temp_hillside.wav', 'temp_playtime.wav', 'temp_sencha.wav'
-        ]
-        for temp_file in temp_files:
-            if os.path.exists(temp_file):
-                try:
-                    os.remove(temp_file)
-                except:
-                    pass
+        if tracing.enabled:
+            self.write_trace()
+        # Keep the snapshot of a running session so the next start resumes it
+        self.runtime.close()
+        self.checkpointer.flush()
+        if self.webhooks:
+            # Undelivered events are saved and sent on the next launch
+            self.webhooks.close()
+        if self.history:
+            self.history.close()
+        self.config_watcher.close()
+        self.sound_importer.shutdown()
+        if self.player:
+            self.player.close()
+        
+        # Release the shared sound bank (deleted when the last user exits)
+        for key in self.sound_options:
+            self.sound_options[key] = None
+        if self.sound_bank:
+            self.sound_bank.close()
         
         self.root.destroy()
 
+def export_history(argv):
+    """`focus_alarm.py export`: stream the session history to a file or stdout"""
+    parser = argparse.ArgumentParser(prog='focus_alarm.py export',
+                                     description="Export Focus Alarm session history")
+    parser.add_argument('-f', '--format', choices=sorted(history.FORMATS), default='ndjson')
+    parser.add_argument('--from', dest='start', help="first session start (ISO date/time or Unix seconds)")
+    parser.add_argument('--to', dest='end', help="end of the range, exclusive")
+    parser.add_argument('--user', help="only this user's sessions")
+    parser.add_argument('--gzip', action='store_true', help="gzip the output")
+    parser.add_argument('--db', help="history database (default ~/.focus_alarm/history.db)")
+    parser.add_argument('-o', '--output', help="output file (default stdout)")
+    args = parser.parse_args(argv)
+    try:
+        start, end = history.parse_time(args.start), history.parse_time(args.end)
+    except ValueError as e:
+        parser.error(str(e))
+    
+    chunks = history.export(args.format, start, end, args.user, args.gzip, args.db)
+    out = open(args.output, 'wb') if args.output else sys.stdout.buffer
+    try:
+        for chunk in chunks:
+            out.write(chunk)
+    except BrokenPipeError:
+        pass
+    finally:
+        if args.output:
+            out.close()
+    return 0
+
 def main():
+    if sys.argv[1:2] == ['export']:
+        sys.exit(export_history(sys.argv[2:]))
     try:
         root = tk.Tk()
         app = FocusAlarm(root)
@@ -10,9 +10,21 @@ class FocusAlarm {
         this.startTime = null;  // Track actual start time
         this.endTime = null;    // Track when timer should end
         this.nextSoundTime = null; // Track next sound time
+        this.soundUrls = null;     // Pre-rendered WAV URLs from the server, if any
+        this.soundBuffers = new Map(); // Decoded AudioBuffers (promises), decoded once per sound
+        this.decodeCount = 0;
+        this.room = new URLSearchParams(window.location.search).get('room'); // Shared session id, or 'new'
+        this.roomEvents = null;    // EventSource following the room
+        this.clockOffset = 0;      // Server clock minus ours, in ms
+        this.roomSound = null;     // The room's sound, played instead of ours while in it
         
         this.initializeAudio();
         this.setupEventListeners();
+        this.loadSoundBuffer(this.currentSound);
+        
+        if (this.room && this.room !== 'new') {
+            this.joinRoom(this.room);
+        }
     }
     
     initializeAudio() {
@@ -38,9 +50,53 @@ class FocusAlarm {
         document.getElementById('testSoundBtn').addEventListener('click', () => this.testSound());
         document.getElementById('soundSelect').addEventListener('change', (e) => {
             this.currentSound = e.target.value;
+            this.loadSoundBuffer(this.currentSound);
         });
     }
     
+    async fetchSoundUrls() {
+        // The Flask server publishes versioned WAV URLs; static hosting has none
+        if (!this.soundUrls) {
+            this.soundUrls = fetch('sounds.json')
+                .then((response) => response.ok ? response.json() : {})
+                .catch(() => ({}));
+        }
+        return this.soundUrls;
+    }
+    
+    loadSoundBuffer(soundName) {
+        // Fetch and decode each server-rendered sound once, then reuse the AudioBuffer
+        if (!this.audioContext) {
+            return Promise.resolve(null);
+        }
+        if (!this.soundBuffers.has(soundName)) {
+            const bufferPromise = (async () => {
+                const urls = await this.fetchSoundUrls();
+                if (!urls[soundName]) {
+                    return null;
+                }
+                const response = await fetch(urls[soundName]);
+                const data = await response.arrayBuffer();
+                const buffer = await this.audioContext.decodeAudioData(data);
+                this.decodeCount++;
+                console.log(`Decoded ${soundName} (${this.decodeCount} decodes total)`);
+                return buffer;
+            })().catch((e) => {
+                console.error(`Failed to load ${soundName}:`, e);
+                return null;
+            });
+            this.soundBuffers.set(soundName, bufferPromise);
+        }
+        return this.soundBuffers.get(soundName);
+    }
+    
+    playBuffer(buffer) {
+        const source = this.audioContext.createBufferSource();
+        source.buffer = buffer;
+        source.connect(this.audioContext.destination);
+        source.start();
+    }
+    
     startTimer() {
         console.log('Start timer clicked');
         const hours = parseInt(document.getElementById('hours').value) || 0;
@@ -57,6 +113,13 @@ class FocusAlarm {
             return;
         }
         
+        // ?room=new: start a shared session on the server instead of a local one
+        if (this.room === 'new') {
+            this.createRoom(this.totalTime / 60);
+            this.playSound();
+            return;
+        }
+        
         // Use real timestamps instead of counting
         this.startTime = Date.now();
         this.endTime = this.startTime + (this.totalTime * 1000);
@@ -80,7 +143,80 @@ class FocusAlarm {
         this.playSound();
     }
     
+    async createRoom(minutes) {
+        try {
+            const response = await fetch('rooms', {
+                method: 'POST',
+                headers: { 'Content-Type': 'application/json' },
+                body: JSON.stringify({ minutes, sound: this.currentSound })
+            });
+            if (!response.ok) {
+                throw new Error(`HTTP ${response.status}`);
+            }
+            const state = await response.json();
+            this.room = state.room;
+            // Share this URL to let others join
+            window.history.replaceState(null, '', `?room=${state.room}`);
+            this.joinRoom(state.room);
+        } catch (e) {
+            console.error('Could not create room:', e);
+            document.getElementById('status').textContent = 'Could not create room';
+        }
+    }
+    
+    joinRoom(roomId) {
+        // The server runs the schedule; we only follow its events
+        this.roomEvents = new EventSource(`rooms/${encodeURIComponent(roomId)}/events`);
+        this.roomEvents.addEventListener('state', (e) => this.followRoom(JSON.parse(e.data)));
+        // Everyone in the room hears the room's sound, whatever they picked
+        this.roomEvents.addEventListener('alarm', (e) => this.playSound(JSON.parse(e.data).sound));
+        this.roomEvents.addEventListener('complete', () => {
+            this.leaveRoom();
+            this.sessionComplete();
+        });
+        this.roomEvents.addEventListener('stopped', () => this.stopTimer());
+        this.roomEvents.onerror = () => {
+            // EventSource reconnects by itself and gets a fresh state snapshot
+            console.warn('Room connection lost, reconnecting...');
+        };
+    }
+    
+    followRoom(state) {
+        if (state.finished) {
+            this.leaveRoom();
+            document.getElementById('status').textContent = `Room session ${state.finished}`;
+            return;
+        }
+        this.clockOffset = state.server_time * 1000 - Date.now();
+        this.startTime = state.start * 1000 - this.clockOffset;
+        this.endTime = state.deadline * 1000 - this.clockOffset;
+        this.totalTime = state.total_time;
+        this.isRunning = true;
+        this.roomSound = state.sound;
+        this.loadSoundBuffer(state.sound);
+        
+        document.getElementById('startBtn').disabled = true;
+        document.getElementById('stopBtn').disabled = false;
+        document.getElementById('status').textContent = `Focus room: ${state.listeners} in session`;
+        document.querySelector('.card').classList.add('running');
+        
+        if (!this.timerInterval) {
+            this.timerInterval = setInterval(() => this.updateTimer(), 1000);
+        }
+        this.updateTimer();
+    }
+    
+    leaveRoom() {
+        if (this.roomEvents) {
+            this.roomEvents.close();
+            this.roomEvents = null;
+        }
+    }
+    
     stopTimer() {
+        // Stopping leaves the room; the shared session goes on for the others
+        this.leaveRoom();
+        this.roomSound = null;
         this.isRunning = false;
         this.startTime = null;
         this.endTime = null;
@@ -117,7 +253,10 @@ class FocusAlarm {
         const remainingMs = this.endTime - now;
         
         if (remainingMs <= 0) {
-            this.sessionComplete();
+            // In a room the server announces completion
+            if (!this.roomEvents) {
+                this.sessionComplete();
+            }
             return;
         }
         
@@ -165,7 +304,7 @@ class FocusAlarm {
         this.playSound();
     }
     
-    async playSound() {
+    async playSound(soundName = this.currentSound) {
         if (!this.audioContext) {
             // Try to resume audio context (browsers require user interaction)
             this.audioContext = new (window.AudioContext || window.webkitAudioContext)();
@@ -185,27 +324,19 @@ class FocusAlarm {
         }
         
         try {
-            const soundFunction = this.getSoundFunction(this.currentSound);
-            soundFunction();
+            // Pre-rendered sounds come from sounds.json; without one (e.g. the
+            // page opened from disk) fall back to a plain beep
+            const buffer = await this.loadSoundBuffer(soundName);
+            if (buffer) {
+                this.playBuffer(buffer);
+                return;
+            }
+            this.createDefaultBeep();
         } catch (e) {
             console.error('Error playing sound:', e);
         }
     }
     
-    getSoundFunction(soundName) {
-        const sounds = {
-            'Default Beep': () => this.createDefaultBeep(),
-            'Quick Bell': () => this.createQuickBell(),
-            'Gentle Ping': () => this.createGentlePing(),
-            'Water Drop': () => this.createWaterDrop(),
-            'Wind Chime': () => this.createWindChime(),
-            'Marimba': () => this.createMarimba(),
-            'Calm Ding': () => this.createCalmDing()
-        };
-        
-        return sounds[soundName] || sounds['Default Beep'];
-    }
-    
     // Default Beep - Original sound from old version
     createDefaultBeep() {
         const oscillator = this.audioContext.createOscillator();
@@ -227,158 +358,6 @@ class FocusAlarm {
         oscillator.stop(now + duration);
     }
     
-    // Quick Bell - High-pitched, crispy, clean metallic bell tap
-    createQuickBell() {
-        const now = this.audioContext.currentTime;
-        const duration = 0.22; // Even shorter for cleaner sound
-        
-        // High-pitched metal bell with bright harmonics for crispy, clean sound
-        const frequencies = [
-            { freq: 1760, gain: 0.28 },  // A6 - high fundamental
-            { freq: 2640, gain: 0.20 },  // 1.5x harmonic (brightness)
-            { freq: 3520, gain: 0.14 },  // 2x harmonic (crisp high end)
-            { freq: 5280, gain: 0.08 }   // 3x harmonic (ultra-crisp shimmer)
-        ];
-        
-        frequencies.forEach(({ freq, gain }) => {
-            const oscillator = this.audioContext.createOscillator();
-            const gainNode = this.audioContext.createGain();
-            
-            oscillator.connect(gainNode);
-            gainNode.connect(this.audioContext.destination);
-            
-            oscillator.frequency.value = freq;
-            oscillator.type = 'sine'; // Pure tones for clean metallic quality
-            
-            // Ultra-sharp attack for maximum crispness
-            gainNode.gain.setValueAtTime(0, now);
-            gainNode.gain.linearRampToValueAtTime(gain, now + 0.003); // Instant crisp attack
-            gainNode.gain.exponentialRampToValueAtTime(0.01, now + duration);
-            
-            oscillator.start(now);
-            oscillator.stop(now + duration);
-        });
-    }
-    
-    // Gentle Ping - Soft notification sound
-    createGentlePing() {
-        const oscillator = this.audioContext.createOscillator();
-        const gainNode = this.audioContext.createGain();
-        
-        oscillator.connect(gainNode);
-        gainNode.connect(this.audioContext.destination);
-        
-        oscillator.frequency.value = 880; // A5 note
-        oscillator.type = 'sine';
-        
-        const now = this.audioContext.currentTime;
-        const duration = 0.3;
-        
-        gainNode.gain.setValueAtTime(0, now);
-        gainNode.gain.linearRampToValueAtTime(0.15, now + 0.01);
-        gainNode.gain.exponentialRampToValueAtTime(0.01, now + duration);
-        
-        oscillator.start(now);
-        oscillator.stop(now + duration);
-    }
-    
-    // Water Drop - Natural water droplet sound
-    createWaterDrop() {
-        const oscillator = this.audioContext.createOscillator();
-        const gainNode = this.audioContext.createGain();
-        
-        oscillator.connect(gainNode);
-        gainNode.connect(this.audioContext.destination);
-        
-        oscillator.type = 'sine';
-        
-        const now = this.audioContext.currentTime;
-        const duration = 0.4;
-        
-        // Frequency drops quickly like water
-        oscillator.frequency.setValueAtTime(800, now);
-        oscillator.frequency.exponentialRampToValueAtTime(400, now + duration);
-        
-        gainNode.gain.setValueAtTime(0, now);
-        gainNode.gain.linearRampToValueAtTime(0.2, now + 0.01);
-        gainNode.gain.exponentialRampToValueAtTime(0.01, now + duration);
-        
-        oscillator.start(now);
-        oscillator.stop(now + duration);
-    }
-    
-    // Wind Chime - Multiple gentle tones
-    createWindChime() {
-        const notes = [659, 784, 880, 1047]; // E5, G5, A5, C6
-        const now = this.audioContext.currentTime;
-        
-        notes.forEach((freq, i) => {
-            const delay = i * 0.08;
-            const oscillator = this.audioContext.createOscillator();
-            const gainNode = this.audioContext.createGain();
-            
-            oscillator.connect(gainNode);
-            gainNode.connect(this.audioContext.destination);
-            
-            oscillator.frequency.value = freq;
-            oscillator.type = 'triangle';
-            
-            const startTime = now + delay;
-            const duration = 1.2;
-            
-            gainNode.gain.setValueAtTime(0, startTime);
-            gainNode.gain.linearRampToValueAtTime(0.12, startTime + 0.05);
-            gainNode.gain.exponentialRampToValueAtTime(0.01, startTime + duration);
-            
-            oscillator.start(startTime);
-            oscillator.stop(startTime + duration);
-        });
-    }
-    
-    // Marimba - Warm wooden tone
-    createMarimba() {
-        const oscillator = this.audioContext.createOscillator();
-        const gainNode = this.audioContext.createGain();
-        
-        oscillator.connect(gainNode);
-        gainNode.connect(this.audioContext.destination);
-        
-        oscillator.frequency.value = 440; // A4 note
-        oscillator.type = 'triangle';
-        
-        const now = this.audioContext.currentTime;
-        const duration = 0.8;
-        
-        gainNode.gain.setValueAtTime(0, now);
-        gainNode.gain.linearRampToValueAtTime(0.25, now + 0.02);
-        gainNode.gain.exponentialRampToValueAtTime(0.01, now + duration);
-        
-        oscillator.start(now);
-        oscillator.stop(now + duration);
-    }
-    
-    // Calm Ding - Subtle reminder
-    createCalmDing() {
-        const oscillator = this.audioContext.createOscillator();
-        const gainNode = this.audioContext.createGain();
-        
-        oscillator.connect(gainNode);
-        gainNode.connect(this.audioContext.destination);
-        
-        oscillator.frequency.value = 698; // F5 note
-        oscillator.type = 'sine';
-        
-        const now = this.audioContext.currentTime;
-        const duration = 0.6;
-        
-        gainNode.gain.setValueAtTime(0, now);
-        gainNode.gain.linearRampToValueAtTime(0.18, now + 0.03);
-        gainNode.gain.exponentialRampToValueAtTime(0.01, now + duration);
-        
-        oscillator.start(now);
-        oscillator.stop(now + duration);
-    }
-    
     sessionComplete() {
         this.isRunning = false;
         
@@ -388,10 +367,12 @@ class FocusAlarm {
         }
         
         // Play completion sound 3 times
+        const sound = this.roomSound || this.currentSound;
+        this.roomSound = null;
         let count = 0;
         const playCompletion = () => {
             if (count < 3) {
-                this.playSound();
+                this.playSound(sound);
                 count++;
                 setTimeout(playCompletion, 500);
             }
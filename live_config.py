@@ -0,0 +1,205 @@
+"""
+Sound presets and alarm intervals from a config file, reloaded while the
+app runs.
+
+~/.focus_alarm/config.json (all keys optional):
+
+    {
+        "min_interval": 150,
+        "max_interval": 270,
+        "presets": {
+            "iPhone Radar": {"duration": 0.6, "voices": [{"freq": 900}], "chain": [...]},
+            "Default Beep": {"duration": 0.4, "frequencies": [880, 1320], "amplitudes": [1.0, 0.3]}
+        }
+    }
+
+A preset entry replaces that built-in preset and uses the same forms as
+render_sounds.py parameter files (a DSP graph, frequencies, or another
+"preset" by name). Removing an entry brings the built-in sound back.
+
+ConfigWatcher polls the file's mtime and size (one stat() per second)
+on a background thread. On a change it compares a hash of every
+preset's parameters with what is currently rendered and renders only
+the presets that differ; the others, and every preset still at its
+built-in definition, keep using the shared sound bank. The new overlay
+is handed over in one reference swap (SoundTable.swap), so a sound that
+is playing keeps its samples, and a running session keeps its schedule:
+new intervals apply from the next session on.
+
+Every player backend picks up edited presets: PCM sinks (paplay/aplay)
+read them from the table, and the pygame worker, which maps its own
+copy of the bank, is sent each one as a WAV file (see player.py). Only
+the last-resort fallbacks (afplay of macOS system sounds, the terminal
+bell) don't play presets at all, so edits can't reach them; the app
+says so when a reload happens without a player.
+"""
+
+import hashlib
+import json
+import os
+import threading
+import time
+
+import render_sounds
+import session_state
+import sounds
+import tracing
+
+POLL_SECONDS = 1.0
+
+
+def default_path():
+    return os.path.join(os.path.dirname(session_state.default_path()), 'config.json')
+
+
+def spec_key(spec):
+    """Hash of a preset's parameters; equal specs render equal sounds"""
+    return hashlib.sha1(json.dumps(spec, sort_keys=True).encode('utf-8')).hexdigest()
+
+
+def read_config(path):
+    """Parse and check the config file; raises ValueError if it is invalid"""
+    with open(path) as f:
+        config = json.load(f)
+    if not isinstance(config, dict):
+        raise ValueError("config must be a JSON object")
+    min_interval = float(config.get('min_interval', session_state.MIN_INTERVAL))
+    max_interval = float(config.get('max_interval', session_state.MAX_INTERVAL))
+    if not 0 < min_interval <= max_interval:
+        raise ValueError("need 0 < min_interval <= max_interval")
+    presets = config.get('presets', {})
+    if not isinstance(presets, dict):
+        raise ValueError("presets must be an object of name: sound")
+    for name, spec in presets.items():
+        if name not in sounds.PRESETS:
+            raise ValueError(f"unknown preset {name!r}")
+        if not isinstance(spec, dict) or not {'preset', 'frequencies', 'voices'} & set(spec):
+            raise ValueError(f"{name}: needs a preset, frequencies or voices")
+    return {'min_interval': min_interval, 'max_interval': max_interval, 'presets': presets}
+
+
+class SoundTable:
+    """Preset PCM: the shared sound bank, overlaid with presets rendered from the config"""
+
+    def __init__(self, bank):
+        self.bank = bank
+        self.overrides = {}
+
+    @property
+    def index(self):
+        return self.bank.index
+
+    def get(self, name):
+        pcm = self.overrides.get(name)
+        return self.bank.get(name) if pcm is None else pcm
+
+    def sample_rate(self, name):
+        return self.bank.sample_rate(name)
+
+    def swap(self, overrides):
+        """Install a new overlay; readers see the old one or the new one, never a mix"""
+        self.overrides = overrides
+
+
+class ConfigWatcher:
+    """Watches the config file and re-renders changed presets on its own thread"""
+
+    def __init__(self, path=None, sample_rate=sounds.SAMPLE_RATE, on_reload=None,
+                 poll_seconds=POLL_SECONDS):
+        self.path = path or default_path()
+        self.sample_rate = sample_rate
+        self.on_reload = on_reload  # on_reload(overrides, intervals, report), on the watcher thread
+        self.poll_seconds = poll_seconds
+        self.keys = {name: spec_key(spec) for name, spec in sounds.PRESETS.items()}
+        self.overrides = {}
+        self.intervals = (session_state.MIN_INTERVAL, session_state.MAX_INTERVAL)
+        self.reloads = 0
+        self.renders = 0
+        self.last_report = None
+        self._stamp = None
+        self._stop = threading.Event()
+        self._thread = None
+
+    def check(self):
+        """Reload if the file changed since the last check; returns the report or None"""
+        try:
+            stat = os.stat(self.path)
+            stamp = (stat.st_mtime_ns, stat.st_size)
+        except FileNotFoundError:
+            stat = stamp = None
+        if stamp == self._stamp:
+            return None
+        self._stamp = stamp
+        return self.reload(stat.st_mtime if stat else None)
+
+    def reload(self, modified=None):
+        """Apply the file as it is now; only presets that changed are rendered"""
+        start = time.perf_counter()
+        try:
+            if os.path.exists(self.path):
+                config = read_config(self.path)
+            else:
+                config = {'min_interval': session_state.MIN_INTERVAL,
+                          'max_interval': session_state.MAX_INTERVAL, 'presets': {}}
+        except (OSError, ValueError, TypeError) as e:
+            print(f"Ignoring config {self.path}: {e}")
+            return None
+
+        specs = dict(sounds.PRESETS, **config['presets'])
+        changed = [name for name, spec in specs.items() if spec_key(spec) != self.keys[name]]
+        overrides = dict(self.overrides)
+        rendered = []
+        for name in changed:
+            if name in config['presets']:
+                try:
+                    with tracing.span('config render', 'sounds', preset=name):
+                        pcm = render_sounds.render_spec(config['presets'][name], self.sample_rate)
+                except Exception as e:
+                    print(f"Could not render preset {name}: {e}")
+                    continue
+                overrides[name] = pcm
+                rendered.append(name)
+            else:
+                overrides.pop(name, None)  # back to the built-in sound in the bank
+            self.keys[name] = spec_key(specs[name])
+        render_seconds = time.perf_counter() - start
+
+        intervals = (config['min_interval'], config['max_interval'])
+        report = {
+            'changed': [name for name in changed if self.keys[name] == spec_key(specs[name])],
+            'rendered': rendered,
+            'intervals_changed': intervals != self.intervals,
+            'render_seconds': render_seconds,
+        }
+        self.overrides = overrides
+        self.intervals = intervals
+        if self.on_reload:
+            self.on_reload(overrides, intervals, report)
+        # From the file's modification (so including the polling delay) to the swap
+        report['latency'] = time.time() - modified if modified else None
+        self.reloads += 1
+        self.renders += len(rendered)
+        self.last_report = report
+        latency = f", {report['latency'] * 1000:.0f} ms after the edit" if report['latency'] is not None else ''
+        print(f"Config reloaded: {len(rendered)} preset(s) re-rendered in {render_seconds * 1000:.0f} ms"
+              f"{latency}; intervals {intervals[0]:g}-{intervals[1]:g} s")
+        return report
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, daemon=True, name='config-watcher')
+        self._thread.start()
+        return self
+
+    def _run(self):
+        while True:
+            try:
+                self.check()
+            except Exception as e:
+                print(f"Config watcher error: {e}")
+            if self._stop.wait(self.poll_seconds):
+                return
+
+    def close(self):
+        self._stop.set()
+        if self._thread:
+            self._thread.join(timeout=2)
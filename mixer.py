@@ -0,0 +1,250 @@
+"""
+Software mixer for overlapping alarms.
+
+Every sound that should be heard becomes a voice on one mixer clock
+(counted in frames). The mixer sums the active voices into fixed-size
+NumPy blocks, applies per-voice gain and a peak limiter, and hands the
+result to a single output stream, so alarms from several sessions or
+timers overlap instead of cutting each other off or fighting over the
+device.
+
+Threads never share a lock on the audio path:
+* play() only appends to a deque (atomic under the GIL); the mixer
+  thread picks new voices up at the start of the next block.
+* Mixed blocks go through a single-producer/single-consumer ring buffer
+  from the mixer thread to the output thread, which writes them to the
+  output (e.g. the player process's stdin). When the ring runs dry the
+  output thread writes silence and counts an underrun.
+
+Without start(), render() mixes synchronously into a buffer. That
+headless mode is what tests and benchmarks use to check that voices
+start on exactly the frame they were scheduled for.
+"""
+
+import collections
+import threading
+import time
+
+import numpy as np
+
+BLOCK_SIZE = 1024
+LATENCY_BLOCKS = 4
+LIMIT = 32000  # limiter ceiling, just under int16 full scale
+RELEASE_SECONDS = 0.2
+
+
+class OutputClosed(OSError):
+    """Raised by a write callback when its output is gone for good; the mixer stops"""
+
+
+class RingBuffer:
+    """Single-producer/single-consumer ring of int16 frames"""
+
+    def __init__(self, capacity):
+        self.capacity = capacity
+        self._data = np.zeros(capacity, dtype=np.int16)
+        # Monotonic counters; each is only ever written by one side
+        self._written = 0
+        self._read = 0
+
+    def available(self):
+        return self._written - self._read
+
+    def free(self):
+        return self.capacity - self.available()
+
+    def write(self, frames):
+        """Copy as many frames as fit; returns the number written"""
+        n = min(len(frames), self.free())
+        start = self._written % self.capacity
+        first = min(n, self.capacity - start)
+        self._data[start:start + first] = frames[:first]
+        self._data[:n - first] = frames[first:n]
+        self._written += n
+        return n
+
+    def read(self, out):
+        """Fill out with up to len(out) frames; returns the number read"""
+        n = min(len(out), self.available())
+        start = self._read % self.capacity
+        first = min(n, self.capacity - start)
+        out[:first] = self._data[start:start + first]
+        out[first:n] = self._data[:n - first]
+        self._read += n
+        return n
+
+
+class Voice:
+    __slots__ = ('pcm', 'gain', 'start', 'position')
+
+    def __init__(self, pcm, gain, start):
+        self.pcm = pcm
+        self.gain = gain
+        self.start = start  # mixer frame on which the first sample plays
+        self.position = 0
+
+
+class Mixer:
+    """Sums scheduled voices into one limited int16 stream"""
+
+    def __init__(self, sample_rate, block_size=BLOCK_SIZE, latency_blocks=LATENCY_BLOCKS,
+                 limit=LIMIT):
+        self.sample_rate = sample_rate
+        self.block_size = block_size
+        self.limit = limit
+        self.frame = 0  # next frame to be mixed
+        self.voices = []
+        self._pending = collections.deque()
+        self._mix = np.zeros(block_size, dtype=np.float32)
+        self._scratch = np.zeros(block_size, dtype=np.float32)
+        self._ramp = np.linspace(0, 1, block_size, endpoint=False, dtype=np.float32)
+        self._gain = 1.0
+        self._release = block_size / (RELEASE_SECONDS * sample_rate)
+        self.ring = RingBuffer(block_size * latency_blocks)
+
+        self.underruns = 0
+        self.blocks = 0
+        self.limited_blocks = 0
+        self._running = False
+        self._threads = []
+
+    def frames_from_now(self, seconds):
+        """Mixer frame that is `seconds` after the next block to be mixed"""
+        return self.frame + int(round(seconds * self.sample_rate))
+
+    def play(self, pcm, gain=1.0, at=None):
+        """Schedule int16 mono PCM at mixer frame `at` (default: as soon as possible)"""
+        self._pending.append(Voice(pcm, gain, self.frame if at is None else at))
+
+    def render_block(self):
+        """Mix the next block of frames and return it as int16"""
+        while self._pending:
+            self.voices.append(self._pending.popleft())
+
+        block_start = self.frame
+        block_end = block_start + self.block_size
+        mix = self._mix
+        mix.fill(0.0)
+
+        still_playing = []
+        for voice in self.voices:
+            if voice.start >= block_end:
+                still_playing.append(voice)
+                continue
+            # Late voices (scheduled in the past) start at the top of this block
+            offset = max(0, voice.start - block_start)
+            count = min(self.block_size - offset, len(voice.pcm) - voice.position)
+            if count > 0:
+                target = self._scratch[:count]
+                np.multiply(voice.pcm[voice.position:voice.position + count], voice.gain,
+                            out=target, casting='unsafe')
+                mix[offset:offset + count] += target
+                voice.position += count
+            if voice.position < len(voice.pcm):
+                still_playing.append(voice)
+        self.voices = still_playing
+
+        self._limit(mix)
+        self.frame = block_end
+        self.blocks += 1
+        return mix.astype(np.int16)
+
+    def _limit(self, mix):
+        """Peak limiter: instant attack, linear release ramped across the block"""
+        peak = float(np.max(np.abs(mix))) if len(mix) else 0.0
+        target = 1.0 if peak <= self.limit else self.limit / peak
+        if target < self._gain:
+            # Attack: the whole block at the new gain, so its peak lands on the limit
+            mix *= target
+            self._gain = target
+            self.limited_blocks += 1
+        else:
+            new_gain = min(target, self._gain + self._release)
+            if new_gain != 1.0 or self._gain != 1.0:
+                # gain(t) = old + (new - old) * ramp, never above the target
+                np.multiply(self._ramp, new_gain - self._gain, out=self._scratch)
+                self._scratch += self._gain
+                mix *= self._scratch
+            self._gain = new_gain
+        np.clip(mix, -32768, 32767, out=mix)
+
+    def render(self, frames):
+        """Headless mode: mix `frames` frames synchronously and return them"""
+        out = np.empty(frames, dtype=np.int16)
+        for start in range(0, frames, self.block_size):
+            block = self.render_block()
+            out[start:start + self.block_size] = block[:frames - start]
+        return out
+
+    # --- Real-time output ---
+
+    def start(self, write, paced=False):
+        """Stream mixed audio to write(int16_block) from background threads
+
+        write should block at the device's pace (like a pipe into aplay).
+        With paced=True the output thread keeps real time itself, for
+        sinks that accept data instantly.
+        """
+        self._running = True
+        self._threads = [
+            threading.Thread(target=self._produce, daemon=True, name='mixer'),
+            threading.Thread(target=self._output, args=(write, paced), daemon=True,
+                             name='mixer-output'),
+        ]
+        for thread in self._threads:
+            thread.start()
+
+    def _produce(self):
+        block_seconds = self.block_size / self.sample_rate
+        while self._running:
+            if self.ring.free() >= self.block_size:
+                self.ring.write(self.render_block())
+            else:
+                time.sleep(block_seconds / 2)
+
+    def _output(self, write, paced):
+        block = np.zeros(self.block_size, dtype=np.int16)
+        block_seconds = self.block_size / self.sample_rate
+        deadline = time.monotonic()
+        failing = False
+        while self._running:
+            n = self.ring.read(block)
+            if n < self.block_size:
+                if self.blocks:
+                    self.underruns += 1
+                block[n:] = 0
+            try:
+                write(block)
+                failing = False
+            except OutputClosed as e:
+                print(f"Mixer output closed ({e}); stopping the mixer")
+                self._running = False
+                return
+            except Exception as e:
+                # Log once per run of errors, not once per block
+                if not failing:
+                    print(f"Mixer output error: {e}")
+                failing = True
+                time.sleep(block_seconds)
+            if paced:
+                deadline += block_seconds
+                delay = deadline - time.monotonic()
+                if delay > 0:
+                    time.sleep(delay)
+                else:
+                    deadline = time.monotonic()
+
+    def stop(self):
+        self._running = False
+        for thread in self._threads:
+            if thread is not threading.current_thread():
+                thread.join(timeout=1)
+        self._threads = []
+
+    def stats(self):
+        return {
+            'blocks': self.blocks,
+            'underruns': self.underruns,
+            'limited_blocks': self.limited_blocks,
+            'active_voices': len(self.voices) + len(self._pending),
+        }
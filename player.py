@@ -0,0 +1,245 @@
+#!/usr/bin/env python3
+"""
+Long-lived audio player coprocess.
+
+Instead of spawning a system player for every alarm, Focus Alarm starts
+one player process, keeps it warm and feeds it over a pipe:
+
+* PCM sinks (paplay/aplay) read raw 16-bit mono PCM from stdin; every
+  alarm writes the preset's samples straight from the shared sound bank.
+  With a mixer attached, the sink instead gets one continuous mixed
+  stream, so overlapping alarms are summed rather than queued.
+* The pygame worker (this file with --serve) reads one command per line,
+  "play <preset name>" or "file <path>", and plays it through its own
+  already-initialized mixer. This is the path used on macOS. It maps its
+  own copy of the sound bank, so presets edited in the config file (see
+  live_config.py) are written to temporary WAV files and sent as "file".
+
+Writes happen on a background thread so an alarm never blocks the timer
+or the UI. If the process dies it is restarted on the next alarm, with a
+cap on restarts so a broken device falls back to the old per-alarm
+players instead of spinning.
+"""
+
+import itertools
+import os
+import queue
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+import sounds
+from mixer import OutputClosed
+from sound_bank import SoundBank
+
+MAX_RESTARTS = 5
+RESTART_WINDOW = 60  # seconds
+
+
+def default_command(sample_rate=sounds.SAMPLE_RATE):
+    """Pick a player command for this machine: (command, feed) or (None, None)"""
+    if shutil.which('paplay'):
+        return ['paplay', '--raw', '--format=s16le', f'--rate={sample_rate}', '--channels=1'], 'pcm'
+    if shutil.which('aplay'):
+        return ['aplay', '-q', '-t', 'raw', '-f', 'S16_LE', '-r', str(sample_rate), '-c', '1'], 'pcm'
+    if not getattr(sys, 'frozen', False):
+        return [sys.executable, os.path.abspath(__file__), '--serve'], 'ids'
+    return None, None
+
+
+class PlayerProcess:
+    """Supervised player coprocess fed through its stdin"""
+
+    def __init__(self, command, feed='pcm', sound_bank=None):
+        self.command = command
+        self.feed = feed
+        self.sound_bank = sound_bank
+        self.mixer = None
+        self.process = None
+        self.failed = False
+        self.restarts = []
+        self._override_files = {}  # name -> (pcm, path) of edited presets written for the worker
+        self._override_dir = None
+        self._override_count = itertools.count(1)
+        self._queue = queue.Queue()
+        self._lock = threading.Lock()
+        self._writer = threading.Thread(target=self._write_loop, daemon=True)
+        self._writer.start()
+
+    def start(self):
+        """Start (or restart) the player process"""
+        with self._lock:
+            if self.process and self.process.poll() is None:
+                return True
+            now = time.monotonic()
+            self.restarts = [t for t in self.restarts if now - t < RESTART_WINDOW]
+            if len(self.restarts) >= MAX_RESTARTS:
+                if not self.failed:
+                    print("Player keeps dying - giving up on the persistent player")
+                self.failed = True
+                return False
+            if self.process:
+                print(f"Player exited with code {self.process.returncode}, restarting")
+                self.restarts.append(now)
+            try:
+                self.process = subprocess.Popen(
+                    self.command, stdin=subprocess.PIPE,
+                    stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+                )
+            except OSError as e:
+                print(f"Could not start player {self.command[0]}: {e}")
+                self.failed = True
+                return False
+            return True
+
+    def alive(self):
+        return not self.failed and self.process is not None and self.process.poll() is None
+
+    def play(self, name, sound_path=None):
+        """Queue a sound; returns False if the player can't take it"""
+        if self.failed or not self.start():
+            return False
+        if self.feed == 'ids':
+            override = self._override_file(name)
+            if override:
+                message = f'file {override}\n'.encode('utf-8')
+            elif sound_path and os.path.exists(sound_path):
+                message = f'file {sound_path}\n'.encode('utf-8')
+            else:
+                message = f'play {name}\n'.encode('utf-8')
+        else:
+            if self.sound_bank is None or name not in self.sound_bank.index:
+                return False
+            message = self.sound_bank.get(name)
+            if self.mixer:
+                self.mixer.play(message)
+                return True
+        self._queue.put(message)
+        return True
+
+    def _override_file(self, name):
+        """WAV path of a preset edited in the config file, or None for the built-in one"""
+        overrides = getattr(self.sound_bank, 'overrides', None)
+        pcm = overrides.get(name) if overrides else None
+        if pcm is None:
+            return None
+        cached = self._override_files.get(name)
+        if cached and cached[0] is pcm:
+            return cached[1]
+        try:
+            if self._override_dir is None:
+                self._override_dir = tempfile.mkdtemp(prefix='focus-alarm-presets-')
+            # A new file per version: the worker caches sounds by path
+            path = os.path.join(self._override_dir, f'{next(self._override_count)}.wav')
+            sounds.write_wav(path, pcm, self.sound_bank.sample_rate(name))
+        except (OSError, KeyError) as e:
+            print(f"Could not hand edited preset {name} to the player: {e}")
+            return None
+        self._override_files[name] = (pcm, path)
+        return path
+
+    def attach_mixer(self, mixer):
+        """Feed a PCM sink from a Mixer instead of writing whole sounds"""
+        if self.feed != 'pcm':
+            raise ValueError("Only PCM players can be driven by a mixer")
+        self.mixer = mixer
+        mixer.start(self.write_frames)
+
+    def write_frames(self, frames):
+        """Blocking write of raw PCM, restarting the player if it died
+
+        Raises OutputClosed once the player has given up, which stops the
+        mixer; play() then returns False and alarms use the fallback players.
+        """
+        for attempt in range(2):
+            if not self.start():
+                raise OutputClosed("player is not running")
+            try:
+                self.process.stdin.write(frames)
+                self.process.stdin.flush()
+                return
+            except (BrokenPipeError, OSError):
+                continue
+
+    def flush(self):
+        """Wait until every queued sound has been written to the player"""
+        self._queue.join()
+
+    def _write_loop(self):
+        while True:
+            message = self._queue.get()
+            try:
+                if message is None:
+                    return
+                for attempt in range(2):
+                    process = self.process
+                    try:
+                        process.stdin.write(message)
+                        process.stdin.flush()
+                        break
+                    except (BrokenPipeError, OSError, AttributeError):
+                        # Player died; restart once and retry this sound
+                        if not self.start():
+                            break
+            finally:
+                self._queue.task_done()
+
+    def close(self):
+        """Stop the mixer, the writer and the player process"""
+        if self.mixer:
+            self.mixer.stop()
+        self._queue.put(None)
+        self._writer.join(timeout=2)
+        with self._lock:
+            if self.process and self.process.poll() is None:
+                try:
+                    self.process.stdin.close()
+                    self.process.wait(timeout=2)
+                except (OSError, subprocess.TimeoutExpired):
+                    self.process.kill()
+            self.process = None
+        if self._override_dir:
+            shutil.rmtree(self._override_dir, ignore_errors=True)
+
+
+def serve():
+    """pygame worker: play commands from stdin with one warm mixer"""
+    os.environ.setdefault('PYGAME_HIDE_SUPPORT_PROMPT', '1')
+    import pygame
+
+    pygame.mixer.init(frequency=sounds.SAMPLE_RATE, size=-16, channels=1, buffer=512)
+    bank = SoundBank.open(sounds.SAMPLE_RATE)
+    presets = {name: pygame.mixer.Sound(buffer=bank.get(name)) for name in bank.names()}
+    files = {}
+
+    try:
+        for line in sys.stdin.buffer:
+            command, _, arg = line.decode('utf-8').rstrip('\n').partition(' ')
+            try:
+                if command == 'play' and arg in presets:
+                    presets[arg].play()
+                elif command == 'file':
+                    if arg not in files:
+                        files[arg] = pygame.mixer.Sound(arg)
+                    files[arg].play()
+                elif command == 'quit':
+                    break
+            except pygame.error as e:
+                print(f"Player error: {e}", file=sys.stderr)
+        # Let the last sound finish before exiting
+        while pygame.mixer.get_busy():
+            time.sleep(0.05)
+    finally:
+        presets.clear()
+        pygame.mixer.quit()
+        bank.close()
+
+
+if __name__ == '__main__':
+    if '--serve' in sys.argv:
+        serve()
+    else:
+        print("Usage: player.py --serve")
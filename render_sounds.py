@@ -0,0 +1,279 @@
+#!/usr/bin/env python3
+"""
+Render Focus Alarm sounds to files for custom alert packs.
+
+Renders built-in presets and/or sounds described in JSON parameter files,
+at one or more sample rates and in one or more formats, using the same
+synthesis code as the app (sounds.py). Work is spread over a process pool;
+outputs whose inputs have not changed since the last run are skipped.
+
+Examples:
+    python render_sounds.py --all -o pack/
+    python render_sounds.py "iPhone Radar" "Test Chime" -r 44100 -r 48000 -f wav -f pcm
+    python render_sounds.py -p team_sounds.json -o team_pack/ -j 4
+    python render_sounds.py --all -o sounds --web-manifest sounds.json
+
+--web-manifest writes the sounds.json the web page reads (as the Flask
+server publishes it): name -> versioned URL of the WAV, relative to the
+manifest. This is how a static-hosting build gets pre-rendered sounds.
+
+Parameter files hold one object or a list of objects:
+    {"name": "Team Ping", "duration": 0.4, "frequencies": [880, 1320], "amplitudes": [1.0, 0.3]}
+    {"name": "Team Radar", "preset": "iPhone Radar"}
+    {"name": "Team Pulse", "duration": 1.0, "voices": [...], "chain": [...]}
+    {"name": "Focus Drone", "ambient": {"freq": 110, "seconds": 600, "partials": [[1, 1.0], [2, 0.4]]}}
+
+The third form is a full DSP graph description (see dsp.py). Ambient
+tones are generated block by block by the wavetable engine, so even very
+long ones are written without holding the whole sound in memory.
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import re
+import sys
+import time
+import wave
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
+
+import numpy as np
+
+import dsp
+import sounds
+import wavetable
+
+# Output formats, also used as file extensions
+FORMATS = (
+    'wav',  # 16-bit mono WAV
+    'pcm',  # raw signed 16-bit little endian
+    'f32',  # raw 32-bit float little endian
+)
+CHUNK_FRAMES = 16384
+MANIFEST = '.render_manifest.json'
+
+
+def synth_version():
+    """Hash of the synthesis code, so edits to it invalidate outputs"""
+    digest = hashlib.sha256()
+    try:
+        for module in (sounds, dsp, wavetable):
+            with open(module.__file__, 'rb') as f:
+                digest.update(f.read())
+    except OSError:
+        return 'unknown'
+    return digest.hexdigest()
+
+
+def slugify(name):
+    return re.sub(r'[^a-z0-9]+', '_', name.lower()).strip('_')
+
+
+def load_parameter_file(path):
+    """Read sound specs from a JSON parameter file; raises ValueError if it is invalid"""
+    with open(path) as f:
+        try:
+            specs = json.load(f)
+        except ValueError as e:
+            raise ValueError(f"{path}: {e}") from None
+    if isinstance(specs, dict):
+        specs = [specs]
+    if not isinstance(specs, list):
+        raise ValueError(f"{path}: expected an object or a list of objects")
+    for spec in specs:
+        if not isinstance(spec, dict) or 'name' not in spec:
+            raise ValueError(f"{path}: every sound needs a name")
+        if not {'preset', 'frequencies', 'voices', 'ambient'} & set(spec):
+            raise ValueError(f"{path}: {spec['name']} needs a preset, frequencies, voices or ambient")
+    return specs
+
+
+def render_spec(spec, sample_rate):
+    """Render one spec to int16 PCM (an array, or an iterator of blocks for ambient tones)"""
+    if 'ambient' in spec:
+        params = dict(spec['ambient'])
+        return wavetable.ambient(params.pop('freq'), params.pop('seconds'), sample_rate, **params)
+    if 'preset' in spec:
+        return sounds.render(spec['preset'], sample_rate)
+    if 'voices' in spec:
+        return dsp.render(spec, sample_rate)
+    amplitudes = spec.get('amplitudes') or [1.0] * len(spec['frequencies'])
+    return sounds.create_sound(sample_rate, spec.get('duration', 0.5),
+                               spec['frequencies'], amplitudes)
+
+
+def chunks(pcm):
+    """Split an array into CHUNK_FRAMES pieces; block iterators pass through"""
+    if isinstance(pcm, np.ndarray):
+        return (pcm[i:i + CHUNK_FRAMES] for i in range(0, len(pcm), CHUNK_FRAMES))
+    return pcm
+
+
+def write_output(path, pcm, sample_rate, fmt):
+    """Stream PCM to disk in chunks, then atomically move it into place"""
+    tmp_path = f'{path}.{os.getpid()}.tmp'
+    if fmt == 'wav':
+        with wave.open(tmp_path, 'w') as wav_file:
+            wav_file.setnchannels(1)
+            wav_file.setsampwidth(2)
+            wav_file.setframerate(sample_rate)
+            for chunk in chunks(pcm):
+                wav_file.writeframes(chunk.tobytes())
+    else:
+        with open(tmp_path, 'wb') as f:
+            for chunk in chunks(pcm):
+                chunk = chunk.astype('<i2')
+                if fmt == 'f32':
+                    chunk = (chunk / 32768.0).astype('<f4')
+                f.write(chunk.tobytes())
+    os.replace(tmp_path, path)
+    return os.path.getsize(path)
+
+
+def render_job(spec, sample_rate, fmt, path):
+    """Worker entry point: render and write one output, return its size"""
+    pcm = render_spec(spec, sample_rate)
+    return write_output(path, pcm, sample_rate, fmt)
+
+
+def job_hash(spec, sample_rate, fmt, version):
+    key = json.dumps([spec, sample_rate, fmt, version], sort_keys=True)
+    return hashlib.sha256(key.encode('utf-8')).hexdigest()
+
+
+def build_jobs(specs, rates, formats, out_dir, version):
+    """Yield (spec, rate, fmt, path, input_hash) for every requested output"""
+    for spec in specs:
+        for rate in rates:
+            for fmt in formats:
+                filename = f"{slugify(spec['name'])}-{rate}.{fmt}"
+                yield (spec, rate, fmt, os.path.join(out_dir, filename),
+                       job_hash(spec, rate, fmt, version))
+
+
+def load_manifest(out_dir):
+    try:
+        with open(os.path.join(out_dir, MANIFEST)) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def save_manifest(out_dir, manifest):
+    path = os.path.join(out_dir, MANIFEST)
+    with open(path + '.tmp', 'w') as f:
+        json.dump(manifest, f, indent=1, sort_keys=True)
+    os.replace(path + '.tmp', path)
+
+
+def write_web_manifest(path, specs, rate, out_dir):
+    """Write name -> 'relative/url.wav?v=<hash>' for the page, as app.py serves it"""
+    base = os.path.dirname(os.path.abspath(path))
+    urls = {}
+    for spec, _, _, wav_path, digest in build_jobs(specs, [rate], ['wav'], out_dir, synth_version()):
+        url = os.path.relpath(os.path.abspath(wav_path), base).replace(os.sep, '/')
+        urls[spec['name']] = f"{url}?v={digest[:12]}"
+    with open(path + '.tmp', 'w') as f:
+        json.dump(urls, f, indent=1)
+    os.replace(path + '.tmp', path)
+
+
+def run(specs, rates, formats, out_dir, workers=None, force=False):
+    """Render everything that is out of date; returns a stats dict"""
+    os.makedirs(out_dir, exist_ok=True)
+    manifest = {} if force else load_manifest(out_dir)
+    version = synth_version()
+
+    stats = {'rendered': 0, 'skipped': 0, 'failed': 0, 'bytes': 0}
+    start = time.perf_counter()
+
+    pending = {}
+    max_in_flight = 2 * (workers or os.cpu_count() or 1)
+
+    def collect(done):
+        for future in done:
+            filename, digest = pending.pop(future)
+            try:
+                stats['bytes'] += future.result()
+            except Exception as e:
+                print(f"Error rendering {filename}: {e}")
+                stats['failed'] += 1
+                continue
+            manifest[filename] = digest
+            stats['rendered'] += 1
+
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        for spec, rate, fmt, path, digest in build_jobs(specs, rates, formats, out_dir, version):
+            filename = os.path.basename(path)
+            if manifest.get(filename) == digest and os.path.exists(path):
+                stats['skipped'] += 1
+                continue
+            # Bound the number of queued jobs so memory stays flat for big packs
+            if len(pending) >= max_in_flight:
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                collect(done)
+            pending[pool.submit(render_job, spec, rate, fmt, path)] = (filename, digest)
+        collect(wait(pending).done)
+
+    save_manifest(out_dir, manifest)
+    stats['seconds'] = time.perf_counter() - start
+    return stats
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Render Focus Alarm sounds to files")
+    parser.add_argument('names', nargs='*', help="preset names to render")
+    parser.add_argument('--all', action='store_true', help="render every built-in preset")
+    parser.add_argument('-p', '--params', action='append', default=[],
+                        help="JSON parameter file (repeatable)")
+    parser.add_argument('-r', '--rate', type=int, action='append',
+                        help="sample rate in Hz (repeatable, default 44100)")
+    parser.add_argument('-f', '--format', choices=FORMATS, action='append',
+                        help="output format (repeatable, default wav)")
+    parser.add_argument('-o', '--output', default='.', help="output directory")
+    parser.add_argument('-j', '--jobs', type=int, default=None, help="worker processes")
+    parser.add_argument('--force', action='store_true', help="re-render even if up to date")
+    parser.add_argument('--web-manifest', metavar='PATH',
+                        help="also write a sounds.json of the WAV outputs for the web page")
+    args = parser.parse_args(argv)
+
+    specs = [{'name': name, 'preset': name} for name in args.names]
+    if args.all:
+        specs += [{'name': name, 'preset': name} for name in sounds.PRESETS]
+    for path in args.params:
+        try:
+            specs += load_parameter_file(path)
+        except (OSError, ValueError) as e:  # json.JSONDecodeError is a ValueError
+            parser.error(f"bad parameter file: {e}")
+    for spec in specs:
+        if 'preset' in spec and spec['preset'] not in sounds.PRESETS and spec['preset'] not in sounds.EXTRAS:
+            parser.error(f"unknown preset: {spec['preset']}")
+    if not specs:
+        parser.error("nothing to render (give preset names, --all or --params)")
+    # Output files are named by slug; two sounds must not share one
+    slugs = {}
+    for spec in specs:
+        other = slugs.setdefault(slugify(spec['name']), spec['name'])
+        if other != spec['name']:
+            parser.error(f"{other!r} and {spec['name']!r} would both be written as "
+                         f"{slugify(spec['name'])}-*; rename one")
+
+    stats = run(specs, args.rate or [sounds.SAMPLE_RATE], args.format or ['wav'],
+                args.output, args.jobs, args.force)
+
+    if args.web_manifest:
+        if 'wav' not in (args.format or ['wav']):
+            parser.error("--web-manifest needs wav output")
+        write_web_manifest(args.web_manifest, specs, (args.rate or [sounds.SAMPLE_RATE])[0], args.output)
+
+    seconds = max(stats['seconds'], 1e-9)
+    print(f"Rendered {stats['rendered']}, skipped {stats['skipped']} up to date, "
+          f"{stats['failed']} failed in {seconds:.2f}s")
+    print(f"Throughput: {stats['rendered'] / seconds:.1f} sounds/s, "
+          f"{stats['bytes'] / seconds / 1e6:.1f} MB/s")
+    return 1 if stats['failed'] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,264 @@
+"""
+Where focus rooms keep their state, so several server workers can share them.
+
+rooms.Rooms works against a store with this interface:
+
+    insert(record, max_rooms) -> bool    add a room unless max_rooms are open
+    load(room_id) -> record or None
+    records() -> [record]                every room, running or finished
+    advance(room_id, next_alarm) -> bool  record a fired alarm (not if finished)
+    finish(room_id, how) -> bool         end a room; True for the one caller that did
+    delete(room_id)
+    publish(room_id, event, data)        tell every worker (this one at once)
+    subscribe(callback)                  callback(room_id, event, data)
+    poll()                               deliver other workers' events
+    lead(owner) -> bool                  take or renew the scheduler lease
+    shared                               True if other processes see the state
+
+A record is a plain dict (see FIELDS).
+
+MemoryStore keeps everything in this process, for a single worker.
+
+SQLiteStore keeps rooms in a SQLite database in WAL mode, which every
+worker on the machine opens. Alongside the rooms table it has:
+* an events table used as the notification channel: publish() appends
+  a row, and each worker's poll() first checks PRAGMA data_version (which
+  only changes when another connection has committed, and costs no disk
+  read) and reads the new rows only then;
+* a lease row naming the one worker that runs the alarm scheduler. The
+  leader renews it every few seconds; if it dies, another worker takes
+  over when the lease runs out.
+
+Set FOCUS_ALARM_ROOM_STORE to a database path to use SQLiteStore.
+"""
+
+import json
+import os
+import sqlite3
+import threading
+import time
+
+FIELDS = ('id', 'start', 'total_time', 'sound', 'seed', 'min_interval', 'max_interval',
+          'next_alarm', 'finished')
+LEASE_SECONDS = 5.0
+EVENT_SECONDS = 60  # published events are kept this long for slow pollers
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS rooms (
+    id TEXT PRIMARY KEY,
+    start REAL NOT NULL,
+    total_time INTEGER NOT NULL,
+    sound TEXT NOT NULL,
+    seed INTEGER NOT NULL,
+    min_interval REAL NOT NULL,
+    max_interval REAL NOT NULL,
+    next_alarm INTEGER NOT NULL DEFAULT 0,
+    finished TEXT             -- NULL while running, then 'complete' or 'stopped'
+);
+CREATE TABLE IF NOT EXISTS events (
+    seq INTEGER PRIMARY KEY AUTOINCREMENT,
+    time REAL NOT NULL,
+    origin TEXT NOT NULL,
+    room TEXT NOT NULL,
+    event TEXT NOT NULL,
+    data TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS leases (
+    name TEXT PRIMARY KEY,
+    owner TEXT NOT NULL,
+    expires REAL NOT NULL
+);
+"""
+
+
+class MemoryStore:
+    """Rooms in this process only"""
+
+    shared = False
+
+    def __init__(self):
+        self._records = {}
+        self._callbacks = []
+        self._lock = threading.Lock()
+
+    def insert(self, record, max_rooms):
+        with self._lock:
+            if len(self._records) >= max_rooms:
+                return False
+            self._records[record['id']] = dict(record)
+            return True
+
+    def load(self, room_id):
+        record = self._records.get(room_id)
+        return dict(record) if record else None
+
+    def records(self):
+        with self._lock:
+            return [dict(record) for record in self._records.values()]
+
+    def advance(self, room_id, next_alarm):
+        with self._lock:
+            record = self._records.get(room_id)
+            if record is None or record['finished']:
+                return False
+            record['next_alarm'] = next_alarm
+            return True
+
+    def finish(self, room_id, how):
+        with self._lock:
+            record = self._records.get(room_id)
+            if record is None or record['finished']:
+                return False
+            record['finished'] = how
+            return True
+
+    def delete(self, room_id):
+        with self._lock:
+            self._records.pop(room_id, None)
+
+    def publish(self, room_id, event, data):
+        for callback in self._callbacks:
+            callback(room_id, event, data)
+
+    def subscribe(self, callback):
+        self._callbacks.append(callback)
+
+    def poll(self):
+        return 0
+
+    def lead(self, owner):
+        return True
+
+    def close(self):
+        pass
+
+
+class SQLiteStore:
+    """Rooms in a SQLite (WAL) database shared by every worker on the machine"""
+
+    shared = True
+
+    def __init__(self, path, lease_seconds=LEASE_SECONDS):
+        self.path = path
+        self.lease_seconds = lease_seconds
+        self.origin = f'{os.getpid()}-{id(self)}'
+        self._callbacks = []
+        self._lock = threading.Lock()
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        # One connection, used under self._lock (greenlets and threads alike)
+        self.connection = sqlite3.connect(path, timeout=10, isolation_level=None,
+                                          check_same_thread=False)
+        self.connection.execute('PRAGMA journal_mode=WAL')
+        self.connection.execute('PRAGMA synchronous=NORMAL')
+        self.connection.executescript(SCHEMA)
+        with self._lock:
+            self._seq = self.connection.execute('SELECT COALESCE(MAX(seq), 0) FROM events').fetchone()[0]
+            self._version = self._data_version()
+
+    def _data_version(self):
+        return self.connection.execute('PRAGMA data_version').fetchone()[0]
+
+    def _write(self, fn):
+        """Run fn(connection) in one immediate transaction; caller holds self._lock"""
+        self.connection.execute('BEGIN IMMEDIATE')
+        try:
+            result = fn(self.connection)
+        except BaseException:
+            self.connection.execute('ROLLBACK')
+            raise
+        self.connection.execute('COMMIT')
+        return result
+
+    def insert(self, record, max_rooms):
+        with self._lock:
+            return self._write(lambda c: c.execute(
+                f"INSERT INTO rooms ({', '.join(FIELDS)}) SELECT {', '.join('?' * len(FIELDS))} "
+                "WHERE (SELECT COUNT(*) FROM rooms) < ?",
+                [record[field] for field in FIELDS] + [max_rooms]
+            ).rowcount == 1)
+
+    def load(self, room_id):
+        with self._lock:
+            row = self.connection.execute(
+                f"SELECT {', '.join(FIELDS)} FROM rooms WHERE id = ?", (room_id,)).fetchone()
+        return dict(zip(FIELDS, row)) if row else None
+
+    def records(self):
+        with self._lock:
+            rows = self.connection.execute(f"SELECT {', '.join(FIELDS)} FROM rooms").fetchall()
+        return [dict(zip(FIELDS, row)) for row in rows]
+
+    def advance(self, room_id, next_alarm):
+        with self._lock:
+            return self._write(lambda c: c.execute(
+                'UPDATE rooms SET next_alarm = ? WHERE id = ? AND finished IS NULL',
+                (next_alarm, room_id)).rowcount == 1)
+
+    def finish(self, room_id, how):
+        with self._lock:
+            return self._write(lambda c: c.execute(
+                'UPDATE rooms SET finished = ? WHERE id = ? AND finished IS NULL',
+                (how, room_id)).rowcount == 1)
+
+    def delete(self, room_id):
+        with self._lock:
+            self._write(lambda c: c.execute('DELETE FROM rooms WHERE id = ?', (room_id,)))
+
+    def publish(self, room_id, event, data):
+        with self._lock:
+            self._write(lambda c: c.execute(
+                'INSERT INTO events (time, origin, room, event, data) VALUES (?, ?, ?, ?, ?)',
+                (time.time(), self.origin, room_id, event, json.dumps(data, separators=(',', ':')))))
+        # Our own workers' listeners don't wait for the next poll
+        for callback in self._callbacks:
+            callback(room_id, event, data)
+
+    def subscribe(self, callback):
+        self._callbacks.append(callback)
+
+    def poll(self):
+        """Deliver events published by other workers since the last poll"""
+        with self._lock:
+            version = self._data_version()
+            if version == self._version:
+                return 0
+            self._version = version
+            rows = self.connection.execute(
+                'SELECT seq, origin, room, event, data FROM events WHERE seq > ? ORDER BY seq',
+                (self._seq,)).fetchall()
+            if rows:
+                self._seq = rows[-1][0]
+        # Our own events were delivered when they were published
+        rows = [row for row in rows if row[1] != self.origin]
+        for _, _, room_id, event, data in rows:
+            for callback in self._callbacks:
+                callback(room_id, event, json.loads(data))
+        return len(rows)
+
+    def lead(self, owner):
+        """Take the scheduler lease if it is free or expired, or renew ours"""
+        now = time.time()
+
+        def acquire(c):
+            c.execute("INSERT OR IGNORE INTO leases VALUES ('scheduler', ?, ?)",
+                      (owner, now + self.lease_seconds))
+            leading = c.execute(
+                "UPDATE leases SET owner = ?, expires = ? WHERE name = 'scheduler' "
+                "AND (owner = ? OR expires < ?)",
+                (owner, now + self.lease_seconds, owner, now)).rowcount == 1
+            if leading:
+                c.execute('DELETE FROM events WHERE time < ?', (now - EVENT_SECONDS,))
+            return leading
+
+        with self._lock:
+            return self._write(acquire)
+
+    def close(self):
+        with self._lock:
+            self.connection.close()
+
+
+def from_env():
+    """SQLiteStore if FOCUS_ALARM_ROOM_STORE names a database, else MemoryStore"""
+    path = os.environ.get('FOCUS_ALARM_ROOM_STORE')
+    return SQLiteStore(path) if path else MemoryStore()
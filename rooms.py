@@ -0,0 +1,364 @@
+"""
+Focus rooms: one alarm schedule shared by many browsers.
+
+A room is a focus session run by the server. Its alarm times come from
+the same seeded generator as the desktop app (session_state.alarm_times)
+and one scheduler thread fires them for every room. Browsers follow a
+room over Server-Sent Events instead of running their own random loop,
+so every device in the room beeps together.
+
+Fan-out is built so an event costs the same however many listeners
+there are:
+* Each event is encoded to SSE bytes once, appended to the room's short
+  history and announced with a single notify_all(). Listeners send the
+  very same bytes object; there is no per-client serialization or queue.
+* Each listener keeps only a cursor into the history. A slow client
+  blocks only its own response writes and falls behind; the broadcaster
+  never waits for it. A client that falls more than HISTORY messages
+  behind gets a fresh "state" snapshot instead of the backlog.
+
+Room state lives in a store (room_store.py). By default that is this
+process's memory, for a single (gevent) worker holding thousands of idle
+connections. With a shared store, several workers serve the same rooms:
+* one worker at a time holds the scheduler lease and fires alarms;
+* every event goes through the store's notification channel, and each
+  worker appends it to its own copy of the room, so listeners on any
+  worker get the same messages;
+* rooms are read through a per-worker cache: a room is reloaded from the
+  store at most every CACHE_SECONDS, and notifications keep it current
+  in between.
+"""
+
+import collections
+import heapq
+import json
+import os
+import random
+import secrets
+import socket
+import threading
+import time
+
+import room_store
+import session_state
+
+HISTORY = 32  # broadcast messages kept per room for lagging listeners
+HEARTBEAT_SECONDS = 15
+GRACE_SECONDS = 300  # finished rooms stay readable this long
+MAX_ROOMS = 1000
+MAX_SECONDS = 12 * 3600
+MIN_INTERVAL = 1  # shortest interval a room may ask for, in seconds
+CACHE_SECONDS = 1.0  # longest a worker serves a room without checking the store
+POLL_SECONDS = 0.02  # how often workers look for other workers' events
+
+
+class RoomsFull(Exception):
+    pass
+
+
+def encode(event, data):
+    """One SSE message as bytes"""
+    return f"event: {event}\ndata: {json.dumps(data, separators=(',', ':'))}\n\n".encode('utf-8')
+
+
+class Room:
+    """One shared session and its broadcast history"""
+
+    def __init__(self, room_id, total_time, sound, seed=None, now=None,
+                 min_interval=session_state.MIN_INTERVAL, max_interval=session_state.MAX_INTERVAL):
+        self.id = room_id
+        self.start = time.time() if now is None else now
+        self.total_time = total_time
+        self.deadline = self.start + total_time
+        self.sound = sound
+        self.seed = random.randrange(2 ** 32) if seed is None else seed
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.alarms = list(session_state.alarm_times(self.seed, self.start, self.deadline,
+                                                     min_interval, max_interval))
+        self.next_alarm = 0
+        self.finished = None  # 'complete' or 'stopped'
+        self.checked = time.monotonic()  # last read from the store
+
+        self.listeners = 0
+        self.resyncs = 0
+        self._seq = 0
+        self._history = collections.deque(maxlen=HISTORY)  # (seq, message)
+        self._cond = threading.Condition()
+
+    @classmethod
+    def from_record(cls, record):
+        room = cls(record['id'], record['total_time'], record['sound'], record['seed'],
+                   record['start'], record['min_interval'], record['max_interval'])
+        room.sync(record)
+        return room
+
+    def record(self):
+        return {field: getattr(self, field) for field in room_store.FIELDS}
+
+    def sync(self, record):
+        """Catch up with the store's copy of this room"""
+        with self._cond:
+            self.next_alarm = max(self.next_alarm, record['next_alarm'])
+        if record['finished'] and not self.finished:
+            # Its notification hasn't arrived (or was missed); end it here
+            self.finish(record['finished'], dict(self.state(), finished=record['finished'], sent=time.time()))
+        self.checked = time.monotonic()
+
+    def state(self):
+        return {
+            'room': self.id,
+            'start': self.start,
+            'deadline': self.deadline,
+            'total_time': self.total_time,
+            'sound': self.sound,
+            'alarms_played': self.next_alarm,
+            'next_alarm': self.alarms[self.next_alarm] if self.next_alarm < len(self.alarms) else None,
+            'finished': self.finished,
+            'listeners': self.listeners,
+            'server_time': time.time(),
+        }
+
+    def broadcast(self, event, data):
+        """Encode an event once and wake every listener"""
+        message = encode(event, data)
+        with self._cond:
+            if event == 'alarm':
+                self.next_alarm = max(self.next_alarm, data['index'] + 1)
+            self._append(message)
+        return message
+
+    def finish(self, how, data):
+        """End the session ('complete' or 'stopped') and tell every listener"""
+        message = encode(how, data)
+        with self._cond:
+            if self.finished:
+                return
+            # Set together with the message so no listener exits before sending it
+            self.finished = how
+            self._append(message)
+
+    def _append(self, message):
+        # Caller holds self._cond
+        self._seq += 1
+        self._history.append((self._seq, message))
+        self._cond.notify_all()
+
+    def listen(self, heartbeat=HEARTBEAT_SECONDS):
+        """Generator of SSE bytes for one client, starting with a state snapshot"""
+        with self._cond:
+            self.listeners += 1
+            cursor = self._seq
+        try:
+            yield encode('state', self.state())
+            while True:
+                with self._cond:
+                    if self._seq == cursor and not self.finished:
+                        self._cond.wait(heartbeat)
+                    if self._seq == cursor:
+                        if self.finished:
+                            return
+                        pending = None
+                    elif cursor < self._history[0][0] - 1:
+                        # Missed messages already left the history
+                        self.resyncs += 1
+                        cursor = self._seq
+                        pending = encode('state', self.state())
+                    else:
+                        pending = b''.join(message for seq, message in self._history if seq > cursor)
+                        cursor = self._seq
+                # Write outside the lock; a slow client only delays itself
+                yield pending if pending is not None else b': keepalive\n\n'
+        finally:
+            with self._cond:
+                self.listeners -= 1
+
+
+class Rooms:
+    """Registry of rooms and the thread that fires their events
+
+    Every worker runs the thread; only the one holding the store's
+    scheduler lease fires alarms, the others deliver notifications.
+    """
+
+    def __init__(self, max_rooms=MAX_ROOMS, on_finish=None, store=None,
+                 cache_seconds=CACHE_SECONDS, poll_seconds=POLL_SECONDS):
+        self.max_rooms = max_rooms
+        self.on_finish = on_finish  # called with each room as it ends, by the worker that ended it
+        self.store = store or room_store.MemoryStore()
+        self.cache_seconds = cache_seconds
+        self.poll_seconds = poll_seconds if self.store.shared else None
+        self.owner = f'{socket.gethostname()}-{os.getpid()}-{secrets.token_hex(4)}'
+        self.leading = False
+        self.rooms = {}  # this worker's copies, which hold its listeners
+        self._events = []  # heap of (when, order, room_id, kind, alarm index)
+        self._order = 0
+        self._cond = threading.Condition()
+        self._thread = None
+        self.store.subscribe(self._deliver)
+        self._lead()
+        if self.store.shared:
+            # Followers poll for events and stand by to take over the lease
+            self._start()
+
+    def _start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, daemon=True, name='rooms')
+            self._thread.start()
+
+    def create(self, total_time, sound, seed=None, **intervals):
+        room = Room(secrets.token_urlsafe(6), total_time, sound, seed, **intervals)
+        if not self.store.insert(room.record(), self.max_rooms):
+            raise RoomsFull(f"{self.max_rooms} rooms already open")
+        with self._cond:
+            self.rooms[room.id] = room
+            self._start()
+        self.store.publish(room.id, 'created', {})
+        print(f"Room {room.id} started: {total_time} s, {len(room.alarms)} alarms")
+        return room
+
+    def get(self, room_id):
+        """This worker's copy of a room, checked against the store at most every cache_seconds"""
+        room = self.rooms.get(room_id)
+        if room is not None and time.monotonic() - room.checked < self.cache_seconds:
+            return room
+        record = self.store.load(room_id)
+        with self._cond:
+            if record is None:
+                self.rooms.pop(room_id, None)
+                return None
+            if room_id not in self.rooms:
+                self.rooms[room_id] = Room.from_record(record)
+                return self.rooms[room_id]
+            room = self.rooms[room_id]
+        room.sync(record)
+        return room
+
+    def stop(self, room_id):
+        room = self.get(room_id)
+        if room and not room.finished:
+            self._finish(room, 'stopped')
+        return room
+
+    def _push(self, when, room_id, kind, index=None):
+        # Caller holds self._cond
+        self._order += 1
+        heapq.heappush(self._events, (when, self._order, room_id, kind, index))
+        self._cond.notify()
+
+    def _schedule_next(self, room):
+        # Caller holds self._cond
+        if room.finished:
+            self._push(time.time() + GRACE_SECONDS, room.id, 'expire')
+        elif room.next_alarm < len(room.alarms):
+            self._push(room.alarms[room.next_alarm], room.id, 'alarm', room.next_alarm)
+        else:
+            self._push(room.deadline, room.id, 'complete')
+
+    def _finish(self, room, how):
+        """End a room; only the worker whose store update won announces it"""
+        if not self.store.finish(room.id, how):
+            record = self.store.load(room.id)  # someone else ended it
+            if record:
+                room.sync(record)
+            return
+        self.store.publish(room.id, how, dict(room.state(), finished=how, sent=time.time()))
+        if self.on_finish:
+            try:
+                self.on_finish(room)
+            except Exception as e:
+                print(f"Room {room.id} finish hook failed: {e}")
+
+    def _deliver(self, room_id, event, data):
+        """Apply an event published by any worker, this one included"""
+        if event == 'created':
+            room = self.get(room_id) if self.leading else None
+            if room:
+                with self._cond:
+                    self._schedule_next(room)
+            return
+        if event == 'expired':
+            with self._cond:
+                self.rooms.pop(room_id, None)
+            return
+        room = self.rooms.get(room_id)
+        if room is None:
+            return  # nobody here follows it; it is loaded from the store when asked for
+        if event == 'alarm':
+            room.broadcast('alarm', data)
+        elif event in ('complete', 'stopped'):
+            room.finish(event, data)
+            if self.leading:
+                with self._cond:
+                    self._push(time.time() + GRACE_SECONDS, room_id, 'expire')
+
+    def _lead(self):
+        """Take or renew the scheduler lease; the new leader schedules every room"""
+        try:
+            leading = self.store.lead(self.owner)
+        except Exception as e:
+            print(f"Room scheduler lease failed: {e}")
+            leading = False
+        if leading == self.leading:
+            return
+        self.leading = leading
+        if not leading:
+            print(f"Worker {os.getpid()} lost the room scheduler lease")
+            with self._cond:
+                self._events = []
+            return
+        if self.store.shared:
+            print(f"Worker {os.getpid()} now runs the room scheduler")
+        for record in self.store.records():
+            room = self.get(record['id'])
+            if room:
+                with self._cond:
+                    self._schedule_next(room)
+
+    def _run(self):
+        renew_at = time.monotonic() + self.store.lease_seconds / 3 if self.store.shared else None
+        while True:
+            if self.store.shared:
+                if time.monotonic() >= renew_at:
+                    self._lead()
+                    renew_at = time.monotonic() + self.store.lease_seconds / 3
+                try:
+                    self.store.poll()
+                except Exception as e:
+                    print(f"Room event poll failed: {e}")
+            due = []
+            with self._cond:
+                while self._events and self._events[0][0] <= time.time():
+                    due.append(heapq.heappop(self._events))
+                if not due:
+                    timeout = self._events[0][0] - time.time() if self._events else None
+                    if self.poll_seconds is not None:
+                        timeout = self.poll_seconds if timeout is None else min(timeout, self.poll_seconds)
+                    self._cond.wait(timeout)
+            for _, _, room_id, kind, index in due:
+                try:
+                    self._fire(room_id, kind, index)
+                except Exception as e:
+                    print(f"Room {room_id} {kind} failed: {e}")
+
+    def _fire(self, room_id, kind, index):
+        room = self.rooms.get(room_id)
+        if kind == 'expire':
+            self.store.delete(room_id)
+            self.store.publish(room_id, 'expired', {})
+        elif room is None or room.finished or not self.leading:
+            return
+        elif kind == 'alarm':
+            if index != room.next_alarm:
+                return  # already fired (the room was scheduled twice)
+            if not self.store.advance(room.id, index + 1):
+                room.sync(self.store.load(room.id) or room.record())
+                return
+            self.store.publish(room.id, 'alarm', {
+                'index': index, 'at': room.alarms[index], 'sound': room.sound,
+                'room': room.id, 'sent': time.time(),
+            })
+            with self._cond:
+                self._schedule_next(room)
+        elif kind == 'complete':
+            self._finish(room, 'complete')
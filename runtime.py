@@ -0,0 +1,273 @@
+#!/usr/bin/env python3
+"""
+asyncio runtime for focus sessions.
+
+One event loop runs any number of sessions. A session is a handful of
+numbers (start, deadline, schedule seed, next alarm index) plus at most
+two asyncio timer handles: its next alarm (or completion) and, when a UI
+is watching it, its next display tick. Alarm times come from
+session_state.alarm_times like everywhere else. No session owns a
+thread; playing a sound is handed to an executor, so a slow audio
+backend never delays another session's timers.
+
+The same runtime drives:
+* the Tk app, which runs the loop on one side thread (start_in_thread),
+  submits work to it without waiting and gets events back through a
+  queue that Tk drains itself, so neither thread ever blocks on the other;
+* the headless daemon: python runtime.py --minutes 25;
+* the ASGI app in asgi.py, which runs it on the server's own loop.
+
+Events are reported through on_event(session, event, data) on the loop
+thread: 'tick' (remaining seconds), 'alarm' (index and due time),
+'complete' and 'stopped'.
+"""
+
+import argparse
+import asyncio
+import functools
+import itertools
+import math
+import random
+import sys
+import threading
+import time
+
+import session_state
+
+TICK_SECONDS = 1.0
+
+
+class Session:
+    """State and timer handles of one running session"""
+
+    def __init__(self, session_id, total_time, sound, seed, start, next_alarm=0, ticks=False,
+                 min_interval=session_state.MIN_INTERVAL, max_interval=session_state.MAX_INTERVAL):
+        self.id = session_id
+        self.total_time = total_time
+        self.sound = sound
+        self.seed = seed
+        self.start = start
+        self.deadline = start + total_time
+        self.ticks = ticks
+        self.status = 'running'
+        self.next_alarm = next_alarm
+        self._schedule = itertools.islice(
+            session_state.alarm_times(seed, start, self.deadline, min_interval, max_interval),
+            next_alarm, None
+        )
+        self.next_time = next(self._schedule, None)
+        self.timer = None
+        self.tick_timer = None
+
+    def remaining(self, now=None):
+        return max(0, math.ceil(self.deadline - (time.time() if now is None else now)))
+
+    def advance(self):
+        self.next_alarm += 1
+        self.next_time = next(self._schedule, None)
+
+    def state(self):
+        return {
+            'id': self.id,
+            'start': self.start,
+            'deadline': self.deadline,
+            'total_time': self.total_time,
+            'sound': self.sound,
+            'seed': self.seed,
+            'next_alarm': self.next_alarm,
+            'next_alarm_at': self.next_time,
+            'remaining': self.remaining(),
+            'status': self.status,
+        }
+
+
+class SessionRuntime:
+    """Schedules every session's alarms and ticks on one asyncio loop"""
+
+    def __init__(self, play=None, on_event=None, executor=None, tick_seconds=TICK_SECONDS):
+        self.play = play          # play(session) runs in the executor for each alarm
+        self.on_event = on_event  # on_event(session, event, data) runs on the loop
+        self.executor = executor  # None: the loop's default thread pool
+        self.tick_seconds = tick_seconds
+        self.sessions = {}
+        self.loop = None
+        self.alarms = 0
+        self._ids = itertools.count(1)
+        self._thread = None
+
+    # --- Loop side: call these on the loop (or through call()) ---
+
+    def attach(self, loop=None):
+        """Use an already running loop (e.g. the ASGI server's)"""
+        self.loop = loop or asyncio.get_running_loop()
+        return self
+
+    def start_session(self, total_time, sound, seed=None, start=None, next_alarm=0, ticks=False,
+                      session_id=None, **intervals):
+        """Start (or resume) a session; returns the Session"""
+        session = Session(
+            session_id if session_id is not None else next(self._ids), total_time, sound,
+            random.randrange(2 ** 32) if seed is None else seed,
+            time.time() if start is None else start, next_alarm, ticks, **intervals
+        )
+        self.sessions[session.id] = session
+        self._arm(session)
+        if ticks:
+            self._tick(session)
+        return session
+
+    def stop_session(self, session_id):
+        session = self.sessions.pop(session_id, None)
+        if session is not None:
+            self._cancel(session)
+            session.status = 'stopped'
+            self._emit(session, 'stopped')
+        return session
+
+    def _arm(self, session):
+        """Set the session's one timer: its next alarm, or completion"""
+        target = session.next_time if session.next_time is not None else session.deadline
+        callback = self._alarm if session.next_time is not None else self._complete
+        session.timer = self.loop.call_later(max(0.0, target - time.time()), callback, session)
+
+    def _cancel(self, session):
+        for handle in (session.timer, session.tick_timer):
+            if handle is not None:
+                handle.cancel()
+        session.timer = session.tick_timer = None
+
+    def _alarm(self, session):
+        index, due = session.next_alarm, session.next_time
+        session.advance()
+        self.alarms += 1
+        if self.play is not None:
+            future = self.loop.run_in_executor(self.executor, self.play, session)
+            future.add_done_callback(self._played)
+        self._emit(session, 'alarm', index=index, due=due)
+        self._arm(session)
+
+    def _complete(self, session):
+        self.sessions.pop(session.id, None)
+        self._cancel(session)
+        session.status = 'complete'
+        self._emit(session, 'complete')
+
+    def _tick(self, session):
+        self._emit(session, 'tick', remaining=session.remaining())
+        session.tick_timer = self.loop.call_later(self.tick_seconds, self._tick, session)
+
+    def _played(self, future):
+        if future.exception() is not None:
+            print(f"Sound error: {future.exception()}")
+
+    def _emit(self, session, event, **data):
+        if self.on_event is not None:
+            try:
+                self.on_event(session, event, data)
+            except Exception as e:
+                print(f"Session event handler failed ({event}): {e}")
+
+    # --- Thread side: for callers outside the loop (e.g. Tk) ---
+
+    def start_in_thread(self):
+        """Run a new loop on a daemon thread; returns self once it is running"""
+        ready = threading.Event()
+
+        def run():
+            self.loop = asyncio.new_event_loop()
+            asyncio.set_event_loop(self.loop)
+            self.loop.call_soon(ready.set)
+            self.loop.run_forever()
+            self.loop.close()
+
+        self._thread = threading.Thread(target=run, daemon=True, name='session-runtime')
+        self._thread.start()
+        ready.wait()
+        return self
+
+    def call(self, fn, *args, **kwargs):
+        """Run fn on the loop thread and return its result
+
+        Blocks until the loop has run it, so never use it from a thread
+        the loop's event handlers wait on (e.g. Tk's); use submit().
+        """
+        async def run():
+            return fn(*args, **kwargs)
+        return asyncio.run_coroutine_threadsafe(run(), self.loop).result()
+
+    def submit(self, fn, *args, **kwargs):
+        """Run fn on the loop thread soon; returns at once"""
+        self.loop.call_soon_threadsafe(functools.partial(fn, *args, **kwargs))
+
+    def close(self):
+        """Cancel every session and stop the loop thread (if we own it)"""
+        def cancel_all():
+            for session in list(self.sessions.values()):
+                self._cancel(session)
+            self.sessions.clear()
+
+        if self._thread is not None:
+            # Queued behind anything already submitted; no waiting on the loop
+            self.submit(cancel_all)
+            self.loop.call_soon_threadsafe(self.loop.stop)
+            self._thread.join(timeout=2)
+            self._thread = None
+        elif self.loop is not None:
+            cancel_all()
+
+
+async def run_headless(args):
+    """Daemon mode: run sessions until they all finish, playing alarms through the player"""
+    player = None
+    if not args.silent:
+        from player import PlayerProcess, default_command
+        from sound_bank import SoundBank
+        bank = SoundBank.open()
+        command, feed = default_command(bank.sample_rate(args.sound))
+        if command:
+            player = PlayerProcess(command, feed, bank)
+
+    def play(session):
+        if not (player and player.play(session.sound)):
+            print('\a', end='', flush=True)
+
+    done = asyncio.Event()
+
+    def on_event(session, event, data):
+        if args.verbose or args.sessions == 1:
+            detail = f" {data['index'] + 1}" if event == 'alarm' else ''
+            print(f"{time.strftime('%H:%M:%S')} session {session.id}: {event}{detail}")
+        if event in ('complete', 'stopped') and not runtime.sessions:
+            done.set()
+
+    runtime = SessionRuntime(None if args.silent else play, on_event).attach()
+    for _ in range(args.sessions):
+        runtime.start_session(int(args.minutes * 60), args.sound)
+    print(f"Running {args.sessions} session(s) of {args.minutes:g} min")
+    try:
+        await done.wait()
+    finally:
+        runtime.close()
+        if player:
+            player.flush()
+            player.close()
+    print(f"All sessions finished, {runtime.alarms} alarms")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run focus sessions without a UI")
+    parser.add_argument('--minutes', type=float, default=25)
+    parser.add_argument('--sound', default='Default Beep')
+    parser.add_argument('--sessions', type=int, default=1, help="number of concurrent sessions")
+    parser.add_argument('--silent', action='store_true', help="don't play sounds")
+    parser.add_argument('-v', '--verbose', action='store_true')
+    args = parser.parse_args(argv)
+    try:
+        asyncio.run(run_headless(args))
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
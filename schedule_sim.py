@@ -0,0 +1,169 @@
+#!/usr/bin/env python3
+"""
+Monte Carlo statistics for the alarm schedule.
+
+Simulates many focus sessions at once with the same rule as the app's
+sound loop (session_state.alarm_times): a sound at the start, then an
+alarm after every interval drawn uniformly from [min, max] seconds until
+the session ends, then the completion sound. Sessions are processed in
+chunks as NumPy arrays - one row of random intervals per session and a
+cumulative sum along the row - so there is no Python loop per alarm or
+per session.
+
+Reported per session:
+* alarms: interval alarms heard (not counting the start and end sounds)
+* longest gap: longest silence between any two sounds
+* tail: time from the last sound before the end to the end itself
+
+A policy (interval bounds) can be checked against targets before it
+ships; the command exits non-zero if any target is missed.
+
+Examples:
+    python schedule_sim.py
+    python schedule_sim.py --min 150 --max 270 --length 25 120 -n 2000000
+    python schedule_sim.py --target longest_gap:p99:320 --target alarms:p1:5
+"""
+
+import argparse
+import sys
+import time
+
+import numpy as np
+
+import session_state
+
+# Working memory per chunk: a float32 interval, a float32 time and a bool
+# per cell, so short minimum intervals (more columns) get fewer rows
+CHUNK_BYTES = 48 << 20
+CELL_BYTES = 9
+PERCENTILES = (1, 5, 50, 95, 99)
+METRICS = ('alarms', 'longest_gap', 'tail')
+
+
+def simulate(lengths, min_interval=session_state.MIN_INTERVAL,
+             max_interval=session_state.MAX_INTERVAL, seed=None, chunk_bytes=CHUNK_BYTES):
+    """Simulate one session per entry of lengths (seconds); returns arrays per metric"""
+    lengths = np.asarray(lengths, dtype=np.float32)
+    rng = np.random.default_rng(seed)
+    results = {
+        'alarms': np.empty(len(lengths), dtype=np.int32),
+        'longest_gap': np.empty(len(lengths), dtype=np.float32),
+        'tail': np.empty(len(lengths), dtype=np.float32),
+    }
+    # Enough columns for the longest session even if every interval is the minimum
+    columns = int(np.ceil(float(lengths.max()) / min_interval)) + 1 if len(lengths) else 0
+    span = np.float32(max_interval - min_interval)
+    chunk = max(1, min(len(lengths), chunk_bytes // (max(columns, 1) * CELL_BYTES)))
+    # Allocated once and reused by every chunk
+    interval_buffer = np.empty((chunk, columns), dtype=np.float32)
+    time_buffer = np.empty((chunk, columns), dtype=np.float32)
+    heard_buffer = np.empty((chunk, columns), dtype=bool)
+
+    for begin in range(0, len(lengths), chunk):
+        end = min(begin + chunk, len(lengths))
+        length = lengths[begin:end, None]
+        intervals = rng.random(dtype=np.float32, out=interval_buffer[:end - begin])
+        intervals *= span
+        intervals += np.float32(min_interval)
+        times = np.cumsum(intervals, axis=1, out=time_buffer[:end - begin])
+
+        # Same rule as alarm_times(): an alarm at or after the deadline never plays
+        heard = np.less(times, length, out=heard_buffer[:end - begin])
+        alarms = heard.sum(axis=1)
+        rows = np.arange(end - begin)
+        last = np.where(alarms > 0, times[rows, np.maximum(alarms - 1, 0)], 0)
+        tail = lengths[begin:end] - last
+        np.multiply(intervals, heard, out=intervals)
+
+        results['alarms'][begin:end] = alarms
+        results['tail'][begin:end] = tail
+        results['longest_gap'][begin:end] = np.maximum(intervals.max(axis=1), tail)
+    return results
+
+
+def random_lengths(count, shortest, longest, seed=None):
+    """Session lengths (seconds) uniformly spread between two lengths in minutes"""
+    rng = np.random.default_rng(seed)
+    return rng.uniform(shortest * 60, longest * 60, count).astype(np.float32)
+
+
+def summarize(results):
+    """Mean and percentiles of every metric"""
+    summary = {}
+    for metric in METRICS:
+        values = results[metric]
+        stats = {'mean': float(values.mean())}
+        for p, value in zip(PERCENTILES, np.percentile(values, PERCENTILES)):
+            stats[f'p{p}'] = float(value)
+        summary[metric] = stats
+    return summary
+
+
+def parse_target(text):
+    """"metric:stat:limit" -> (metric, stat, limit); alarms are minimums, times maximums"""
+    metric, stat, limit = text.split(':')
+    if metric not in METRICS:
+        raise ValueError(f"unknown metric {metric!r} (choose from {', '.join(METRICS)})")
+    stats = ['mean'] + [f'p{p}' for p in PERCENTILES]
+    if stat not in stats:
+        raise ValueError(f"unknown statistic {stat!r} (choose from {', '.join(stats)})")
+    return metric, stat, float(limit)
+
+
+def check(summary, targets):
+    """Return a description of every target the summary misses"""
+    failures = []
+    for metric, stat, limit in targets:
+        value = summary[metric][stat]
+        ok = value >= limit if metric == 'alarms' else value <= limit
+        if not ok:
+            relation = "below" if metric == 'alarms' else "above"
+            failures.append(f"{metric} {stat} is {value:.1f}, {relation} the target {limit:g}")
+    return failures
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Simulate Focus Alarm alarm schedules")
+    parser.add_argument('-n', '--sessions', type=int, default=1000000, help="sessions to simulate")
+    parser.add_argument('--min', type=float, default=session_state.MIN_INTERVAL,
+                        help="shortest interval in seconds")
+    parser.add_argument('--max', type=float, default=session_state.MAX_INTERVAL,
+                        help="longest interval in seconds")
+    parser.add_argument('--length', type=float, nargs=2, default=[25, 120], metavar=('MIN', 'MAX'),
+                        help="range of session lengths in minutes")
+    parser.add_argument('--target', action='append', default=[],
+                        help="metric:stat:limit, e.g. longest_gap:p99:320 (repeatable)")
+    parser.add_argument('--seed', type=int, default=None, help="random seed")
+    args = parser.parse_args(argv)
+
+    if not 0 < args.min <= args.max:
+        parser.error("need 0 < --min <= --max")
+    try:
+        targets = [parse_target(text) for text in args.target]
+    except ValueError as e:
+        parser.error(str(e))
+
+    # Independent random streams for session lengths and intervals
+    length_seed, interval_seed = np.random.SeedSequence(args.seed).spawn(2)
+    start = time.perf_counter()
+    lengths = random_lengths(args.sessions, *args.length, seed=length_seed)
+    summary = summarize(simulate(lengths, args.min, args.max, seed=interval_seed))
+    seconds = time.perf_counter() - start
+
+    print(f"{args.sessions} sessions of {args.length[0]:g}-{args.length[1]:g} min, "
+          f"intervals {args.min:g}-{args.max:g} s ({seconds:.2f}s)")
+    print(f"{'':12} {'mean':>8}" + ''.join(f"{f'p{p}':>8}" for p in PERCENTILES))
+    for metric in METRICS:
+        stats = summary[metric]
+        print(f"{metric:12} {stats['mean']:8.1f}" + ''.join(f"{stats[f'p{p}']:8.1f}" for p in PERCENTILES))
+
+    failures = check(summary, targets)
+    for failure in failures:
+        print(f"FAIL: {failure}")
+    if targets and not failures:
+        print(f"All {len(targets)} targets met")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
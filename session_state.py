@@ -0,0 +1,190 @@
+"""
+Crash-safe snapshots of the running focus session.
+
+A session is fully described by a few numbers: wall-clock start and
+deadline, the seed of its alarm schedule, the index of the next alarm
+and the selected sound. Because the schedule is derived from the seed,
+nothing needs to be written per tick: the snapshot is saved when the
+session starts, (debounced) when an alarm fires or the sound changes,
+and removed when the session ends. Each save is an atomic
+write-then-rename with fsync, so a crash at any point leaves either the
+old snapshot or the new one, never a torn file.
+"""
+
+import glob
+import json
+import os
+import random
+import sys
+import threading
+import time
+
+SNAPSHOT_VERSION = 1
+DEBOUNCE_SECONDS = 2.0
+MIN_INTERVAL = 180  # seconds between alarms (3 minutes)
+MAX_INTERVAL = 300  # (5 minutes)
+
+
+def default_path():
+    return os.path.join(os.path.expanduser('~'), '.focus_alarm', 'session.json')
+
+
+def alarm_times(seed, start, deadline, min_interval=MIN_INTERVAL, max_interval=MAX_INTERVAL):
+    """Yield the wall-clock time of every alarm in a session, in order"""
+    rng = random.Random(seed)
+    alarm = start
+    while True:
+        # Random interval between 3-5 minutes (180-300 seconds)
+        alarm += rng.uniform(min_interval, max_interval)
+        if alarm >= deadline:
+            return
+        yield alarm
+
+
+def save_atomic(path, state):
+    """Write state as JSON via a temp file, fsync and rename"""
+    directory = os.path.dirname(path)
+    os.makedirs(directory, exist_ok=True)
+    tmp_path = f'{path}.{os.getpid()}.tmp'
+    with open(tmp_path, 'w') as f:
+        json.dump(state, f)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+    # Make the rename itself durable
+    if hasattr(os, 'O_DIRECTORY'):
+        fd = os.open(directory, os.O_RDONLY | os.O_DIRECTORY)
+        try:
+            os.fsync(fd)
+        finally:
+            os.close(fd)
+
+
+def load(path=None, now=None):
+    """Return the saved session if it is valid and still running, else None"""
+    path = path or default_path()
+    remove_stale_temp(path)
+    try:
+        with open(path) as f:
+            state = json.load(f)
+    except (OSError, ValueError):
+        return None
+    required = ('start', 'deadline', 'total_time', 'seed', 'next_alarm', 'sound')
+    if not isinstance(state, dict) or state.get('version') != SNAPSHOT_VERSION \
+            or any(key not in state for key in required):
+        return None
+    if state['deadline'] <= (time.time() if now is None else now):
+        return None
+    return state
+
+
+def pid_alive(pid):
+    """True if a process with this pid is running; never signals it"""
+    if sys.platform == 'win32':
+        return _windows_pid_alive(pid)
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    except OSError:
+        return False
+    return True
+
+
+def _windows_pid_alive(pid):
+    # os.kill(pid, 0) would terminate the process on Windows
+    import ctypes
+    kernel32 = ctypes.WinDLL('kernel32', use_last_error=True)
+    handle = kernel32.OpenProcess(0x1000, False, pid)  # PROCESS_QUERY_LIMITED_INFORMATION
+    if not handle:
+        return ctypes.get_last_error() == 5  # ERROR_ACCESS_DENIED: it exists
+    try:
+        code = ctypes.c_ulong()
+        if not kernel32.GetExitCodeProcess(handle, ctypes.byref(code)):
+            return True
+        return code.value == 259  # STILL_ACTIVE
+    finally:
+        kernel32.CloseHandle(handle)
+
+
+def remove_stale_temp(path):
+    """Delete temp files left by writers that were killed mid-save"""
+    for tmp_path in glob.glob(f'{glob.escape(path)}.*.tmp'):
+        try:
+            pid = int(tmp_path[len(path) + 1:-len('.tmp')])
+        except ValueError:
+            continue
+        if not pid_alive(pid):
+            try:
+                os.remove(tmp_path)
+            except OSError:
+                pass
+
+
+def clear(path=None):
+    try:
+        os.remove(path or default_path())
+    except FileNotFoundError:
+        pass
+
+
+class Checkpointer:
+    """Debounced, atomic snapshot writer for one session"""
+
+    def __init__(self, path=None, debounce=DEBOUNCE_SECONDS):
+        self.path = path or default_path()
+        self.debounce = debounce
+        self.state = {}
+        self.writes = 0
+        self._dirty = False
+        self._timer = None
+        self._lock = threading.Lock()
+
+    def start(self, **state):
+        """Begin a new session snapshot and write it immediately"""
+        with self._lock:
+            self._cancel()
+            self.state = dict(state)
+            self._dirty = True
+        self.flush()
+
+    def update(self, **changes):
+        """Record changes; they are written at most once per debounce period"""
+        with self._lock:
+            if not self.state:
+                return
+            self.state.update(changes)
+            self._dirty = True
+            if self._timer is None:
+                self._timer = threading.Timer(self.debounce, self.flush)
+                self._timer.daemon = True
+                self._timer.start()
+
+    def flush(self):
+        """Write pending changes now"""
+        with self._lock:
+            self._timer = None
+            if not self._dirty or not self.state:
+                return
+            state = dict(self.state, version=SNAPSHOT_VERSION)
+            self._dirty = False
+            try:
+                save_atomic(self.path, state)
+                self.writes += 1
+            except OSError as e:
+                print(f"Could not save session snapshot: {e}")
+
+    def clear(self):
+        """End the session: drop pending writes and remove the snapshot"""
+        with self._lock:
+            self._cancel()
+            self.state = {}
+            self._dirty = False
+            clear(self.path)
+
+    def _cancel(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
@@ -0,0 +1,234 @@
+"""
+Shared sound bank for running several Focus Alarm processes on one machine.
+
+Presets are rendered once into a bank file that every process maps
+read-only, so the PCM lives in the page cache exactly once instead of
+being rendered and held separately by each app instance or server worker.
+
+File layout (little endian):
+    header  : magic (8 bytes), entry count (u32), data offset (u32),
+              version (20 bytes, see synthesis_version)
+    entries : name (48 bytes, utf-8, NUL padded), offset (u64),
+              length in bytes (u64), sample rate (u32), channels (u16),
+              sample width (u16)
+    data    : raw PCM for each entry, 16-byte aligned
+
+Each process that opens the bank registers itself in a users directory
+next to the file. The last process to close it (or the first to notice
+that every other user has died) deletes the bank.
+"""
+
+import hashlib
+import json
+import mmap
+import os
+import struct
+import tempfile
+
+import numpy as np
+
+import dsp
+import session_state
+import sounds
+import wavetable
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+
+MAGIC = b'FABANK2\0'
+HEADER = struct.Struct('<8sII20s')
+ENTRY = struct.Struct('<48sQQIHH')
+ALIGN = 16
+
+
+def default_directory():
+    """Directory holding the shared bank files"""
+    return os.path.join(tempfile.gettempdir(), 'focus_alarm')
+
+
+def synthesis_version():
+    """Hash of every preset's parameters and of the synthesis code
+
+    A bank left behind by a run with other presets or an older renderer
+    has a different version and is rendered again.
+    """
+    digest = hashlib.sha1(json.dumps(sounds.PRESETS, sort_keys=True).encode('utf-8'))
+    for module in (sounds, dsp, wavetable):
+        try:
+            with open(module.__file__, 'rb') as f:
+                digest.update(f.read())
+        except OSError:
+            pass  # e.g. frozen builds; the presets still count
+    return digest.digest()
+
+
+def build_bank(path, pcm_by_name, sample_rate):
+    """Write a bank file atomically from a dict of name -> int16 PCM"""
+    names = list(pcm_by_name)
+    offset = HEADER.size + ENTRY.size * len(names)
+    data_offset = offset = -(-offset // ALIGN) * ALIGN
+
+    entries = []
+    for name in names:
+        length = pcm_by_name[name].nbytes
+        entries.append(ENTRY.pack(name.encode('utf-8'), offset, length,
+                                  sample_rate, 1, 2))
+        offset += -(-length // ALIGN) * ALIGN
+
+    tmp_path = f'{path}.{os.getpid()}.tmp'
+    with open(tmp_path, 'wb') as f:
+        f.write(HEADER.pack(MAGIC, len(names), data_offset, synthesis_version()))
+        f.write(b''.join(entries))
+        for name in names:
+            pcm = np.ascontiguousarray(pcm_by_name[name], dtype='<i2')
+            f.seek(-(-f.tell() // ALIGN) * ALIGN)
+            f.write(pcm.tobytes())
+        f.truncate(max(offset, f.tell()))
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+
+
+def read_version(buf):
+    """The synthesis version a bank was rendered with"""
+    magic, _, _, version = HEADER.unpack_from(buf, 0)
+    if magic != MAGIC:
+        raise ValueError("Not a Focus Alarm sound bank")
+    return version
+
+
+def read_index(buf):
+    """Parse the header of a mapped bank into name -> (offset, length, rate, channels, width)"""
+    magic, count, _, _ = HEADER.unpack_from(buf, 0)
+    if magic != MAGIC:
+        raise ValueError("Not a Focus Alarm sound bank")
+
+    index = {}
+    for i in range(count):
+        raw_name, offset, length, rate, channels, width = ENTRY.unpack_from(
+            buf, HEADER.size + i * ENTRY.size)
+        index[raw_name.rstrip(b'\0').decode('utf-8')] = (offset, length, rate, channels, width)
+    return index
+
+
+class _Lock:
+    """Exclusive advisory lock on a side file (no-op where fcntl is missing)"""
+
+    def __init__(self, path):
+        self.path = path
+        self.fd = None
+
+    def __enter__(self):
+        self.fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o600)
+        if fcntl:
+            fcntl.flock(self.fd, fcntl.LOCK_EX)
+        return self
+
+    def __exit__(self, *exc):
+        if fcntl:
+            fcntl.flock(self.fd, fcntl.LOCK_UN)
+        os.close(self.fd)
+        self.fd = None
+
+
+class SoundBank:
+    """Read-only, memory-mapped view of every rendered preset"""
+
+    def __init__(self, path):
+        self.path = path
+        self.users_dir = path + '.users'
+        self.lock_path = path + '.lock'
+        self.user_file = os.path.join(self.users_dir, f'{os.getpid()}-{id(self)}')
+        self._file = None
+        self._map = None
+        self.index = {}
+
+    @classmethod
+    def open(cls, sample_rate=sounds.SAMPLE_RATE, directory=None):
+        """Map the bank for sample_rate, rendering it first if nobody has yet"""
+        directory = directory or default_directory()
+        os.makedirs(directory, exist_ok=True)
+        bank = cls(os.path.join(directory, f'sounds-{sample_rate}.bank'))
+        bank._attach(sample_rate)
+        return bank
+
+    def _attach(self, sample_rate):
+        with _Lock(self.lock_path):
+            os.makedirs(self.users_dir, exist_ok=True)
+            with open(self.user_file, 'w'):
+                pass
+
+            if not self._is_current():
+                print(f"Rendering shared sound bank: {self.path}")
+                build_bank(self.path, sounds.render_all(sample_rate), sample_rate)
+
+            self._file = open(self.path, 'rb')
+            self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+            self.index = read_index(self._map)
+
+    def _is_current(self):
+        """True if an existing bank file holds every preset, rendered by this code"""
+        try:
+            with open(self.path, 'rb') as f:
+                header = f.read(HEADER.size + ENTRY.size * len(sounds.PRESETS))
+            index = read_index(header)
+            version = read_version(header)
+        except (OSError, ValueError, struct.error):
+            return False
+        return set(index) == set(sounds.PRESETS) and version == synthesis_version()
+
+    def names(self):
+        return list(self.index)
+
+    def get(self, name):
+        """Read-only int16 view of a preset, backed directly by the mapping"""
+        offset, length, _, _, _ = self.index[name]
+        return np.frombuffer(self._map, dtype='<i2', count=length // 2, offset=offset)
+
+    def sample_rate(self, name):
+        return self.index[name][2]
+
+    def close(self):
+        """Unmap the bank and delete it if this was the last live user"""
+        if self._map is None:
+            return
+        self.index = {}
+        try:
+            self._map.close()
+        except BufferError:
+            # Views handed out by get() are still alive; the GC will unmap
+            pass
+        self._file.close()
+        self._map = self._file = None
+
+        with _Lock(self.lock_path):
+            try:
+                os.remove(self.user_file)
+            except FileNotFoundError:
+                pass
+
+            live = False
+            for entry in os.listdir(self.users_dir):
+                try:
+                    pid = int(entry.split('-', 1)[0])
+                except ValueError:
+                    continue  # not a user file
+                if session_state.pid_alive(pid):
+                    live = True
+                else:
+                    os.remove(os.path.join(self.users_dir, entry))
+
+            if not live:
+                try:
+                    os.remove(self.path)
+                    os.rmdir(self.users_dir)
+                except OSError:
+                    pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
@@ -0,0 +1,155 @@
+"""
+Sound synthesis for the Focus Alarm presets.
+
+Presets are plain data rendered by the DSP graph in dsp.py, shared by
+the desktop app, the web server and the command-line tools. Rendering
+returns mono 16-bit PCM as an int16 array.
+"""
+
+import wave
+
+import dsp
+import tracing
+
+SAMPLE_RATE = 44100
+
+
+def fade(seconds):
+    """Fade in/out to avoid clicks"""
+    return {'type': 'adsr', 'attack': seconds, 'release': seconds}
+
+
+NORMALIZE = [{'type': 'normalize', 'peak': 16383}, {'type': 'quantize'}]
+
+# Default Beep (simple beep)
+DEFAULT_BEEP = dsp.tone(0.5, [800], [1.0])
+
+# iPhone Radar (classic radar beep): ascending beep with echo
+IPHONE_RADAR = {
+    'duration': 0.8,
+    'voices': [{'freq': 800}],
+    'chain': [
+        {'type': 'sweep', 'start': 0.8, 'end': 1.2},
+        {'type': 'echo', 'delay': 0.1, 'gain': 0.3},
+        fade(0.1),
+    ] + NORMALIZE,
+}
+
+# iPhone Beacon (gentle beacon): pulsing tone with harmonics for warmth
+IPHONE_BEACON = {
+    'duration': 1.2,
+    'voices': [
+        {'freq': 600, 'am': {'offset': 0.7, 'depth': 0.3, 'rate': 2}},
+        {'freq': 900, 'gain': 0.3},
+        {'freq': 1200, 'gain': 0.2},
+    ],
+    'chain': [fade(0.2)] + NORMALIZE,
+}
+
+# iPhone Bulletin (news bulletin style): sharp attack, decay, slight modulation
+IPHONE_BULLETIN = {
+    'duration': 1.0,
+    'voices': [{'freq': 1000}],
+    'chain': [
+        {'type': 'adsr', 'attack': 0.05, 'release': 0.1, 'end': 0.3},
+        {'type': 'tremolo', 'offset': 0.9, 'depth': 0.1, 'rate': 8},
+    ] + NORMALIZE,
+}
+
+# iPhone Signal (signal tone): clean tone with slight frequency modulation
+IPHONE_SIGNAL = {
+    'duration': 0.6,
+    'voices': [
+        {'freq': 1200, 'vibrato': {'depth': 50, 'rate': 4}},
+        {'freq': 2400, 'gain': 0.2},
+    ],
+    'chain': [fade(0.1)] + NORMALIZE,
+}
+
+# iPhone Hillside (nature-inspired): gentle vibrato, long fade
+IPHONE_HILLSIDE = {
+    'duration': 1.5,
+    'voices': [{'freq': 400, 'vibrato': {'depth': 20, 'rate': 6}}],
+    'chain': [fade(0.3)] + NORMALIZE,
+}
+
+# iPhone Playtime (playful tone): slight pitch bend
+IPHONE_PLAYTIME = {
+    'duration': 0.8,
+    'voices': [{'freq': 800, 'bend': {'start': 1.0, 'end': 1.1}}],
+    'chain': [fade(0.1)] + NORMALIZE,
+}
+
+# iPhone Sencha (calm, zen-like): very slow vibrato, very long fade
+IPHONE_SENCHA = {
+    'duration': 2.0,
+    'voices': [{'freq': 300, 'vibrato': {'depth': 10, 'rate': 2}}],
+    'chain': [fade(0.4)] + NORMALIZE,
+}
+
+# Example chime: four harmonics at a fixed level (no normalization)
+TEST_CHIME = {
+    'duration': 1.0,
+    'voices': [
+        {'freq': 800, 'gain': 0.4},   # Base frequency
+        {'freq': 1200, 'gain': 0.3},  # Higher harmonic
+        {'freq': 1600, 'gain': 0.2},  # Even higher harmonic
+        {'freq': 2000, 'gain': 0.1},  # Highest harmonic
+    ],
+    'chain': [
+        fade(0.1),
+        {'type': 'gain', 'value': 16383},  # Reduced volume to avoid clipping
+        {'type': 'quantize'},
+    ],
+}
+
+
+# All presets in display order
+PRESETS = {
+    "Default Beep": DEFAULT_BEEP,
+    "iPhone Radar": IPHONE_RADAR,
+    "iPhone Beacon": IPHONE_BEACON,
+    "iPhone Bulletin": IPHONE_BULLETIN,
+    "iPhone Signal": IPHONE_SIGNAL,
+    "iPhone Hillside": IPHONE_HILLSIDE,
+    "iPhone Playtime": IPHONE_PLAYTIME,
+    "iPhone Sencha": IPHONE_SENCHA,
+}
+
+
+def create_sound(sample_rate, duration, frequencies, amplitudes):
+    """Create a sound with multiple frequencies"""
+    with tracing.span('create_sound', 'sounds', duration=duration):
+        return dsp.render(dsp.tone(duration, frequencies, amplitudes), sample_rate)
+
+
+def create_test_chime(sample_rate):
+    """Create the example chime"""
+    with tracing.span('create_test_chime', 'sounds'):
+        return dsp.render(TEST_CHIME, sample_rate)
+
+
+# Extra sounds that can be rendered offline but are not offered in the app
+EXTRAS = {
+    "Test Chime": TEST_CHIME,
+}
+
+
+def render(name, sample_rate=SAMPLE_RATE):
+    """Render a preset (or extra sound) by name"""
+    with tracing.span('render', 'sounds', name=name, sample_rate=sample_rate):
+        return dsp.render(PRESETS.get(name) or EXTRAS[name], sample_rate)
+
+
+def render_all(sample_rate=SAMPLE_RATE):
+    """Render every preset, keyed by name"""
+    return {name: render(name, sample_rate) for name in PRESETS}
+
+
+def write_wav(path, pcm, sample_rate=SAMPLE_RATE, channels=1):
+    """Write 16-bit PCM to a WAV file"""
+    with wave.open(path, 'w') as wav_file:
+        wav_file.setnchannels(channels)
+        wav_file.setsampwidth(2)
+        wav_file.setframerate(sample_rate)
+        wav_file.writeframes(pcm.tobytes())
@@ -0,0 +1,188 @@
+"""
+Opt-in timeline tracing in the Chrome trace format.
+
+Set FOCUS_ALARM_TRACE=1 to record what the app spends its time on:
+mixer init attempts, sound renders, each system sound attempt and the
+fallback it ended on, interval alarms (and how late they fired), how
+long root.after callbacks waited in Tk's queue, and session completion.
+Press Ctrl+Shift+T in the app (or call write()) to save the trace; it is
+also saved when the window closes. Open the file in https://ui.perfetto.dev
+or chrome://tracing.
+
+Events are tuples in a ring buffer preallocated by enable(): recording
+one is a counter increment and a slot assignment, and when the buffer is
+full the oldest events are overwritten. Timestamps come from the
+monotonic perf_counter clock. When tracing is off, span() returns a
+shared no-op object and instant() returns immediately, so the
+instrumented code pays one global lookup and a call
+(benchmarks/bench_tracing.py measures it).
+"""
+
+import itertools
+import json
+import os
+import threading
+import time
+
+import session_state
+
+CAPACITY = 65536
+
+enabled = False
+_buffer = []
+_counter = itertools.count()
+_threads = {}  # thread ident -> name, for the trace viewer
+_origin = 0    # perf_counter_ns() at enable()
+_wall_origin = 0.0
+
+
+def trace_path():
+    stamp = time.strftime('%Y%m%d-%H%M%S')
+    return os.path.join(os.path.dirname(session_state.default_path()), f'trace-{stamp}.json')
+
+
+def enable(capacity=CAPACITY):
+    """Start recording into a fresh ring buffer of capacity events"""
+    global enabled, _buffer, _counter, _origin, _wall_origin
+    _buffer = [None] * capacity
+    _counter = itertools.count()
+    _threads.clear()
+    _origin = time.perf_counter_ns()
+    _wall_origin = time.time()
+    enabled = True
+
+
+def disable():
+    global enabled
+    enabled = False
+
+
+def now():
+    """Trace clock in nanoseconds"""
+    return time.perf_counter_ns()
+
+
+def _record(phase, name, category, start, duration, args):
+    thread = threading.get_ident()
+    if thread not in _threads:
+        _threads[thread] = threading.current_thread().name
+    _buffer[next(_counter) % len(_buffer)] = (phase, name, category, start, duration, thread, args)
+
+
+class _Span:
+    """Times a with-block; args can be added while it runs with set()"""
+    __slots__ = ('name', 'category', 'args', 'start')
+
+    def __init__(self, name, category, args):
+        self.name = name
+        self.category = category
+        self.args = args
+
+    def set(self, **args):
+        self.args.update(args)
+
+    def __enter__(self):
+        self.start = time.perf_counter_ns()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        end = time.perf_counter_ns()
+        if exc is not None:
+            self.args['error'] = repr(exc)
+        _record('X', self.name, self.category, self.start, end - self.start, self.args)
+        return False
+
+
+class _NullSpan:
+    __slots__ = ()
+
+    def set(self, **args):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+
+_NULL_SPAN = _NullSpan()
+
+
+def span(name, category='app', /, **args):
+    """Context manager recording a complete event around a block"""
+    if not enabled:
+        return _NULL_SPAN
+    return _Span(name, category, args)
+
+
+def instant(name, category='app', /, **args):
+    """Record a point in time"""
+    if enabled:
+        _record('i', name, category, time.perf_counter_ns(), 0, args)
+
+
+def complete(name, category, start, end, /, **args):
+    """Record a span whose start and end (from now()) were taken elsewhere"""
+    if enabled:
+        _record('X', name, category, start, end - start, args)
+
+
+def after(root, ms, callback, /, *args):
+    """root.after() that records how long the callback waited to run"""
+    if not enabled:
+        return root.after(ms, callback, *args)
+    due = time.perf_counter_ns() + ms * 1000000
+    name = getattr(callback, '__name__', 'callback')
+
+    def run():
+        start = time.perf_counter_ns()
+        complete('after wait', 'tk', due, start, callback=name)
+        with span(name, 'tk'):
+            callback(*args)
+
+    return root.after(ms, run)
+
+
+def events():
+    """Recorded events in time order, and how many were overwritten"""
+    buffer = list(_buffer)
+    total = next(_counter)  # also counts this call's own slot, which stays empty
+    recorded = sorted((event for event in buffer if event is not None), key=lambda event: event[3])
+    return recorded, max(0, total - len(buffer))
+
+
+def to_chrome(recorded, dropped=0):
+    """Chrome trace JSON object for a list of events"""
+    pid = os.getpid()
+    trace = [
+        {'name': 'thread_name', 'ph': 'M', 'pid': pid, 'tid': thread, 'args': {'name': name}}
+        for thread, name in list(_threads.items())
+    ]
+    for phase, name, category, start, duration, thread, args in recorded:
+        event = {'name': name, 'cat': category, 'ph': phase, 'pid': pid, 'tid': thread,
+                 'ts': (start - _origin) / 1000, 'args': args}
+        if phase == 'X':
+            event['dur'] = duration / 1000
+        else:
+            event['s'] = 't'
+        trace.append(event)
+    return {
+        'traceEvents': trace,
+        'displayTimeUnit': 'ms',
+        'otherData': {'wall_clock_at_zero': _wall_origin, 'dropped_events': dropped},
+    }
+
+
+def write(path=None):
+    """Save the current buffer as Chrome trace JSON; returns the path"""
+    path = path or trace_path()
+    recorded, dropped = events()
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    with open(path, 'w') as f:
+        json.dump(to_chrome(recorded, dropped), f, default=str)
+    return path
+
+
+if os.environ.get('FOCUS_ALARM_TRACE'):
+    enable()
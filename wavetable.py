@@ -0,0 +1,166 @@
+"""
+Wavetable oscillators.
+
+Each timbre is a set of harmonic partials. Its single-cycle table is
+computed once (per number of partials that fit under Nyquist, so tables
+stay band-limited at any pitch) and sounds are generated by looking up
+the table with linear interpolation instead of calling np.sin for every
+partial of every sample. With 4096-entry tables the interpolation error
+is below 3e-7 of full scale, far under one 16-bit step.
+
+Two ways to drive a table:
+* Wavetable.lookup() maps an array of phases (in cycles) to samples.
+  The DSP graph uses this when a sound asks for the wavetable engine.
+* PhaseOscillator keeps a running phase accumulator and renders
+  block by block, for long ambient tones of any length.
+"""
+
+import math
+
+import numpy as np
+
+TABLE_SIZE = 4096
+BLOCK_SIZE = 8192
+
+
+class Wavetable:
+    """Band-limited single-cycle tables for one timbre"""
+
+    def __init__(self, partials, size=TABLE_SIZE):
+        # partials: [(harmonic number, amplitude), ...]
+        self.partials = sorted((int(k), float(a)) for k, a in partials)
+        self.size = size
+        self._tables = {}
+
+    def _tables_for(self, max_harmonic):
+        """(table, diff) holding only partials up to max_harmonic"""
+        key = sum(1 for k, _ in self.partials if k <= max_harmonic)
+        if key not in self._tables:
+            x = np.arange(self.size + 1) / self.size
+            table = np.zeros(self.size + 1)
+            for k, amp in self.partials[:key]:
+                table += amp * np.sin(2 * np.pi * k * x)
+            table[-1] = table[0]  # guard point for interpolation
+            self._tables[key] = (table[:-1].copy(), np.diff(table))
+        return self._tables[key]
+
+    def lookup(self, phase, freq=None, sample_rate=None, out=None, index=None, scratch=None):
+        """Table values at phase (cycles, any range); band-limited for freq if given
+
+        phase is left untouched unless out is phase. index (intp) and
+        scratch (float64) are optional buffers the size of phase.
+        """
+        if freq is not None and sample_rate is not None and freq > 0:
+            max_harmonic = int((sample_rate / 2) / freq)
+        else:
+            max_harmonic = self.partials[-1][0] if self.partials else 0
+        table, diff = self._tables_for(max_harmonic)
+
+        n = len(phase)
+        out = np.empty(n) if out is None else out
+        index = np.empty(n, dtype=np.intp) if index is None else index
+        scratch = np.empty(n) if scratch is None else scratch
+
+        # Position in the table: frac(phase) * size
+        np.floor(phase, out=scratch)
+        np.subtract(phase, scratch, out=out)
+        out *= self.size
+        np.floor(out, out=scratch)
+        np.copyto(index, scratch, casting='unsafe')
+        np.minimum(index, self.size - 1, out=index)
+        out -= scratch  # fractional part between entries
+
+        # table[i] + frac * (table[i + 1] - table[i])
+        np.take(diff, index, out=scratch)
+        out *= scratch
+        np.take(table, index, out=scratch)
+        out += scratch
+        return out
+
+
+SINE = Wavetable([(1, 1.0)])
+_timbres = {}
+
+
+def timbre(voices):
+    """Group plain voices into (fundamental, Wavetable), or None
+
+    Voices must be integer multiples of a common fundamental of at least
+    20 Hz, so the group can be rendered with one table lookup.
+    """
+    freqs = [voice['freq'] for voice in voices]
+    if not freqs or any(float(f) != int(f) or f <= 0 for f in freqs):
+        return None
+    fundamental = 0
+    for f in freqs:
+        fundamental = math.gcd(fundamental, int(f))
+    if fundamental < 20:
+        return None
+    partials = {}
+    for voice in voices:
+        k = int(voice['freq']) // fundamental
+        partials[k] = partials.get(k, 0.0) + voice.get('gain', 1.0)
+    key = tuple(sorted(partials.items()))
+    if key not in _timbres:
+        _timbres[key] = Wavetable(key)
+    return fundamental, _timbres[key]
+
+
+class PhaseOscillator:
+    """Phase-accumulator oscillator reading a wavetable block by block"""
+
+    def __init__(self, wavetable, sample_rate, block_size=BLOCK_SIZE):
+        self.wavetable = wavetable
+        self.sample_rate = sample_rate
+        self.block_size = block_size
+        self.phase = 0.0
+        self._steps = np.arange(block_size, dtype=np.float64)
+        self._phase = np.empty(block_size)
+        self._index = np.empty(block_size, dtype=np.intp)
+        self._scratch = np.empty(block_size)
+
+    def render(self, freq, n, out=None):
+        """Next n samples at freq (Hz), continuing from the current phase"""
+        out = np.empty(n) if out is None else out
+        increment = freq / self.sample_rate
+        for start in range(0, n, self.block_size):
+            count = min(self.block_size, n - start)
+            phase = self._phase[:count]
+            np.multiply(self._steps[:count], increment, out=phase)
+            phase += self.phase
+            self.wavetable.lookup(phase, freq, self.sample_rate, out=out[start:start + count],
+                                  index=self._index[:count], scratch=self._scratch[:count])
+            self.phase = (self.phase + increment * count) % 1.0
+        return out
+
+    def blocks(self, freq, seconds):
+        """Yield successive blocks of a tone lasting seconds (bounded memory)"""
+        remaining = int(seconds * self.sample_rate)
+        block = np.empty(self.block_size)
+        while remaining > 0:
+            count = min(self.block_size, remaining)
+            yield self.render(freq, count, out=block[:count])
+            remaining -= count
+
+
+def ambient(freq, seconds, sample_rate, partials=((1, 1.0), (2, 0.4), (3, 0.2)),
+            fade=2.0, peak=16383):
+    """Yield int16 blocks of a long, steady tone with soft fade in/out"""
+    osc = PhaseOscillator(Wavetable(partials), sample_rate)
+    gain = peak / sum(abs(a) for _, a in partials)
+    total = int(seconds * sample_rate)
+    fade_samples = max(1, min(int(fade * sample_rate), total // 2))
+    envelope = np.empty(osc.block_size)
+    pos = 0
+    for block in osc.blocks(freq, seconds):
+        n = len(block)
+        env = envelope[:n]
+        # min(1, distance to the nearest end / fade length)
+        np.copyto(env, osc._steps[:n])
+        env += pos
+        np.minimum(env, (total - 1) - env, out=env)
+        env *= gain / fade_samples
+        np.minimum(env, gain, out=env)
+        block *= env
+        yield block.astype(np.int16)
+        pos += n
@@ -0,0 +1,242 @@
+"""
+Outbound webhooks for session events.
+
+Session start, alarm, stop and completion events can be POSTed as JSON to
+one or more URLs, listed in the FOCUS_ALARM_WEBHOOKS environment variable
+(comma-separated) or in ~/.focus_alarm/webhooks.json as a JSON list.
+
+emit() only appends to an in-memory queue, so the timer and audio paths
+never wait on the network. Each destination has its own delivery thread
+that:
+* batches events: it waits up to BATCH_SECONDS after the first event and
+  sends up to BATCH_SIZE events in one request, {"events": [...]};
+* keeps one keep-alive HTTP connection open and reuses it;
+* on failure keeps the events queued and retries with exponential
+  back-off (with jitter), reconnecting first.
+
+Each destination's queue is bounded (oldest events are dropped first and
+counted). Whenever delivery fails, and on close, undelivered events are
+written to ~/.focus_alarm/webhooks/<destination>.json, so they survive a
+restart and are sent first the next time the app runs.
+"""
+
+import collections
+import hashlib
+import http.client
+import json
+import os
+import random
+import threading
+import time
+import urllib.parse
+
+import session_state
+
+BATCH_SIZE = 100
+BATCH_SECONDS = 0.5
+MAX_QUEUED = 10000
+TIMEOUT = 5
+BACKOFF_BASE = 1.0
+BACKOFF_MAX = 300.0
+COUNTERS = ('delivered', 'batches', 'connections', 'failures', 'retries', 'dropped')
+
+
+def config_path():
+    return os.path.join(os.path.dirname(session_state.default_path()), 'webhooks.json')
+
+
+def queue_directory():
+    return os.path.join(os.path.dirname(session_state.default_path()), 'webhooks')
+
+
+def configured_urls():
+    urls = [url.strip() for url in os.environ.get('FOCUS_ALARM_WEBHOOKS', '').split(',') if url.strip()]
+    if not urls:
+        try:
+            with open(config_path()) as f:
+                urls = [url for url in json.load(f) if isinstance(url, str)]
+        except (OSError, ValueError, TypeError):
+            pass
+    return urls
+
+
+class Destination:
+    """Queue, connection and delivery thread for one webhook URL"""
+
+    def __init__(self, url, directory, batch_size=BATCH_SIZE, batch_seconds=BATCH_SECONDS,
+                 max_queued=MAX_QUEUED, backoff_base=BACKOFF_BASE, backoff_max=BACKOFF_MAX):
+        parts = urllib.parse.urlsplit(url)
+        if parts.scheme not in ('http', 'https') or not parts.hostname:
+            raise ValueError(f"Unsupported webhook URL: {url}")
+        self.url = url
+        self.scheme = parts.scheme
+        self.host = parts.hostname
+        self.port = parts.port
+        self.path = (parts.path or '/') + (f'?{parts.query}' if parts.query else '')
+        self.batch_size = batch_size
+        self.batch_seconds = batch_seconds
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.queue_path = os.path.join(directory, hashlib.sha1(url.encode('utf-8')).hexdigest()[:16] + '.json')
+
+        self.queue = collections.deque(maxlen=max_queued)
+        self.connection = None
+        self.stats = collections.Counter()
+        self.max_depth = 0
+        self._wake = threading.Event()
+        self._closing = threading.Event()  # interrupts a back-off wait; new events don't
+        self._lock = threading.Lock()
+        # close() may save while the delivery thread (still sending after
+        # join timed out) saves too; both write the same temp file
+        self._save_lock = threading.Lock()
+        self._running = True
+        self._saved = False
+
+        self._load()
+        self._thread = threading.Thread(target=self._run, daemon=True, name='webhook')
+        self._thread.start()
+
+    def put(self, event):
+        with self._lock:
+            if len(self.queue) == self.queue.maxlen:
+                self.stats['dropped'] += 1
+            self.queue.append(event)
+            self.max_depth = max(self.max_depth, len(self.queue))
+        self._wake.set()
+
+    def _load(self):
+        """Pick up events left over from the last run"""
+        try:
+            with open(self.queue_path) as f:
+                events = json.load(f)['events']
+        except (OSError, ValueError, KeyError, TypeError):
+            return
+        self.queue.extend(events)
+        self._saved = True
+        print(f"Webhook {self.url}: {len(events)} undelivered events from last run")
+
+    def _save(self):
+        """Persist the undelivered events (or remove the file once they are gone)"""
+        with self._save_lock:
+            with self._lock:
+                events = list(self.queue)
+            try:
+                if events:
+                    session_state.save_atomic(self.queue_path, {'url': self.url, 'events': events})
+                    self._saved = True
+                elif self._saved:
+                    os.remove(self.queue_path)
+                    self._saved = False
+            except OSError as e:
+                print(f"Could not save webhook queue: {e}")
+
+    def _connect(self):
+        if self.connection is None:
+            connection_class = http.client.HTTPSConnection if self.scheme == 'https' else http.client.HTTPConnection
+            self.connection = connection_class(self.host, self.port, timeout=TIMEOUT)
+            self.stats['connections'] += 1
+        return self.connection
+
+    def _post(self, body):
+        """Send one batch over the kept-alive connection; raises on failure"""
+        connection = self._connect()
+        try:
+            connection.request('POST', self.path, body=body, headers={
+                'Content-Type': 'application/json',
+                'User-Agent': 'FocusAlarm-Webhooks',
+            })
+            response = connection.getresponse()
+            response.read()  # must drain before the connection can be reused
+        except (OSError, http.client.HTTPException):
+            connection.close()
+            self.connection = None
+            raise
+        if response.will_close:
+            connection.close()
+            self.connection = None
+        if response.status >= 300:
+            raise OSError(f"HTTP {response.status}")
+
+    def _run(self):
+        failures = 0
+        while self._running or self.queue:
+            if not self.queue:
+                self._wake.wait()
+                self._wake.clear()
+                continue
+            # Give more events a moment to join this batch
+            if failures == 0 and len(self.queue) < self.batch_size and self._running:
+                time.sleep(self.batch_seconds)
+            with self._lock:
+                batch = [self.queue[i] for i in range(min(self.batch_size, len(self.queue)))]
+                dropped = self.stats['dropped']
+            try:
+                self._post(json.dumps({'events': batch}, separators=(',', ':')).encode('utf-8'))
+            except Exception as e:
+                failures += 1
+                self.stats['failures'] += 1
+                if not self._running:
+                    break
+                delay = min(self.backoff_max, self.backoff_base * 2 ** (failures - 1))
+                delay *= random.uniform(0.5, 1.0)
+                print(f"Webhook {self.url} failed ({e}); retrying in {delay:.1f} s")
+                self._save()
+                self._closing.wait(delay)
+                self.stats['retries'] += 1
+                continue
+            with self._lock:
+                # New events go to the right; events of this batch that were
+                # dropped from the left meanwhile are already gone
+                for _ in range(max(0, len(batch) - (self.stats['dropped'] - dropped))):
+                    self.queue.popleft()
+            self.stats['delivered'] += len(batch)
+            self.stats['batches'] += 1
+            if failures or self._saved:
+                failures = 0
+                self._save()
+        if self.connection:
+            self.connection.close()
+
+    def close(self, timeout):
+        """Deliver what can be sent within timeout, then persist the rest"""
+        self._running = False
+        self._closing.set()
+        self._wake.set()
+        self._thread.join(timeout)
+        self._save()
+
+
+class Webhooks:
+    """Fans session events out to every configured destination"""
+
+    def __init__(self, urls, directory=None, **options):
+        directory = directory or queue_directory()
+        self.destinations = []
+        for url in urls:
+            try:
+                self.destinations.append(Destination(url, directory, **options))
+            except ValueError as e:
+                print(e)
+
+    def emit(self, event, **data):
+        """Queue an event for delivery; never blocks on the network"""
+        record = dict(data, event=event, time=time.time())
+        for destination in self.destinations:
+            destination.put(record)
+
+    def stats(self):
+        return {
+            destination.url: dict({key: destination.stats[key] for key in COUNTERS},
+                                  queued=len(destination.queue), max_depth=destination.max_depth)
+            for destination in self.destinations
+        }
+
+    def close(self, timeout=2.0):
+        for destination in self.destinations:
+            destination.close(timeout)
+
+
+def from_config():
+    """Webhooks for the configured URLs, or None if there are none"""
+    urls = configured_urls()
+    return Webhooks(urls) if urls else None